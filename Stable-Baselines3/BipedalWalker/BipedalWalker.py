@@ -2,11 +2,16 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
 
 import os
+import sys
 import gymnasium as gym
 from stable_baselines3 import PPO # best for lunar landing
 # from stable_baselines3 import A2C
 # from stable_baselines3 import DQN
 
+# checkpointManager.py lives one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from checkpointManager import CheckpointManager
+
 algorithm = "PPO"
 
 models_dir = "models/" + algorithm
@@ -23,14 +28,19 @@ if not os.path.exists(logdir):
 env = gym.make("BipedalWalker-v3", hardcore=False, render_mode="human")
 env.reset() # required before you can step the environment
 
-# Train a model with a `stable_baselines3` algorithm
-model = PPO('MlpPolicy', env, verbose=1, tensorboard_log=logdir, 
-# Optional hyperparameters
-    # seed = 33,
-    # learning_rate = 0.001,
-    # gamma = 0.999, # Discount factor
-    # ent_coef = 0, #Entropy coefficient for the loss calculation
-    )
+# Resume from the latest checkpoint (keeps num_timesteps), otherwise start fresh
+checkpoints = CheckpointManager(models_dir, keep_last=5, keep_best=1)
+model, env = checkpoints.resume(PPO, env, tensorboard_log=logdir)
+
+if model is None:
+    # Train a model with a `stable_baselines3` algorithm
+    model = PPO('MlpPolicy', env, verbose=1, tensorboard_log=logdir, 
+    # Optional hyperparameters
+        # seed = 33,
+        # learning_rate = 0.001,
+        # gamma = 0.999, # Discount factor
+        # ent_coef = 0, #Entropy coefficient for the loss calculation
+        )
 
 
 TIMESTEPS = 10_000
@@ -40,7 +50,8 @@ while True:
     
     # model.learn(total_timesteps=10_000)
     model.learn(total_timesteps=TIMESTEPS, reset_num_timesteps=False, tb_log_name=algorithm)
-    model.save(f"{models_dir}/{TIMESTEPS*iters}")
+    # Saved as {models_dir}/{model.num_timesteps}.zip, old checkpoints pruned
+    checkpoints.save(model)
 
 
 # print("TRAINING FINISHED")
\ No newline at end of file
@@ -2,14 +2,16 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
 
 import numpy as np
-import cv2
 import random
-import time
 from collections import deque
 import gymnasium as gym
 
 SNAKE_LEN_GOAL = 30
 
+BOARD_SIZE = 500   # pixels
+CELL_SIZE = 10     # pixels per cell
+GRID_SIZE = BOARD_SIZE // CELL_SIZE  # 50x50 cells
+
 def collision_with_apple(apple_position, score):
     apple_position = [random.randrange(1,50)*10,random.randrange(1,50)*10]
     score += 1
@@ -21,46 +23,43 @@ def collision_with_boundaries(snake_head):
     else:
         return 0
 
-def collision_with_self(snake_position):
-    snake_head = snake_position[0]
-    if snake_head in snake_position[1:]:
-        return 1
-    else:
-        return 0
-
 
 class SnekEnv(gym.Env):
-    """Custom Environment that follows gym interface"""
+    """
+    Custom Environment that follows gym interface
+
+    Headless by default: nothing is drawn unless render_mode is "human"
+    (OpenCV window, paced at render_fps) or "rgb_array" (render() returns the image).
 
-    def __init__(self):
+    The snake body is a deque of (x, y) pixel positions (head first) plus a
+    50x50 occupancy grid, so moving and checking self-collision are O(1).
+    """
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 20}
+
+    def __init__(self, render_mode=None):
         super().__init__()
+        assert render_mode is None or render_mode in self.metadata["render_modes"], f"Invalid render mode {render_mode}"
+        self.render_mode = render_mode
+
         # Define action and observation space
         # They must be gym.spaces objects
         # Example when using discrete actions:
         self.action_space = gym.spaces.Discrete(4)
-        
+
         self.observation_space = gym.spaces.Box(low=-500, high=500,
                                         shape=(5+SNAKE_LEN_GOAL,), dtype=np.int64)
-        
+
+        # Preallocated state:
+        # [head_x, head_y, apple_delta_x, apple_delta_y, snake_length] + prev_actions
+        self.observation = np.zeros(5 + SNAKE_LEN_GOAL, dtype=np.int64)
+        self.occupied = np.zeros((GRID_SIZE, GRID_SIZE), dtype=bool)  # indexed [x cell, y cell]
+
     def step(self, action):
-        self.prev_actions.append(action)
-        cv2.imshow('a',self.img)
-        cv2.waitKey(1)
-        self.img = np.zeros((500,500,3),dtype='uint8')
-        # Display Apple
-        cv2.rectangle(self.img,(self.apple_position[0],self.apple_position[1]),(self.apple_position[0]+10,self.apple_position[1]+10),(0,0,255),3)
-        # Display Snake
-        for position in self.snake_position:
-            cv2.rectangle(self.img,(position[0],position[1]),(position[0]+10,position[1]+10),(0,255,0),3)
-        
-        # Takes step after fixed time
-        t_end = time.time() + 0.05
-        k = -1
-        while time.time() < t_end:
-            if k == -1:
-                k = cv2.waitKey(1)
-            else:
-                continue
+        action = int(action)
+
+        # prev_actions history: shift left, newest action last
+        self.observation[5:-1] = self.observation[6:]
+        self.observation[-1] = action
 
         # button_direction = action
 
@@ -87,22 +86,24 @@ class SnekEnv(gym.Env):
         elif button_direction == 3:
             self.snake_head[1] -= 10
 
+        head = (self.snake_head[0], self.snake_head[1])
+
         # Increase Snake length on eating apple
         if self.snake_head == self.apple_position:
             self.apple_position, self.score = collision_with_apple(self.apple_position, self.score)
-            self.snake_position.insert(0,list(self.snake_head))
-
         else:
-            self.snake_position.insert(0,list(self.snake_head))
-            self.snake_position.pop()
-        
-        # On collision kill the snake and print the score
-        if collision_with_boundaries(self.snake_head) == 1 or collision_with_self(self.snake_position) == 1:
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            self.img = np.zeros((500,500,3),dtype='uint8')
-            cv2.putText(self.img,'Your Score is {}'.format(self.score),(140,250), font, 1,(255,255,255),2,cv2.LINE_AA)
-            cv2.imshow('a',self.img)
+            # The tail moves away before the head arrives
+            tail_x, tail_y = self.snake_position.pop()
+            self.occupied[tail_x // CELL_SIZE, tail_y // CELL_SIZE] = False
+        self.snake_position.appendleft(head)
+
+        # On collision kill the snake
+        if collision_with_boundaries(self.snake_head) == 1:
+            self.done = True
+        elif self.occupied[head[0] // CELL_SIZE, head[1] // CELL_SIZE]:
             self.done = True
+        else:
+            self.occupied[head[0] // CELL_SIZE, head[1] // CELL_SIZE] = True
 
         self.total_reward = len(self.snake_position) - 3  # default length is 3
         self.reward = self.total_reward - self.prev_reward
@@ -115,28 +116,21 @@ class SnekEnv(gym.Env):
         truncated = False
         terminated = self.done
 
-        head_x = self.snake_head[0]
-        head_y = self.snake_head[1]
+        if self.render_mode == "human":
+            self.render()
 
-        snake_length = len(self.snake_position)
-        apple_delta_x = self.apple_position[0] - head_x
-        apple_delta_y = self.apple_position[1] - head_y
+        return self._get_obs(), self.reward, terminated, truncated, info
 
-        # create observation:
-
-        observation = [head_x, head_y, apple_delta_x, apple_delta_y, snake_length] + list(self.prev_actions)
-        observation = np.array(observation)
-            
-        return observation, self.reward, terminated, truncated, info
-    
-    def reset(self, seed=0):
+    def reset(self, seed=0, options=None):
         # random.seed(seed)
 
         self.done = False # IMPORTANT FOR TRAINING
 
-        self.img = np.zeros((500,500,3),dtype='uint8')
         # Initial Snake and Apple position
-        self.snake_position = [[250,250],[240,250],[230,250]]
+        self.snake_position = deque([(250,250),(240,250),(230,250)])
+        self.occupied[:] = False
+        for x, y in self.snake_position:
+            self.occupied[x // CELL_SIZE, y // CELL_SIZE] = True
         self.apple_position = [random.randrange(1,50)*10,random.randrange(1,50)*10]
         self.score = 0
         self.prev_button_direction = 1
@@ -145,21 +139,50 @@ class SnekEnv(gym.Env):
 
         self.prev_reward = 0
 
-        head_x = self.snake_head[0]
-        head_y = self.snake_head[1]
+        # however long we aspire the snake to be, -1 = no action yet
+        self.observation[5:] = -1
 
-        snake_length = len(self.snake_position)
-        apple_delta_x = self.apple_position[0] - head_x
-        apple_delta_y = self.apple_position[1] - head_y
+        if self.render_mode == "human":
+            self.render()
 
-        self.prev_actions = deque(maxlen = SNAKE_LEN_GOAL)  # however long we aspire the snake to be
-        for i in range(SNAKE_LEN_GOAL):
-            self.prev_actions.append(-1) # to create history
+        info = {}
+        return self._get_obs(), info  # reward, done, info can't be included
 
-        # create observation:
-        observation = [head_x, head_y, apple_delta_x, apple_delta_y, snake_length] + list(self.prev_actions)
-        observation = np.array(observation)
+    def render(self):
+        import cv2
 
-        info = {}
-        return observation, info  # reward, done, info can't be included
-    
+        img = np.zeros((BOARD_SIZE, BOARD_SIZE, 3), dtype='uint8')
+        if self.done:
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            cv2.putText(img,'Your Score is {}'.format(self.score),(140,250), font, 1,(255,255,255),2,cv2.LINE_AA)
+        else:
+            # Display Apple
+            cv2.rectangle(img,(self.apple_position[0],self.apple_position[1]),(self.apple_position[0]+10,self.apple_position[1]+10),(0,0,255),3)
+            # Display Snake
+            for position in self.snake_position:
+                cv2.rectangle(img,(position[0],position[1]),(position[0]+10,position[1]+10),(0,255,0),3)
+
+        if self.render_mode == "human":
+            cv2.imshow('a', img)
+            # waitKey both refreshes the window and paces the game
+            cv2.waitKey(int(1000 / self.metadata["render_fps"]))
+            return None
+        return img
+
+    def close(self):
+        if self.render_mode == "human":
+            import cv2
+            cv2.destroyAllWindows()
+
+    # --------------------
+    # Helpers
+    # --------------------
+    def _get_obs(self):
+        obs = self.observation
+        obs[0] = self.snake_head[0]
+        obs[1] = self.snake_head[1]
+        obs[2] = self.apple_position[0] - self.snake_head[0]
+        obs[3] = self.apple_position[1] - self.snake_head[1]
+        obs[4] = len(self.snake_position)
+        # Copy so callers can keep earlier observations
+        return obs.copy()
@@ -0,0 +1,190 @@
+"""
+snakeVecEnv.py
+
+A native Stable-Baselines3 VecEnv that plays N Snake boards at once.
+
+Same rules, rewards and observations as SnekEnv, but all boards live in
+NumPy arrays and one step() moves every snake with array ops:
+ - occupancy: (N, 50, 50) bool grid of body cells
+ - bodies: (N, capacity, 2) ring buffers of cells, head at head_idx
+ - apples, heads, lengths, directions and the prev_actions history: (N, ...) arrays
+
+Positions are stored in cells (pixels / 10); observations are reported in
+pixels like SnekEnv. Finished boards are reset automatically and report
+Monitor-style info["episode"] and info["terminal_observation"].
+"""
+
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, VecEnvIndices, VecEnvObs, VecEnvStepReturn
+
+try:
+    from snakeGym import CELL_SIZE, GRID_SIZE, SNAKE_LEN_GOAL, SnekEnv
+except ImportError:
+    from Snake.snakeGym import CELL_SIZE, GRID_SIZE, SNAKE_LEN_GOAL, SnekEnv
+
+
+# Directions: 0-Left, 1-Right, 2-Down, 3-Up
+OPPOSITE = np.array([1, 0, 3, 2])
+DELTA = np.array([[-1, 0], [1, 0], [0, 1], [0, -1]])
+
+START_BODY = np.array([[23, 25], [24, 25], [25, 25]])  # tail ... head, in cells
+
+
+class BatchedSnekVecEnv(VecEnv):
+    """
+    num_envs: number of boards stepped together
+    seed: seed for the shared random generator (apple positions)
+    """
+
+    def __init__(self, num_envs: int = 1, *, seed: Optional[int] = None):
+        assert num_envs > 0, "Invalid number of envs: num_envs must be > 0"
+
+        self.template = SnekEnv()
+        super().__init__(num_envs, self.template.observation_space, self.template.action_space)
+        self.metadata = self.template.metadata
+
+        n = num_envs
+        self.capacity = GRID_SIZE * GRID_SIZE  # a snake can never be longer than the board
+        self.occupied = np.zeros((n, GRID_SIZE, GRID_SIZE), dtype=bool)
+        self.body = np.zeros((n, self.capacity, 2), dtype=np.int16)
+        self.head_idx = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.head = np.zeros((n, 2), dtype=np.int64)
+        self.apple = np.zeros((n, 2), dtype=np.int64)
+        self.prev_button_direction = np.ones(n, dtype=np.int64)
+        self.prev_actions = np.full((n, SNAKE_LEN_GOAL), -1, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+
+        # Monitor-style episode statistics
+        self.episode_returns = np.zeros(n, dtype=np.float64)
+        self.episode_lengths = np.zeros(n, dtype=np.int64)
+        self.t_start = time.time()
+
+        self._rows = np.arange(n)
+        self.np_random = np.random.default_rng(seed)
+        self.actions = np.zeros(n, dtype=np.int64)
+
+    # --------------------
+    # VecEnv API
+    # --------------------
+    def reset(self) -> VecEnvObs:
+        if self._seeds[0] is not None:
+            self.np_random = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+
+        self._reset_boards(np.ones(self.num_envs, dtype=bool))
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self._get_obs()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        rows = self._rows
+        actions = self.actions
+
+        # prev_actions history: shift left, newest action last
+        self.prev_actions[:, :-1] = self.prev_actions[:, 1:]
+        self.prev_actions[:, -1] = actions
+
+        # A snake cannot reverse onto itself: keep the previous direction instead
+        direction = np.where(actions != OPPOSITE[self.prev_button_direction], actions, self.prev_button_direction)
+        self.prev_button_direction = direction
+        self.head += DELTA[direction]
+
+        # Increase Snake length on eating apple, otherwise the tail moves away first
+        ate = np.all(self.head == self.apple, axis=1)
+        moving = ~ate
+        tail_idx = (self.head_idx - self.length + 1) % self.capacity
+        tail = self.body[rows, tail_idx]
+        self.occupied[rows[moving], tail[moving, 0], tail[moving, 1]] = False
+        self.length += ate
+
+        self.head_idx = (self.head_idx + 1) % self.capacity
+        self.body[rows, self.head_idx] = self.head
+
+        # Collisions with the walls or the body
+        out = np.any((self.head < 0) | (self.head >= GRID_SIZE), axis=1)
+        inside = np.clip(self.head, 0, GRID_SIZE - 1)
+        hit_self = ~out & self.occupied[rows, inside[:, 0], inside[:, 1]]
+        dones = out | hit_self
+        alive = ~dones
+        self.occupied[rows[alive], self.head[alive, 0], self.head[alive, 1]] = True
+
+        # New apples (cells 1..49, like random.randrange(1,50)*10)
+        n_ate = int(ate.sum())
+        if n_ate:
+            self.apple[ate] = self.np_random.integers(1, GRID_SIZE, size=(n_ate, 2))
+            self.score += ate
+
+        rewards = np.where(dones, -10.0, ate.astype(np.float64))
+
+        self.episode_returns += rewards
+        self.episode_lengths += 1
+
+        obs = self._get_obs()
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            elapsed = round(time.time() - self.t_start, 6)
+            for i in np.flatnonzero(dones):
+                infos[i]["TimeLimit.truncated"] = False
+                infos[i]["terminal_observation"] = obs[i].copy()
+                infos[i]["episode"] = {
+                    "r": round(float(self.episode_returns[i]), 6),
+                    "l": int(self.episode_lengths[i]),
+                    "t": elapsed,
+                }
+            # Auto-reset the finished boards
+            self._reset_boards(dones)
+            obs[dones] = self._get_obs()[dones]
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        value = getattr(self, attr_name) if hasattr(self, attr_name) else getattr(self.template, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        method = getattr(self.template, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices: VecEnvIndices = None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    # --------------------
+    # Helpers
+    # --------------------
+    def _reset_boards(self, mask: np.ndarray) -> None:
+        n = int(mask.sum())
+        self.occupied[mask] = False
+        self.body[mask, :3] = START_BODY
+        self.head_idx[mask] = 2
+        self.length[mask] = 3
+        self.head[mask] = START_BODY[-1]
+        for x, y in START_BODY:
+            self.occupied[mask, x, y] = True
+        self.apple[mask] = self.np_random.integers(1, GRID_SIZE, size=(n, 2))
+        self.prev_button_direction[mask] = 1
+        self.prev_actions[mask] = -1
+        self.score[mask] = 0
+        self.episode_returns[mask] = 0.0
+        self.episode_lengths[mask] = 0
+
+    def _get_obs(self) -> np.ndarray:
+        # [head_x, head_y, apple_delta_x, apple_delta_y, snake_length] + prev_actions, in pixels
+        obs = np.empty((self.num_envs, 5 + SNAKE_LEN_GOAL), dtype=np.int64)
+        obs[:, 0:2] = self.head * CELL_SIZE
+        obs[:, 2:4] = (self.apple - self.head) * CELL_SIZE
+        obs[:, 4] = self.length
+        obs[:, 5:] = self.prev_actions
+        return obs
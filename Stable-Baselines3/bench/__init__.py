@@ -0,0 +1,9 @@
+"""
+Benchmarks for the Pomodoro server and environments.
+
+> `python -m bench.server`  - load test of main2.py (latency, throughput, RSS)
+> `python -m bench.envs`    - environment steps/sec and allocations per step
+
+Run from the Stable-Baselines3 folder. Results are written as JSON so runs
+can be compared between commits.
+"""
@@ -0,0 +1,38 @@
+"""Helpers shared by the benchmark modules."""
+
+import json
+import os
+import platform
+import subprocess
+import time
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(path, name, config, results):
+    """Write one benchmark run to `path` (JSON) together with commit and machine info."""
+    report = {
+        "benchmark": name,
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def default_output(name):
+    return f"bench_results/{name}-{git_commit()}.json"
@@ -0,0 +1,273 @@
+"""
+Environment throughput benchmark.
+
+> `python -m bench.envs`
+> `python -m bench.envs --num-envs 8 --backends dummy,shm,batched --steps 20000`
+> `python -m bench.envs --baseline bench_results/envs-abc1234.json --threshold 0.2`
+
+Times seeded random-action step loops (with resets) for:
+ - PomodoroEnv alone, + RescaleAction, + Monitor (the pomodoroTrain.py stack)
+ - the same with PomodoroEnv(fast_mode=True, return_info=False)
+ - that stack vectorized with each --backends entry, with and without VecNormalize
+ - Snake's SnekEnv and the batched Snake VecEnv
+
+For each case it reports steps/sec, resets/sec and, from a separate
+tracemalloc pass, the peak bytes allocated during a step and the net
+bytes kept per step. With --baseline the run fails (exit code 1) if any
+case is more than --threshold slower than in the baseline file.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from bench.common import default_output, write_results
+
+
+VEC_BACKENDS = ["dummy", "subproc", "shm", "batched"]
+
+
+# --------------------
+# Environment factories (module level so subprocess workers can unpickle them)
+# --------------------
+def make_pomodoro():
+    from pomodoro.pomodoroEnv import PomodoroEnv
+    return PomodoroEnv()
+
+
+def make_pomodoro_fast():
+    from pomodoro.pomodoroEnv import PomodoroEnv
+    return PomodoroEnv(fast_mode=True, return_info=False)
+
+
+def make_pomodoro_rescaled():
+    from gymnasium.wrappers import RescaleAction
+    return RescaleAction(make_pomodoro(), -1, 1)
+
+
+def make_pomodoro_monitored():
+    from stable_baselines3.common.monitor import Monitor
+    return Monitor(make_pomodoro_rescaled())
+
+
+def make_pomodoro_fast_monitored():
+    from gymnasium.wrappers import RescaleAction
+    from stable_baselines3.common.monitor import Monitor
+    return Monitor(RescaleAction(make_pomodoro_fast(), -1, 1))
+
+
+def make_snake():
+    from Snake.snakeGym import SnekEnv
+    return SnekEnv()
+
+
+def make_snake_vec(num_envs):
+    from Snake.snakeVecEnv import BatchedSnekVecEnv
+    return BatchedSnekVecEnv(num_envs)
+
+
+def make_pomodoro_vec(backend, num_envs, normalize):
+    from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
+    from pomodoro.pomodoroVecEnv import BatchedPomodoroVecEnv
+    from pomodoro.shmVecEnv import ShmVecEnv
+
+    if backend == "dummy":
+        env = DummyVecEnv([make_pomodoro_monitored for _ in range(num_envs)])
+    elif backend == "subproc":
+        env = SubprocVecEnv([make_pomodoro_monitored for _ in range(num_envs)])
+    elif backend == "shm":
+        env = ShmVecEnv([make_pomodoro_monitored for _ in range(num_envs)])
+    elif backend == "batched":
+        env = BatchedPomodoroVecEnv(num_envs)
+    else:
+        raise ValueError(f"Unknown vec backend {backend!r}, expected one of {VEC_BACKENDS}")
+    if normalize:
+        env = VecNormalize(env, norm_obs=True, norm_reward=False)
+    return env
+
+
+# --------------------
+# Loops
+# --------------------
+def random_actions(space, n, seed):
+    rng = np.random.default_rng(seed)
+    if hasattr(space, "n"):
+        return rng.integers(0, space.n, size=n)
+    low, high = space.low, space.high
+    return rng.uniform(low, high, size=(n, *space.shape)).astype(space.dtype)
+
+
+def gym_loop(env, actions, seed):
+    """Step a gymnasium env through `actions`, resetting at episode end. Returns number of resets."""
+    env.reset(seed=seed)
+    resets = 0
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+            resets += 1
+    return resets
+
+
+def vec_loop(env, actions, seed):
+    """Step a VecEnv through `actions` (auto-reset). Returns number of finished episodes."""
+    env.seed(seed)
+    env.reset()
+    resets = 0
+    for action in actions:
+        _, _, dones, _ = env.step(action)
+        resets += int(dones.sum())
+    return resets
+
+
+def measure(make, steps, seed, vectorized, num_envs=1):
+    """steps/sec and resets/sec for one case (steps counts every env of a VecEnv)."""
+    env = make()
+    try:
+        if vectorized:
+            single = random_actions(env.action_space, steps * num_envs, seed).reshape(steps, num_envs, -1)
+            loop = vec_loop
+        else:
+            single = random_actions(env.action_space, steps, seed)
+            loop = gym_loop
+
+        # Warm-up, then timed run
+        loop(env, single[: max(1, steps // 10)], seed)
+        start = time.perf_counter()
+        resets = loop(env, single, seed)
+        elapsed = time.perf_counter() - start
+
+        # Reset-only loop
+        n_resets = max(1, steps // 50)
+        start = time.perf_counter()
+        for i in range(n_resets):
+            if vectorized:
+                env.reset()
+            else:
+                env.reset(seed=seed + i)
+        reset_elapsed = time.perf_counter() - start
+
+        # Allocation pass (tracemalloc slows everything down, so it is not timed)
+        n_alloc = max(1, min(steps, 2000))
+        alloc_actions = single[:n_alloc]
+        loop(env, alloc_actions[:10], seed)
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        peaks = []
+        if vectorized:
+            for action in alloc_actions:
+                tracemalloc.reset_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                env.step(action)
+                peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        else:
+            for action in alloc_actions:
+                tracemalloc.reset_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                _, _, terminated, truncated, _ = env.step(action)
+                peaks.append(tracemalloc.get_traced_memory()[1] - current)
+                if terminated or truncated:
+                    env.reset()
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        total_steps = steps * num_envs
+        return {
+            "steps_per_sec": total_steps / elapsed,
+            "episodes_per_sec": resets / elapsed,
+            "resets_per_sec": n_resets * (num_envs if vectorized else 1) / reset_elapsed,
+            "peak_bytes_per_step": float(np.mean(peaks)) / num_envs,
+            "net_bytes_per_step": (after - before) / (n_alloc * num_envs),
+            "num_envs": num_envs,
+        }
+    finally:
+        env.close()
+
+
+def build_cases(args):
+    cases = {
+        "pomodoro/raw": (make_pomodoro, False, 1),
+        "pomodoro/rescale": (make_pomodoro_rescaled, False, 1),
+        "pomodoro/rescale+monitor": (make_pomodoro_monitored, False, 1),
+        "pomodoro/raw-fast": (make_pomodoro_fast, False, 1),
+        "pomodoro/rescale+monitor-fast": (make_pomodoro_fast_monitored, False, 1),
+    }
+    for backend in args.backends:
+        for normalize in (False, True):
+            name = f"pomodoro/vec-{backend}" + ("+vecnormalize" if normalize else "")
+            make = (lambda b=backend, n=normalize: make_pomodoro_vec(b, args.num_envs, n))
+            cases[name] = (make, True, args.num_envs)
+    if not args.skip_snake:
+        cases["snake/raw"] = (make_snake, False, 1)
+        cases["snake/vec-batched"] = (lambda: make_snake_vec(args.num_envs), True, args.num_envs)
+    return cases
+
+
+def compare(results, baseline_path, threshold):
+    """Names of the cases whose steps/sec fell more than `threshold` below the baseline."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, stats in results.items():
+        old = baseline.get(name, {}).get("steps_per_sec")
+        new = stats.get("steps_per_sec")
+        if old and new and new < old * (1.0 - threshold):
+            regressions.append((name, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=10_000, help="step() calls per case")
+    parser.add_argument("--num-envs", type=int, default=4)
+    parser.add_argument("--backends", default="dummy,batched", help=f"comma separated, from {VEC_BACKENDS}")
+    parser.add_argument("--skip-snake", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=None, help="previous results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args(argv)
+    args.backends = [b for b in args.backends.split(",") if b]
+    for backend in args.backends:
+        if backend not in VEC_BACKENDS:
+            parser.error(f"Unknown vec backend {backend!r}, expected one of {VEC_BACKENDS}")
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+
+    results = {}
+    for name, (make, vectorized, num_envs) in build_cases(args).items():
+        # Vectorized cases step num_envs envs per call: keep the total work comparable
+        steps = max(1, args.steps // num_envs) if vectorized else args.steps
+        try:
+            results[name] = measure(make, steps, args.seed, vectorized, num_envs)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+        stats = results[name]
+        if "error" in stats:
+            print(f"{name:40s} ERROR {stats['error']}")
+        else:
+            print(f"{name:40s} {stats['steps_per_sec']:12.0f} steps/s "
+                  f"{stats['resets_per_sec']:10.0f} resets/s "
+                  f"{stats['peak_bytes_per_step']:9.0f} B peak/step")
+
+    config = {k: v for k, v in vars(args).items() if k != "baseline"}
+    out = args.out or default_output("envs")
+    write_results(out, "envs", config, results)
+    print("results:", out)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.0f} -> {new:.0f} steps/s ({new / old - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Load test for the FastAPI inference server (main2.py).
+
+> `python -m bench.server --concurrency 64 --requests 5000`
+> `python -m bench.server --mode uvicorn --workers 4 --mix single=0.7,offgrid=0.2,batch=0.1`
+
+Modes:
+ - asgi:    app is imported in this process and called through httpx's ASGI transport
+ - uvicorn: a local `uvicorn main2:app` is started and called over HTTP
+
+Request kinds (--mix, weights are normalized):
+ - single:  POST /pomodoro with a random in-grid observation (lookup table path)
+ - repeat:  POST /pomodoro with one of a few out-of-grid observations (cache path)
+ - offgrid: POST /pomodoro with a random out-of-grid observation (model path)
+ - batch:   POST /pomodoro/batch with --batch-size random observations
+
+Reports p50/p95/p99 latency per kind, throughput and RSS per server process.
+
+Session logging is off during the load test, so synthetic requests never
+end up in pomodoro/sessions (the training data of fitUserProfile.py and
+offlineTrain.py); --session-log-dir turns it on, into that folder.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bench.common import default_output, write_results
+
+
+KINDS = ["single", "repeat", "offgrid", "batch"]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            raise ValueError(f"Unknown request kind {kind!r}, expected one of {KINDS}")
+        mix[kind] = float(weight or 1.0)
+    total = sum(mix.values())
+    return {kind: weight / total for kind, weight in mix.items()}
+
+
+def make_request(kind, rng, batch_size):
+    """(path, json body) for one request of the given kind."""
+    if kind == "single":
+        obs = {"fatigue": int(rng.integers(1, 6)), "work_minutes_day": int(rng.integers(0, 481)),
+               "break_minutes_day": int(rng.integers(0, 181))}
+        return "/pomodoro", obs
+    if kind == "repeat":
+        i = int(rng.integers(0, 8))
+        return "/pomodoro", {"fatigue": 3, "work_minutes_day": 500 + 10 * i, "break_minutes_day": 30}
+    if kind == "offgrid":
+        obs = {"fatigue": int(rng.integers(1, 6)), "work_minutes_day": int(rng.integers(481, 2000)),
+               "break_minutes_day": int(rng.integers(0, 181))}
+        return "/pomodoro", obs
+    if kind == "batch":
+        cols = {
+            "fatigue": rng.integers(1, 6, batch_size).tolist(),
+            "work_minutes_day": rng.integers(0, 481, batch_size).tolist(),
+            "break_minutes_day": rng.integers(0, 181, batch_size).tolist(),
+        }
+        return "/pomodoro/batch", cols
+    raise ValueError(kind)
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {"count": 0}
+    ms = np.asarray(latencies) * 1000.0
+    return {
+        "count": int(ms.size),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+async def drive(client, n_requests, concurrency, mix, batch_size, seed):
+    """Send n_requests with at most `concurrency` in flight; returns per-kind latencies and errors."""
+    rng = np.random.default_rng(seed)
+    kinds = list(mix)
+    plan = rng.choice(len(kinds), size=n_requests, p=[mix[k] for k in kinds])
+    requests = [(kinds[k], *make_request(kinds[k], rng, batch_size)) for k in plan]
+
+    latencies = {kind: [] for kind in kinds}
+    errors = 0
+    next_request = 0
+
+    async def user():
+        nonlocal next_request, errors
+        while next_request < len(requests):
+            kind, path, body = requests[next_request]
+            next_request += 1
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            latencies[kind].append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    return latencies, errors, time.perf_counter() - start
+
+
+def rss_mb(pids):
+    import psutil
+    out = {}
+    for pid in pids:
+        try:
+            out[str(pid)] = psutil.Process(pid).memory_info().rss / 2**20
+        except psutil.Error:
+            pass
+    return out
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(args):
+    """Environment variables of main2 for this run (see main2.py)."""
+    if args.session_log_dir is None:
+        return {"POMODORO_LOG_SESSIONS": "0"}
+    return {"POMODORO_LOG_SESSIONS": "1", "POMODORO_SESSION_LOG_DIR": args.session_log_dir}
+
+
+async def run_asgi(args, mix):
+    import httpx
+
+    os.environ.update(server_env(args))
+    import main2
+
+    transport = httpx.ASGITransport(app=main2.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await drive(client, args.warmup, args.concurrency, mix, args.batch_size, args.seed + 1)
+        latencies, errors, elapsed = await drive(client, args.requests, args.concurrency, mix, args.batch_size, args.seed)
+    return latencies, errors, elapsed, rss_mb([os.getpid()])
+
+
+async def run_uvicorn(args, mix):
+    import httpx
+    import psutil
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main2:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env={**os.environ, **server_env(args)},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            # Wait for the server (and every worker's model) to be up
+            deadline = time.monotonic() + args.startup_timeout
+            while True:
+                try:
+                    if (await client.get("/models")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not start")
+                await asyncio.sleep(0.2)
+
+            await drive(client, args.warmup, args.concurrency, mix, args.batch_size, args.seed + 1)
+            latencies, errors, elapsed = await drive(client, args.requests, args.concurrency, mix, args.batch_size, args.seed)
+
+        parent = psutil.Process(server.pid)
+        pids = [parent.pid] + [child.pid for child in parent.children(recursive=True)]
+        return latencies, errors, elapsed, rss_mb(pids)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--mix", default="single=0.7,repeat=0.1,offgrid=0.15,batch=0.05")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (uvicorn mode)")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--session-log-dir", default=None,
+                        help="log the sessions into this (scratch) folder, to include logging in the timings")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    runner = run_asgi if args.mode == "asgi" else run_uvicorn
+    latencies, errors, elapsed, rss = asyncio.run(runner(args, mix))
+
+    all_latencies = [t for kind in latencies.values() for t in kind]
+    results = {
+        "throughput_rps": len(all_latencies) / elapsed,
+        "elapsed_s": elapsed,
+        "errors": errors,
+        "latency": percentiles(all_latencies),
+        "latency_by_kind": {kind: percentiles(values) for kind, values in latencies.items()},
+        "rss_mb": rss,
+    }
+    config = dict(vars(args), mix=mix)
+    out = args.out or default_output(f"server-{args.mode}")
+    write_results(out, "server", config, results)
+
+    lat = results["latency"]
+    print(f"{results['throughput_rps']:.0f} req/s, errors={errors}, "
+          f"p50={lat['p50_ms']:.2f}ms p95={lat['p95_ms']:.2f}ms p99={lat['p99_ms']:.2f}ms")
+    for kind, stats in results["latency_by_kind"].items():
+        if stats["count"]:
+            print(f"  {kind:8s} n={stats['count']:6d} p50={stats['p50_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms")
+    print("  rss (MB):", {pid: round(mb, 1) for pid, mb in rss.items()})
+    print("results:", out)
+
+
+if __name__ == "__main__":
+    main()
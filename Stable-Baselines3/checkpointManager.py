@@ -0,0 +1,197 @@
+"""
+checkpointManager.py
+
+Crash-safe, resumable checkpoints for the training scripts.
+
+Each checkpoint keeps the usual layout, so main2.py and the load scripts
+still find it:
+ - {models_dir}/{num_timesteps}.zip                 model (+ optimizer state)
+ - {vecnormalize_dir}/{num_timesteps}.pkl           VecNormalize statistics (optional)
+ - {models_dir}/{num_timesteps}_replay_buffer.pkl   replay buffer (optional, off-policy only)
+
+Every file is written to a temporary name and renamed into place, and
+{models_dir}/checkpoints.json (the manifest, also replaced atomically) is
+updated last. A crash mid-save therefore never leaves a half-written
+checkpoint listed in the manifest.
+
+Retention only touches checkpoints listed in the manifest: the last
+`keep_last` and the `keep_best` highest-scoring ones are kept, the others
+are deleted. Checkpoints saved before the manager existed are left alone,
+but the newest of them is resumed from when the manifest is still empty.
+"""
+
+import json
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+MANIFEST = "checkpoints.json"
+
+
+def _atomic_replace(tmp_path: str, path: str) -> None:
+    # Make sure the data is on disk before the rename makes it visible
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CheckpointManager:
+    """
+    models_dir: where the model zips (and the manifest) go
+    vecnormalize_dir: where VecNormalize pkls go (None if not used)
+    keep_last: number of most recent checkpoints kept
+    keep_best: number of best-scoring checkpoints kept on top of those
+    save_replay_buffer: also save/restore the replay buffer (SAC, TD3, DQN, ...)
+    """
+
+    def __init__(
+        self,
+        models_dir: str,
+        vecnormalize_dir: Optional[str] = None,
+        *,
+        keep_last: int = 3,
+        keep_best: int = 1,
+        save_replay_buffer: bool = False,
+    ):
+        assert keep_last >= 1, "Invalid retention: keep_last must be >= 1"
+        assert keep_best >= 0, "Invalid retention: keep_best must be >= 0"
+
+        self.models_dir = models_dir
+        self.vecnormalize_dir = vecnormalize_dir
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.save_replay_buffer = save_replay_buffer
+
+        os.makedirs(models_dir, exist_ok=True)
+        if vecnormalize_dir is not None:
+            os.makedirs(vecnormalize_dir, exist_ok=True)
+
+        self.manifest_path = f"{models_dir}/{MANIFEST}"
+        self.entries: List[dict] = self._read_manifest()
+
+    # --------------------
+    # Save
+    # --------------------
+    def save(self, model, env=None, score: Optional[float] = None) -> dict:
+        """
+        Save model (+ VecNormalize env, + replay buffer) under model.num_timesteps.
+        score defaults to the mean episode reward of the last episodes (higher is better).
+        """
+        step = int(model.num_timesteps)
+        if score is None:
+            score = self._recent_reward(model)
+
+        entry = {"step": step, "score": score, "time": time.time(), "files": {}}
+
+        model_path = f"{self.models_dir}/{step}.zip"
+        model.save(model_path + ".tmp")
+        _atomic_replace(model_path + ".tmp", model_path)
+        entry["files"]["model"] = model_path
+
+        if env is not None and self.vecnormalize_dir is not None and hasattr(env, "obs_rms"):
+            vec_path = f"{self.vecnormalize_dir}/{step}.pkl"
+            env.save(vec_path + ".tmp")
+            _atomic_replace(vec_path + ".tmp", vec_path)
+            entry["files"]["vecnormalize"] = vec_path
+
+        if self.save_replay_buffer and getattr(model, "replay_buffer", None) is not None:
+            buffer_path = f"{self.models_dir}/{step}_replay_buffer.pkl"
+            model.save_replay_buffer(buffer_path + ".tmp")
+            _atomic_replace(buffer_path + ".tmp", buffer_path)
+            entry["files"]["replay_buffer"] = buffer_path
+
+        self.entries = [e for e in self.entries if e["step"] != step] + [entry]
+        self._apply_retention()
+        self._write_manifest()
+        return entry
+
+    # --------------------
+    # Resume
+    # --------------------
+    def latest(self) -> Optional[dict]:
+        """Most recent checkpoint whose files are all present."""
+        complete = [e for e in self.entries if all(os.path.exists(p) for p in e["files"].values())]
+        if not complete:
+            return self._legacy_latest()
+        return max(complete, key=lambda e: e["step"])
+
+    def best(self) -> Optional[dict]:
+        scored = [e for e in self.entries if e.get("score") is not None]
+        return max(scored, key=lambda e: e["score"]) if scored else None
+
+    def resume(self, algorithm_class, venv, **load_kwargs) -> Tuple[Optional[object], object]:
+        """
+        Load the latest checkpoint onto `venv` (the vec env *before* VecNormalize).
+        Returns (model, env); model is None if there is nothing to resume, and env
+        is then `venv` unchanged so the caller can wrap it and build a new model.
+        num_timesteps is restored from the zip, so keep calling
+        learn(..., reset_num_timesteps=False).
+        """
+        entry = self.latest()
+        if entry is None:
+            return None, venv
+
+        env = venv
+        if "vecnormalize" in entry["files"]:
+            from stable_baselines3.common.vec_env import VecNormalize
+            env = VecNormalize.load(entry["files"]["vecnormalize"], venv)
+            env.training = True
+
+        model = algorithm_class.load(entry["files"]["model"], env=env, **load_kwargs)
+        if "replay_buffer" in entry["files"]:
+            model.load_replay_buffer(entry["files"]["replay_buffer"])
+        print(f"[CheckpointManager] resumed from {entry['files']['model']} (num_timesteps={model.num_timesteps})")
+        return model, env
+
+    # --------------------
+    # Helpers
+    # --------------------
+    @staticmethod
+    def _recent_reward(model) -> Optional[float]:
+        buffer = getattr(model, "ep_info_buffer", None)
+        if not buffer:
+            return None
+        return float(np.mean([info["r"] for info in buffer]))
+
+    def _legacy_latest(self) -> Optional[dict]:
+        # {step}.zip files written by the old training loops (not in the manifest)
+        steps = [int(name[:-4]) for name in os.listdir(self.models_dir)
+                 if name.endswith(".zip") and name[:-4].isdigit()]
+        if not steps:
+            return None
+        step = max(steps)
+        entry = {"step": step, "score": None, "files": {"model": f"{self.models_dir}/{step}.zip"}}
+        vec_path = f"{self.vecnormalize_dir}/{step}.pkl"
+        if self.vecnormalize_dir is not None and os.path.exists(vec_path):
+            entry["files"]["vecnormalize"] = vec_path
+        return entry
+
+    def _apply_retention(self) -> None:
+        by_step = sorted(self.entries, key=lambda e: e["step"])
+        keep = {e["step"] for e in by_step[-self.keep_last:]}
+        scored = sorted((e for e in self.entries if e.get("score") is not None), key=lambda e: e["score"])
+        if self.keep_best:
+            keep |= {e["step"] for e in scored[-self.keep_best:]}
+
+        for entry in self.entries:
+            if entry["step"] in keep:
+                continue
+            for path in entry["files"].values():
+                if os.path.exists(path):
+                    os.remove(path)
+        self.entries = [e for e in by_step if e["step"] in keep]
+
+    def _read_manifest(self) -> List[dict]:
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path) as f:
+            return json.load(f)["checkpoints"]
+
+    def _write_manifest(self) -> None:
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"checkpoints": self.entries}, f, indent=2)
+        _atomic_replace(tmp_path, self.manifest_path)
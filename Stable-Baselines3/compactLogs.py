@@ -0,0 +1,305 @@
+"""
+compactLogs.py
+
+Compact the TensorBoard event files of every run into one columnar .npz
+per run, and query them from scripts.
+
+> `python compactLogs.py`                                           (compact every run under pomodoro/logs)
+> `python compactLogs.py --query ep_rew_mean --runs SAC_0,PPO_0`    (compact, then print the series)
+> `python compactLogs.py --log-dir BipedalWalker/logs`
+
+A run is a folder holding events.out.tfevents.* files (SAC_0, PPO_0, ...);
+every learn() call and every restart adds a file to it. Compaction:
+ - streams the records of each file in write order (file timestamp, then
+   index) and keeps the scalars (SB3 only logs scalars)
+ - dedupes overlapping steps: a point is dropped when a later-written file
+   covers its step for the same tag (first to last step of that tag in the
+   file). A run resumed from an earlier checkpoint, or restarted from
+   scratch, replaces the old points of the steps it went through again;
+   the old points past its last step are kept
+ - writes {out_dir}/{run}.npz with, per tag, "{tag}.step" (int64),
+   "{tag}.value" (float32), "{tag}.wall_time" (float64), "{tag}.file" (index
+   of the event file of every point) and "{tag}.ranges" (first/last step of
+   the tag in every file), plus the file list and how many bytes of each
+   file were read
+
+Compaction is incremental: only new files and the new records of growing
+files are read (the kept points are the same as with a full pass).
+
+query() loads only the requested columns, e.g.
+    query("ep_rew_mean", ["SAC_0", "PPO_0"]) -> {"SAC_0": (steps, values), "PPO_0": (steps, values)}
+"""
+
+import argparse
+import os
+import struct
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from tensorboard.compat.proto.event_pb2 import Event
+
+
+EVENT_PREFIX = "events.out.tfevents."
+EMPTY_RANGE = (np.iinfo(np.int64).max, np.iinfo(np.int64).min)
+
+
+# --------------------
+# Reading event files
+# --------------------
+def _write_order(name: str):
+    # events.out.tfevents.<timestamp>.<host>.<pid>.<index>
+    parts = name[len(EVENT_PREFIX):].split(".")
+    timestamp = int(parts[0]) if parts[0].isdigit() else 0
+    index = int(parts[-1]) if parts[-1].isdigit() else 0
+    return timestamp, index, name
+
+
+def event_files(run_dir: str) -> List[str]:
+    """Names of the event files of a run, in write order."""
+    return sorted((n for n in os.listdir(run_dir) if n.startswith(EVENT_PREFIX)), key=_write_order)
+
+
+def find_runs(log_dir: str) -> List[str]:
+    """Runs under log_dir (folders holding event files), as paths relative to log_dir."""
+    runs = []
+    for root, _, files in os.walk(log_dir):
+        if any(name.startswith(EVENT_PREFIX) for name in files):
+            runs.append(os.path.relpath(root, log_dir).replace(os.sep, "/"))
+    return sorted(runs)
+
+
+def iter_records(path: str, offset: int = 0) -> Iterator[Tuple[bytes, int]]:
+    """
+    (record, end offset) of every complete TFRecord of an event file from `offset` on.
+    An incomplete record at the end (a writer still running) is left for the next pass.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(12)  # uint64 length, uint32 crc of the length
+            if len(header) < 12:
+                return
+            (length,) = struct.unpack("<Q", header[:8])
+            data = f.read(length)
+            footer = f.read(4)   # uint32 crc of the data
+            if len(data) < length or len(footer) < 4:
+                return
+            offset += 16 + length
+            yield data, offset
+
+
+def _scalar(value) -> Optional[float]:
+    kind = value.WhichOneof("value")
+    if kind == "simple_value":
+        return value.simple_value
+    if kind == "tensor" and value.metadata.plugin_data.plugin_name == "scalars":
+        from tensorboard.util import tensor_util
+        return float(tensor_util.make_ndarray(value.tensor))
+    return None
+
+
+def read_scalars(path: str, offset: int = 0) -> Tuple[Dict[str, tuple], int]:
+    """Scalars of an event file from `offset` on: ({tag: (steps, values, wall_times)}, end offset)."""
+    series: Dict[str, tuple] = {}
+    end = offset
+    for data, end in iter_records(path, offset):
+        event = Event.FromString(data)
+        for value in event.summary.value:
+            scalar = _scalar(value)
+            if scalar is None:
+                continue
+            if value.tag not in series:
+                series[value.tag] = ([], [], [])
+            steps, values, wall_times = series[value.tag]
+            steps.append(event.step)
+            values.append(scalar)
+            wall_times.append(event.wall_time)
+    return series, end
+
+
+def overlap_mask(steps: np.ndarray, files: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+    """
+    steps, files: step and event file index of every point
+    ranges: (n_files, 2) first/last step of every file
+    Mask of the points whose step no later file covers.
+    """
+    keep = np.ones(len(steps), dtype=bool)
+    for j, (low, high) in enumerate(ranges):
+        if low <= high:
+            keep &= ~((files < j) & (steps >= low) & (steps <= high))
+    return keep
+
+
+# --------------------
+# Compaction
+# --------------------
+class CompactRun:
+    """One compacted run: per-tag columns, loaded lazily from the .npz."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = np.load(path)
+        self.tags: List[str] = [str(t) for t in self.data["tags"]]
+        self.files: List[str] = [str(f) for f in self.data["files"]]
+        self.offsets: List[int] = [int(o) for o in self.data["offsets"]]
+
+    def resolve(self, tag: str) -> str:
+        """Full tag name: `tag` itself, or the only tag ending with "/tag" (ep_rew_mean -> rollout/ep_rew_mean)."""
+        if tag in self.tags:
+            return tag
+        matches = [t for t in self.tags if t.endswith("/" + tag)]
+        if len(matches) != 1:
+            raise KeyError(f"{'Ambiguous' if matches else 'Unknown'} tag {tag!r} in {self.path}, tags: {self.tags}")
+        return matches[0]
+
+    def series(self, tag: str, wall_time: bool = False):
+        """(steps, values) of a tag, plus the wall times if `wall_time`."""
+        tag = self.resolve(tag)
+        out = (self.data[f"{tag}.step"], self.data[f"{tag}.value"])
+        return out + (self.data[f"{tag}.wall_time"],) if wall_time else out
+
+    def columns(self) -> Tuple[Dict[str, tuple], Dict[str, np.ndarray]]:
+        """{tag: (steps, values, wall_times, files)} as stored, and {tag: ranges}."""
+        columns = {tag: self.series(tag, wall_time=True) + (self.data[f"{tag}.file"],) for tag in self.tags}
+        return columns, {tag: self.data[f"{tag}.ranges"] for tag in self.tags}
+
+    def close(self) -> None:
+        self.data.close()
+
+
+def compact_run(run_dir: str, out_path: str, force: bool = False) -> dict:
+    """
+    Compact one run folder into out_path (incrementally if out_path exists).
+    Returns {"points", "dropped", "read_bytes", "files", "status"} (dropped: overlapping points removed in this pass).
+    """
+    files = event_files(run_dir)
+    sizes = [os.path.getsize(os.path.join(run_dir, name)) for name in files]
+
+    # Start from the previous compaction if its files are a prefix of the current ones
+    columns: Dict[str, tuple] = {}
+    ranges: Dict[str, np.ndarray] = {}
+    offsets = [0] * len(files)
+    if not force and os.path.exists(out_path):
+        previous = CompactRun(out_path)
+        known = len(previous.files)
+        if previous.files == files[:known] and all(o <= s for o, s in zip(previous.offsets, sizes)):
+            columns, ranges = previous.columns()
+            offsets[:known] = previous.offsets
+        previous.close()
+        if columns and offsets == sizes:
+            return {"points": sum(len(c[0]) for c in columns.values()), "dropped": 0, "read_bytes": 0,
+                    "files": len(files), "status": "unchanged"}
+
+    pieces: Dict[str, List[tuple]] = {tag: [c] for tag, c in columns.items()}
+    for tag, r in ranges.items():
+        ranges[tag] = np.concatenate([r, np.tile(EMPTY_RANGE, (len(files) - len(r), 1))])
+
+    # Stream the new records, oldest file first
+    read_bytes = 0
+    for i, name in enumerate(files):
+        if offsets[i] == sizes[i]:
+            continue
+        series, end = read_scalars(os.path.join(run_dir, name), offsets[i])
+        read_bytes += end - offsets[i]
+        offsets[i] = end
+        for tag, (steps, values, wall_times) in series.items():
+            steps = np.asarray(steps, dtype=np.int64)
+            pieces.setdefault(tag, []).append((
+                steps,
+                np.asarray(values, dtype=np.float32),
+                np.asarray(wall_times, dtype=np.float64),
+                np.full(len(steps), i, dtype=np.int32),
+            ))
+            r = ranges.setdefault(tag, np.tile(EMPTY_RANGE, (len(files), 1)))
+            r[i] = min(r[i, 0], steps.min()), max(r[i, 1], steps.max())
+
+    arrays = {}
+    points = dropped = 0
+    for tag, parts in pieces.items():
+        steps, values, wall_times, file_index = (np.concatenate(column) for column in zip(*parts))
+        keep = overlap_mask(steps, file_index, ranges[tag])
+        # Stored by step (the order does not matter to the dedupe, file_index keeps the write order)
+        keep = np.flatnonzero(keep)[np.lexsort((file_index[keep], steps[keep]))]
+        arrays[f"{tag}.step"] = steps[keep]
+        arrays[f"{tag}.value"] = values[keep]
+        arrays[f"{tag}.wall_time"] = wall_times[keep]
+        arrays[f"{tag}.file"] = file_index[keep]
+        arrays[f"{tag}.ranges"] = ranges[tag]
+        points += len(keep)
+        dropped += len(steps) - len(keep)
+
+    # Write to a temp file first so a crash never leaves a half-written run
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = out_path + ".tmp.npz"
+    np.savez(tmp_path, tags=np.array(sorted(pieces), dtype=str), files=np.array(files, dtype=str),
+             offsets=np.array(offsets, dtype=np.int64), **arrays)
+    os.replace(tmp_path, out_path)
+    return {"points": points, "dropped": dropped, "read_bytes": read_bytes, "files": len(files),
+            "status": "updated" if columns else "compacted"}
+
+
+def default_out_dir(log_dir: str) -> str:
+    """pomodoro/logs -> pomodoro/logs_compact"""
+    return os.path.normpath(log_dir) + "_compact"
+
+
+def compact_logs(log_dir: str = "pomodoro/logs", out_dir: Optional[str] = None, force: bool = False) -> Dict[str, dict]:
+    """Compact every run under log_dir into {out_dir}/{run}.npz. Returns the stats of each run."""
+    out_dir = out_dir or default_out_dir(log_dir)
+    return {
+        run: compact_run(os.path.join(log_dir, run), os.path.join(out_dir, run + ".npz"), force)
+        for run in find_runs(log_dir)
+    }
+
+
+# --------------------
+# Query
+# --------------------
+def query(tag: str, runs: Iterable[str], out_dir: str = "pomodoro/logs_compact") -> Dict[str, tuple]:
+    """{run: (steps, values)} of one tag (full name or last component) for several compacted runs."""
+    result = {}
+    for run in runs:
+        compact = CompactRun(os.path.join(out_dir, run + ".npz"))
+        result[run] = compact.series(tag)
+        compact.close()
+    return result
+
+
+def _print_series(run: str, steps: np.ndarray, values: np.ndarray, rows: int) -> None:
+    print(f"{run}: {len(steps)} points" + (f", steps {steps[0]}-{steps[-1]}" if len(steps) else ""))
+    if len(steps) == 0 or rows <= 0:
+        return
+    for i in np.unique(np.linspace(0, len(steps) - 1, min(rows, len(steps))).astype(np.int64)):
+        print(f"  {steps[i]:>10d} {values[i]:12.4f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-dir", default="pomodoro/logs")
+    parser.add_argument("--out-dir", default=None, help="default: <log-dir>_compact")
+    parser.add_argument("--force", action="store_true", help="recompact every run from scratch")
+    parser.add_argument("--query", default=None, help="tag to print, e.g. ep_rew_mean or rollout/ep_rew_mean")
+    parser.add_argument("--runs", default="", help="comma separated runs for --query (default: all)")
+    parser.add_argument("--rows", type=int, default=10, help="points printed per run (evenly spaced)")
+    args = parser.parse_args(argv)
+    out_dir = args.out_dir or default_out_dir(args.log_dir)
+
+    start = time.perf_counter()
+    stats = compact_logs(args.log_dir, out_dir, args.force)
+    print(f"{len(stats)} runs of {args.log_dir} -> {out_dir} in {1000 * (time.perf_counter() - start):.1f} ms")
+    print(f"{'run':24s} {'files':>6s} {'read KB':>8s} {'points':>8s} {'dropped':>8s}  status")
+    for run, s in stats.items():
+        print(f"{run:24s} {s['files']:6d} {s['read_bytes'] / 1024:8.1f} {s['points']:8d} {s['dropped']:8d}  {s['status']}")
+
+    if args.query:
+        runs = [r for r in args.runs.split(",") if r] or list(stats)
+        start = time.perf_counter()
+        result = query(args.query, runs, out_dir)
+        print(f"\n{args.query} ({1000 * (time.perf_counter() - start):.2f} ms)")
+        for run, (steps, values) in result.items():
+            _print_series(run, steps, values, args.rows)
+
+
+if __name__ == "__main__":
+    main()
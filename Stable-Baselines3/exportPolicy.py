@@ -0,0 +1,171 @@
+'''
+Export a trained actor to a torch-free .npz file for policyRunner.PolicyRunner.
+
+> `python exportPolicy.py --algorithm SAC --step 10000`
+
+Reads  pomodoro/<ALG>/models/<step>.zip and pomodoro/<ALG>/VecEnv/<step>.pkl
+Writes pomodoro/<ALG>/export/<step>.npz
+
+After writing, the NumPy runner is checked against the deterministic
+torch prediction on random observations.
+'''
+import os
+import pickle
+import hashlib
+import argparse
+
+import numpy as np
+
+from policyRunner import PolicyRunner
+
+
+ALGORITHMS = ["A2C", "PPO", "SAC"]
+TOLERANCE = 1e-4
+
+
+def checkpoint_paths(algorithm, step, root='pomodoro'):
+    """(model zip, VecNormalize pkl, exported npz) of a checkpoint under `root`."""
+    base = root + '/' + algorithm
+    return (
+        f"{base}/models/{step}.zip",
+        f"{base}/VecEnv/{step}.pkl",
+        f"{base}/export/{step}.npz",
+    )
+
+
+def find_checkpoints(root='pomodoro', algorithms=ALGORITHMS):
+    """{(algorithm, step): model zip} of every <ALG>/models/<step>.zip under `root` that has its VecEnv/<step>.pkl."""
+    checkpoints = {}
+    for algorithm in algorithms:
+        models_dir = f"{root}/{algorithm}/models"
+        if not os.path.isdir(models_dir):
+            continue
+        for name in os.listdir(models_dir):
+            step, ext = os.path.splitext(name)
+            if ext != ".zip" or not step.isdigit():
+                continue
+            if os.path.exists(checkpoint_paths(algorithm, step, root)[1]):
+                checkpoints[(algorithm, int(step))] = f"{models_dir}/{name}"
+    return checkpoints
+
+
+def sha256_files(paths):
+    """sha256 of the contents of `paths`, read in order."""
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def checkpoint_hash(algorithm, step, root='pomodoro'):
+    """sha256 of the model zip + VecNormalize pkl, used to detect a changed checkpoint."""
+    model_path, vector_path, _ = checkpoint_paths(algorithm, step, root)
+    return sha256_files((model_path, vector_path))
+
+
+def _linear_layers(module):
+    import torch.nn as nn
+    return [layer for layer in module if isinstance(layer, nn.Linear)]
+
+
+def _activation(module):
+    import torch.nn as nn
+    for layer in module:
+        if isinstance(layer, nn.ReLU):
+            return "relu"
+        if isinstance(layer, nn.Tanh):
+            return "tanh"
+    raise ValueError(f"Unsupported activation in {module}")
+
+
+def _load_model(algorithm, model_path):
+    from stable_baselines3 import A2C, PPO, SAC
+    algos = {"A2C": A2C, "PPO": PPO, "SAC": SAC}
+    return algos[algorithm].load(model_path, device="cpu")
+
+
+def export_policy(algorithm, step, out_path=None, check=True):
+    """
+    Write the actor of pomodoro/<algorithm>/models/<step>.zip to an .npz file.
+    Returns the output path.
+    """
+    from pomodoro.pomodoroEnv import PomodoroEnv
+
+    assert algorithm in ALGORITHMS, f"Unknown algorithm {algorithm!r}, expected one of {ALGORITHMS}"
+    model_path, vector_path, default_out = checkpoint_paths(algorithm, step)
+    out_path = out_path or default_out
+
+    model = _load_model(algorithm, model_path)
+    policy = model.policy
+
+    # Actor MLP: hidden layers + the layer producing the action mean
+    if algorithm == "SAC":
+        hidden = policy.actor.latent_pi
+        layers = _linear_layers(hidden) + [policy.actor.mu]
+        squash_output = True
+    else:
+        hidden = policy.mlp_extractor.policy_net
+        layers = _linear_layers(hidden) + [policy.action_net]
+        squash_output = False
+
+    # Observation statistics (no venv needed, it is not pickled with VecNormalize)
+    with open(vector_path, "rb") as f:
+        vec_normalize = pickle.load(f)
+
+    envRoot = PomodoroEnv()
+
+    arrays = {
+        "n_layers": np.array(len(layers)),
+        "activation": np.array(_activation(hidden)),
+        "squash_output": np.array(squash_output),
+        "obs_mean": vec_normalize.obs_rms.mean.astype(np.float32),
+        "obs_var": vec_normalize.obs_rms.var.astype(np.float32),
+        "epsilon": np.array(vec_normalize.epsilon),
+        "clip_obs": np.array(vec_normalize.clip_obs),
+        "action_low": np.array([envRoot.min_work, envRoot.min_break], dtype=np.float32),
+        "action_high": np.array([envRoot.max_work, envRoot.max_break], dtype=np.float32),
+        "algorithm": np.array(algorithm),
+        "step": np.array(int(step)),
+        "source_hash": np.array(checkpoint_hash(algorithm, step)),
+    }
+    for i, layer in enumerate(layers):
+        arrays[f"W{i}"] = layer.weight.detach().cpu().numpy().T.astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    np.savez(out_path, **arrays)
+
+    if check:
+        error = compare_with_torch(out_path, model, vec_normalize)
+        assert error <= TOLERANCE, f"Exported policy differs from torch by {error:.2e} (> {TOLERANCE:.0e})"
+
+    return out_path
+
+
+def compare_with_torch(npz_path, model, vec_normalize, n=4096, seed=0):
+    """Max abs difference (in [-1, 1] action units) between the NumPy runner and model.predict."""
+    runner = PolicyRunner.load(npz_path)
+    rng = np.random.default_rng(seed)
+    obs_real = np.stack([
+        rng.uniform(1, 5, n),
+        rng.uniform(0, 480, n),
+        rng.uniform(0, 180, n),
+    ], axis=1).astype(np.float32)
+
+    obs_norm = vec_normalize.normalize_obs(obs_real)
+    action_torch, _states = model.predict(obs_norm, deterministic=True)
+    action_numpy = runner.predict_norm(runner.normalize_obs(obs_real))
+    return float(np.abs(action_torch - action_numpy).max())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="SAC")
+    parser.add_argument("--step", type=int, default=10000)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    path = export_policy(args.algorithm, args.step, args.out)
+    print("exported:", path, f"({os.path.getsize(path) / 1024:.0f} KB)")
@@ -0,0 +1,131 @@
+"""
+fitUserProfile.py
+
+Estimate PomodoroEnv.user_profile from the API's session logs (sessionLog.py).
+
+> `python fitUserProfile.py`
+> `python fitUserProfile.py --log-dir pomodoro/sessions --out pomodoro/fitted_profile.json`
+
+One streaming pass over the logged sessions (recommendations joined with
+their outcomes, one segment at a time) fills a small count table:
+recommended work minutes x reported fatigue x outcome (kept / stopped
+early / too short). The profile is then fitted by maximum likelihood on
+that table, using PomodoroEnv's user model with the preferred work length
+integrated out (pomodoro/expectedReward.py). Apart from the ids already
+seen (8 bytes per outcome, to drop repeated outcomes), memory use does not
+grow with the size of the logs.
+
+Fitted: preferred_work_base, variability, early_stop_sensitivity,
+too_short_sensitivity, fatigue_influence. preferred_break_base never
+affects an outcome in PomodoroEnv, so it is reported unchanged.
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from sessionLog import iter_sessions
+from pomodoro import expectedReward
+from pomodoro.pomodoroEnv import PomodoroEnv
+
+FITTED_KEYS = ["preferred_work_base", "variability", "early_stop_sensitivity", "too_short_sensitivity", "fatigue_influence"]
+BOUNDS = {
+    "preferred_work_base": (5.0, 60.0),
+    "variability": (0.1, 15.0),
+    "early_stop_sensitivity": (0.0, 0.5),
+    "too_short_sensitivity": (0.0, 1.0),
+    "fatigue_influence": (0.0, 2.0),
+}
+
+# Outcome classes in the count table
+KEPT, STOPPED_EARLY, TOO_SHORT = 0, 1, 2
+
+
+class OutcomeCounts:
+    """Counts of outcomes per (recommended work minute, reported fatigue level)."""
+
+    def __init__(self, env: PomodoroEnv):
+        self.work = np.arange(int(env.min_work), int(env.max_work) + 1, dtype=np.float64)
+        self.fatigue = np.arange(int(env.min_fatigue), int(env.max_fatigue) + 1, dtype=np.float64)
+        self.counts = np.zeros((len(self.work), len(self.fatigue), 3), dtype=np.int64)
+        self.break_minutes = [0.0, 0]  # sum, count of actual breaks (reported only)
+
+    def add(self, chunk: dict) -> None:
+        w = np.clip(np.rint(chunk["work"]).astype(np.int64) - int(self.work[0]), 0, len(self.work) - 1)
+        f = np.clip(np.rint(chunk["fatigue"]).astype(np.int64) - int(self.fatigue[0]), 0, len(self.fatigue) - 1)
+        outcome = np.where(chunk["stopped_early"], STOPPED_EARLY, np.where(chunk["too_short"], TOO_SHORT, KEPT))
+        np.add.at(self.counts, (w, f, outcome), 1)
+        self.break_minutes[0] += float(np.sum(chunk["actual_break"]))
+        self.break_minutes[1] += len(outcome)
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+
+# --------------------
+# Model
+# --------------------
+def outcome_probabilities(profile: dict, work: np.ndarray, fatigue: np.ndarray, max_fatigue: float) -> np.ndarray:
+    """(len(work), len(fatigue), 3) probabilities of KEPT / STOPPED_EARLY / TOO_SHORT under PomodoroEnv's user model."""
+    return np.stack(expectedReward.outcome_probabilities(work[:, None], fatigue[None, :], profile, max_fatigue), axis=-1)
+
+
+def log_likelihood(profile: dict, counts: OutcomeCounts, max_fatigue: float) -> float:
+    probs = outcome_probabilities(profile, counts.work, counts.fatigue, max_fatigue)
+    return float(np.sum(counts.counts * np.log(np.maximum(probs, 1e-12))))
+
+
+def fit(counts: OutcomeCounts, start: dict, max_fatigue: float, rounds: int = 8, points: int = 21) -> dict:
+    """Coordinate-wise grid search, shrinking every parameter's search range each round."""
+    profile = dict(start)
+    width = {key: (high - low) for key, (low, high) in BOUNDS.items()}
+    best = log_likelihood(profile, counts, max_fatigue)
+    for _ in range(rounds):
+        for key in FITTED_KEYS:
+            low, high = BOUNDS[key]
+            candidates = np.linspace(max(low, profile[key] - width[key] / 2), min(high, profile[key] + width[key] / 2), points)
+            for value in candidates:
+                trial = {**profile, key: float(value)}
+                score = log_likelihood(trial, counts, max_fatigue)
+                if score > best:
+                    best, profile = score, trial
+            width[key] /= 3.0
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-dir", default="pomodoro/sessions")
+    parser.add_argument("--min-sessions", type=int, default=200, help="refuse to fit on fewer joined sessions")
+    parser.add_argument("--out", default=None, help="write the fitted user_profile JSON here")
+    args = parser.parse_args(argv)
+
+    env = PomodoroEnv()
+    counts = OutcomeCounts(env)
+    for chunk in iter_sessions(args.log_dir):
+        counts.add(chunk)
+
+    print(f"{counts.total} sessions with an outcome")
+    if counts.total < args.min_sessions:
+        raise SystemExit(f"Not enough sessions to fit a profile (need --min-sessions={args.min_sessions})")
+
+    profile = fit(counts, env.user_profile, env.max_fatigue)
+    before = log_likelihood(env.user_profile, counts, env.max_fatigue) / counts.total
+    after = log_likelihood(profile, counts, env.max_fatigue) / counts.total
+
+    print(f"log-likelihood per session: default {before:.4f} -> fitted {after:.4f}")
+    for key in FITTED_KEYS:
+        print(f"  {key:24s} {env.user_profile[key]:8.3f} -> {profile[key]:8.3f}")
+    if counts.break_minutes[1]:
+        print(f"  mean actual break: {counts.break_minutes[0] / counts.break_minutes[1]:.1f} min")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(profile, f, indent=2)
+        print("profile:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+lookupTable.py
+
+Precomputed /pomodoro answers for the whole integer input domain.
+
+The API receives integer fatigue (1-5), work minutes (0-480) and break
+minutes (0-180): 5 * 481 * 181 = 435,305 possible observations. The
+deterministic policy maps each one to a fixed (work, break) pair, so we
+evaluate it once over the grid and keep the result as a uint8 array of
+shape (5, 481, 181, 2) (~850 KB), memory-mapped at startup.
+
+The file name carries the hash of the checkpoint the policy was exported
+from, so a new checkpoint automatically gets a new table.
+"""
+
+import glob
+import os
+import secrets
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+FATIGUE_RANGE = (1, 5)
+WORK_RANGE = (0, 8 * 60)
+BREAK_RANGE = (0, 3 * 60)
+
+BUILD_BATCH_SIZE = 16384
+
+
+def table_path(policy_path: str, source_hash: str) -> str:
+    """pomodoro/SAC/export/10000.npz -> pomodoro/SAC/export/10000.<hash>.table.npy"""
+    base, _ = os.path.splitext(policy_path)
+    return f"{base}.{source_hash[:16]}.table.npy"
+
+
+def grid_observations(fatigue: int) -> np.ndarray:
+    """Every (work, break) observation of the grid for one fatigue level, as a (W*B, 3) array."""
+    work, brk = np.meshgrid(
+        np.arange(WORK_RANGE[0], WORK_RANGE[1] + 1, dtype=np.float32),
+        np.arange(BREAK_RANGE[0], BREAK_RANGE[1] + 1, dtype=np.float32),
+        indexing="ij",
+    )
+    return np.stack([np.full(work.size, fatigue, dtype=np.float32), work.ravel(), brk.ravel()], axis=1)
+
+
+def build_table(predict_fn, path: str) -> np.ndarray:
+    """
+    Evaluate predict_fn ((B, 3) observations -> (B, 2) minutes) over the grid
+    and save it to `path` as uint8 (minutes are truncated like int() in main2.py).
+    """
+    n_work = WORK_RANGE[1] - WORK_RANGE[0] + 1
+    n_break = BREAK_RANGE[1] - BREAK_RANGE[0] + 1
+    fatigues = range(FATIGUE_RANGE[0], FATIGUE_RANGE[1] + 1)
+    table = np.zeros((len(fatigues), n_work, n_break, 2), dtype=np.uint8)
+
+    for i, fatigue in enumerate(fatigues):
+        obs = grid_observations(fatigue)
+        out = np.empty((len(obs), 2), dtype=np.float32)
+        for start in range(0, len(obs), BUILD_BATCH_SIZE):
+            out[start:start + BUILD_BATCH_SIZE] = predict_fn(obs[start:start + BUILD_BATCH_SIZE])
+        assert out.min() >= 0 and out.max() < 256, "Recommendations do not fit in uint8"
+        table[i] = np.floor(out).astype(np.uint8).reshape(n_work, n_break, 2)
+
+    # Write to a temp file first so a crash never leaves a half-written table; the
+    # name is unique per process so workers building the same table never share it
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}-{secrets.token_hex(4)}.tmp.npy"
+    np.save(tmp_path, table)
+    os.replace(tmp_path, path)
+    return table
+
+
+class LookupTable:
+    """Memory-mapped (fatigue, work, break) -> (work, break) table."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.table = np.load(path, mmap_mode="r")
+
+    @classmethod
+    def load_or_build(cls, predict_fn, policy_path: str, source_hash: str) -> "LookupTable":
+        """Load the table for this checkpoint, building it (and dropping stale ones) if needed."""
+        path = table_path(policy_path, source_hash)
+        if not os.path.exists(path):
+            # Other workers may be sweeping (or have just built `path`) at the same time
+            base, _ = os.path.splitext(policy_path)
+            for stale in glob.glob(f"{base}.*.table.npy"):
+                if os.path.abspath(stale) == os.path.abspath(path):
+                    continue
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            if not os.path.exists(path):
+                build_table(predict_fn, path)
+        return cls(path)
+
+    def lookup(self, fatigue: int, work_minutes_day: int, break_minutes_day: int) -> Optional[Tuple[int, int]]:
+        """(work, break) for an in-grid observation, None otherwise."""
+        if not (FATIGUE_RANGE[0] <= fatigue <= FATIGUE_RANGE[1]
+                and WORK_RANGE[0] <= work_minutes_day <= WORK_RANGE[1]
+                and BREAK_RANGE[0] <= break_minutes_day <= BREAK_RANGE[1]):
+            return None
+        work, brk = self.table[
+            fatigue - FATIGUE_RANGE[0],
+            work_minutes_day - WORK_RANGE[0],
+            break_minutes_day - BREAK_RANGE[0],
+        ]
+        return int(work), int(brk)
+
+    def lookup_batch(self, obs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        obs: (B, 3) integer observations
+        returns: (B, 2) answers and a (B,) mask of the rows that were in the grid
+        (rows outside the grid are left at 0).
+        """
+        obs = np.asarray(obs, dtype=np.int64)
+        lows = np.array([FATIGUE_RANGE[0], WORK_RANGE[0], BREAK_RANGE[0]])
+        highs = np.array([FATIGUE_RANGE[1], WORK_RANGE[1], BREAK_RANGE[1]])
+        in_grid = np.all((obs >= lows) & (obs <= highs), axis=1)
+
+        out = np.zeros((len(obs), 2), dtype=np.int64)
+        idx = obs[in_grid] - lows
+        out[in_grid] = self.table[idx[:, 0], idx[:, 1], idx[:, 2]]
+        return out, in_grid
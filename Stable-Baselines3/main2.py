@@ -5,55 +5,87 @@ To stop the server, kill the terminal
 
 http://127.0.0.1:8000/docs - Swagger
 
+Session logging (on by default):
+> `POMODORO_LOG_SESSIONS=0 uvicorn main2:app`                         (off)
+> `POMODORO_SESSION_LOG_DIR=/tmp/sessions uvicorn main2:app`          (other folder)
 '''
 # -------------------------------------------------------------
 #                      Satable Baselines3
 # -------------------------------------------------------------
-from pomodoro.pomodoroEnv import PomodoroEnv
+# The actor runs from a NumPy export of the checkpoint (see exportPolicy.py),
+# so the server does not import torch / stable_baselines3.
+# Checkpoints are loaded on demand by the registry (see modelRegistry.py).
+import asyncio
+import os
 import numpy as np
-from gymnasium.wrappers import RescaleAction
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
-from stable_baselines3.common.monitor import Monitor
-from stable_baselines3 import SAC
+from modelRegistry import ModelLoadError, ModelRegistry
+from responseCache import ResponseCache
+from sessionLog import SessionLog
 
 
 step = 10000
 # algorithm = "PPO"
 algorithm = "SAC"
-models_dir = 'pomodoro/' + algorithm + "/models"
-VecEnv_dir = 'pomodoro/' + algorithm + "/VecEnv"
 
-def make_env():
-    env = PomodoroEnv()
-    env = RescaleAction(env, -1, 1)
-    env = Monitor(env)
-    return env
+# Repeated observations that the lookup table does not cover skip the model
+CACHE_SIZE = 10_000
+CACHE_TTL_SECONDS = None
+cache = ResponseCache(max_size=CACHE_SIZE, ttl_seconds=CACHE_TTL_SECONDS)
 
+# Every integer observation the API accepts is answered ahead of time (lookupTable.py)
+USE_LOOKUP_TABLE = True
+# Concurrent requests are answered with one forward pass per batch (microBatcher.py)
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 2.0
+# Number of checkpoints kept loaded at the same time
+MAX_RESIDENT_MODELS = 4
+# Write {"algorithm": "PPO", "step": 100000} here to switch the default model
+DEFAULT_MODEL_FILE = "pomodoro/default_model.json"
+# Tabular DP policy (pomodoro/dpOracle.py) answering when the default checkpoint cannot be loaded
+FALLBACK_POLICY = "pomodoro/DP/export/policy.npz"
 
+# Every recommendation (and the outcome the client reports later) is appended here (sessionLog.py);
+# these logs are the training data of fitUserProfile.py and offlineTrain.py
+LOG_SESSIONS = os.environ.get("POMODORO_LOG_SESSIONS", "1") != "0"
+SESSION_LOG_DIR = os.environ.get("POMODORO_SESSION_LOG_DIR", "pomodoro/sessions")
+session_log = SessionLog(SESSION_LOG_DIR) if LOG_SESSIONS else None
 
-env = DummyVecEnv([make_env])
-vector_path = f"{VecEnv_dir}/{step}.pkl"
-env = VecNormalize.load(vector_path, env)
-model_path = f"{models_dir}/{step}.zip"
-model = SAC.load(model_path, env=env)
-
-envRoot = PomodoroEnv()
-
-min_work, max_work = envRoot.min_work, envRoot.max_work
-min_break, max_break = envRoot.min_break, envRoot.max_break
+registry = ModelRegistry(
+    (algorithm, step),
+    max_resident=MAX_RESIDENT_MODELS,
+    use_lookup_table=USE_LOOKUP_TABLE,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_WAIT_MS,
+    default_file=DEFAULT_MODEL_FILE,
+    on_load=lambda model: cache.set_version(model.source_hash, model.step, model.algorithm),
+    fallback_policy=FALLBACK_POLICY,
+)
 
 # -------------------------------------------------------------
 #                          BACKEND
 # -------------------------------------------------------------
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
 from pydantic import BaseModel, Field
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    registry.close()
+    # Write the buffered session log rows before exiting
+    if session_log is not None:
+        session_log.close()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Pydantic model for item data
 class Pomo(BaseModel):
     work: int
     break_: int = Field(alias="break")
+    id: Optional[int] = None  # send it back with POST /pomodoro/outcome
     # model_config = {"populate_by_name": True}
 
 class Observation(BaseModel):
@@ -61,27 +93,175 @@ class Observation(BaseModel):
 	work_minutes_day: int
 	break_minutes_day: int
 
+class ObservationColumns(BaseModel):
+	# Columnar form of a list of Observation (same length lists)
+	fatigue: List[int]
+	work_minutes_day: List[int]
+	break_minutes_day: List[int]
+
+class Outcome(BaseModel):
+	# What the user actually did with recommendation `id`
+	id: int
+	actual_work: float
+	actual_break: float
+	stopped_early: bool = False
+	too_short: bool = False
+
+class ModelVersion(BaseModel):
+	algorithm: str
+	step: int
+
+
+async def get_model(algorithm: Optional[str], step: Optional[int]):
+    # Resident models are returned right away, others are loaded off the event loop
+    try:
+        model = registry.peek(algorithm, step)
+        if model is None:
+            model = await asyncio.to_thread(registry.get, algorithm, step)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ModelLoadError as e:
+        # The checkpoint exists but is broken: retrying later (after a rescan) may work
+        raise HTTPException(status_code=503, detail=str(e))
+    return model
+
+
+def log_recommendation(model, data: Observation, work: int, break_: int) -> Optional[int]:
+    if session_log is None:
+        return None
+    ids = session_log.log_recommendations(
+        [(data.fatigue, data.work_minutes_day, data.break_minutes_day)], [(work, break_)],
+        model.algorithm, model.step, model.source_hash,
+    )
+    return int(ids[0])
+
 
 
 @app.post("/pomodoro", response_model=Pomo)
-def function_name(data: Observation):
+async def function_name(data: Observation, algorithm: Optional[str] = None, step: Optional[int] = None):
+    # ?algorithm=PPO&step=100000 pins a checkpoint, otherwise the default one is used
+    model = await get_model(algorithm, step)
+
+    if model.table is not None:
+        cached = model.table.lookup(data.fatigue, data.work_minutes_day, data.break_minutes_day)
+        if cached is not None:
+            return {"work": cached[0], "break": cached[1], "id": log_recommendation(model, data, *cached)}
 
-    obs_real = np.array([[
+    key = cache.make_key(model.step, model.algorithm, data.fatigue, data.work_minutes_day, data.break_minutes_day)
+    cached = cache.get(key)
+    if cached is not None:
+        # The cached dict is shared: copy it to add this request's id
+        return {**cached, "id": log_recommendation(model, data, cached["work"], cached["break"])}
+
+    # Out of the table's grid and not seen recently: ask the model
+    obs_real = np.array([
          data.fatigue, 
          data.work_minutes_day, 
          data.break_minutes_day
-        ]], dtype=np.float32)
-    obs_norm = env.normalize_obs(obs_real)
-    action_norm, _states = model.predict(obs_norm, )
-    a = action_norm[0]
-
-    work_real  = min_work  + (a[0] + 1) * 0.5 * (max_work  - min_work)
-    break_real = min_break + (a[1] + 1) * 0.5 * (max_break - min_break)
+        ], dtype=np.float32)
+    work_real, break_real = await model.batcher.submit(obs_real)
 
     # print('obs_real:', obs_real)
-    # print('obs_norm:', obs_norm)
-    # print("action_norm:",  action_norm[0])
     # print("action_real:", work_real, break_real)
 
 
-    return {"work": int(work_real), "break": int(break_real)}
+    response = {"work": int(work_real), "break": int(break_real)}
+    cache.put(key, response)
+    return {**response, "id": log_recommendation(model, data, response["work"], response["break"])}
+
+
+@app.post("/pomodoro/outcome")
+def record_outcome(outcome: Outcome):
+    # Reported by the client once the Pomodoro is over
+    if session_log is None:
+        raise HTTPException(status_code=404, detail="Session logging is disabled")
+    try:
+        session_log.log_outcome(outcome.id, outcome.actual_work, outcome.actual_break, outcome.stopped_early, outcome.too_short)
+    except KeyError as e:
+        # Never handed out by /pomodoro
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"id": outcome.id}
+
+
+def predict_many(model, obs_real):
+    """
+    obs_real: (B, 3) integer observations
+    returns: (B, 2) integer [work, break]
+    In-grid rows come from the lookup table, the rest go through one forward pass.
+    """
+    if model.table is not None:
+        out, in_grid = model.table.lookup_batch(obs_real)
+    else:
+        out, in_grid = np.zeros((len(obs_real), 2), dtype=np.int64), np.zeros(len(obs_real), dtype=bool)
+
+    missing = ~in_grid
+    if missing.any():
+        out[missing] = model.runner.predict(obs_real[missing].astype(np.float32)).astype(np.int64)
+    return out
+
+
+@app.post("/pomodoro/batch", response_model=List[Pomo])
+async def batch_recommendations(
+    data: Union[List[Observation], ObservationColumns],
+    algorithm: Optional[str] = None,
+    step: Optional[int] = None,
+):
+    # Many users in one request: [{...}, {...}] or {"fatigue": [...], "work_minutes_day": [...], ...}
+    model = await get_model(algorithm, step)
+
+    if isinstance(data, ObservationColumns):
+        columns = (data.fatigue, data.work_minutes_day, data.break_minutes_day)
+        if len({len(c) for c in columns}) != 1:
+            raise HTTPException(status_code=422, detail="fatigue, work_minutes_day and break_minutes_day must have the same length")
+        obs_real = np.array(columns, dtype=np.int64).T.reshape(-1, 3)
+    else:
+        obs_real = np.array(
+            [(o.fatigue, o.work_minutes_day, o.break_minutes_day) for o in data], dtype=np.int64
+        ).reshape(-1, 3)
+
+    # Large batches are computed off the event loop
+    out = await asyncio.to_thread(predict_many, model, obs_real)
+
+    # Already plain ints: skip re-validating thousands of Pomo objects
+    if session_log is None:
+        return JSONResponse([{"work": w, "break": b} for w, b in out.tolist()])
+    ids = session_log.log_recommendations(obs_real, out, model.algorithm, model.step, model.source_hash)
+    return JSONResponse([{"work": w, "break": b, "id": i} for (w, b), i in zip(out.tolist(), ids.tolist())])
+
+
+@app.get("/metrics")
+def metrics():
+    models = registry.resident_models() + ([registry.fallback] if registry.fallback is not None else [])
+    batching = {f"{m.algorithm}/{m.step}": m.batcher.metrics() for m in models}
+    return {"batching": batching, "cache": cache.metrics()}
+
+
+@app.get("/models")
+def models():
+    return {
+        "default": ModelVersion(algorithm=registry.default[0], step=registry.default[1]),
+        "resident": [ModelVersion(algorithm=a, step=s) for a, s in registry.resident()],
+        "available": [ModelVersion(algorithm=a, step=s) for a, s in registry.available()],
+        "fallback": ModelVersion(algorithm=registry.fallback.algorithm, step=registry.fallback.step) if registry.fallback else None,
+    }
+
+
+@app.post("/admin/default", response_model=ModelVersion)
+def set_default_model(version: ModelVersion):
+    # sync endpoint: loading runs in the threadpool while requests keep being served
+    try:
+        model = registry.set_default(version.algorithm, version.step)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ModelLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return ModelVersion(algorithm=model.algorithm, step=model.step)
+
+
+@app.post("/admin/rescan")
+def rescan_models():
+    try:
+        available = registry.rescan()
+    except ModelLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"available": [ModelVersion(algorithm=a, step=s) for a, s in available]}
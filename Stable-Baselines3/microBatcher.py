@@ -0,0 +1,131 @@
+"""
+microBatcher.py
+
+Async micro-batching for the /pomodoro endpoint.
+
+Concurrent requests put their observation in a queue. A single background
+task takes whatever arrived within `max_wait_ms` (or up to `max_batch_size`
+items), runs the model once on the stacked (B, 3) array and resolves each
+request's future with its own row of the result.
+"""
+
+import asyncio
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    predict_fn: (B, obs_dim) float32 array -> (B, ...) array, one row per observation
+    max_batch_size: run as soon as this many requests are waiting
+    max_wait_ms: or when the oldest request has waited this long
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        *,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        assert max_batch_size > 0, "Invalid batch size: max_batch_size must be > 0"
+        assert max_wait_ms >= 0, "Invalid wait: max_wait_ms must be >= 0"
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_predict_time = 0.0
+
+    async def submit(self, obs_row) -> np.ndarray:
+        """Queue one observation and wait for its prediction."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((np.asarray(obs_row, dtype=np.float32), time.perf_counter(), future))
+        return await future
+
+    def metrics(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "mean_queue_wait_ms": 1000.0 * self.total_queue_wait / self.requests if self.requests else 0.0,
+            "max_queue_wait_ms": 1000.0 * self.max_queue_wait,
+            "mean_predict_ms": 1000.0 * self.total_predict_time / self.batches if self.batches else 0.0,
+        }
+
+    # --------------------
+    # Helpers
+    # --------------------
+    def _ensure_started(self) -> None:
+        # Queue and task are bound to the running event loop, so they are created lazily
+        # A restarted task keeps the queue (and the requests waiting in it) of the same loop
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._queue = asyncio.Queue()
+            self._loop = loop
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block until a first request arrives, then collect for at most max_wait
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Anything already queued rides along for free
+            while len(items) < self.max_batch_size and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+
+            try:
+                await self._run_batch(loop, items)
+            except asyncio.CancelledError:
+                for _, _, future in items:
+                    future.cancel()
+                raise
+            except Exception as e:
+                # Every request of the batch gets the error, none is left waiting
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _run_batch(self, loop, items) -> None:
+        start = time.perf_counter()
+        batch = np.stack([obs for obs, _, _ in items])
+        # Run the model off the event loop so new requests keep queueing meanwhile
+        results = await loop.run_in_executor(None, self.predict_fn, batch)
+        end = time.perf_counter()
+
+        for i, (_, queued_at, future) in enumerate(items):
+            wait = start - queued_at
+            self.total_queue_wait += wait
+            self.max_queue_wait = max(self.max_queue_wait, wait)
+            if not future.done():
+                future.set_result(results[i])
+
+        self.requests += len(items)
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(items))
+        self.total_predict_time += end - start
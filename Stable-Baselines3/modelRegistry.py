@@ -0,0 +1,341 @@
+"""
+modelRegistry.py
+
+Serve several checkpoints from one process and switch between them
+without restarting uvicorn.
+
+The registry scans pomodoro/{A2C,PPO,SAC}/models for <step>.zip files that
+have a matching VecEnv/<step>.pkl. A checkpoint is only loaded when it is
+first requested (exported to .npz if needed, see exportPolicy.py) and at
+most `max_resident` of them are kept in memory, least recently used first
+out. The default checkpoint is never evicted. Loading happens outside the
+registry lock, so resident models keep answering while another one loads.
+
+The default can be swapped:
+ - with set_default() (used by the admin endpoint), or
+ - by writing {"algorithm": "PPO", "step": 100000} to the default file,
+   which a background thread checks every `watch_interval` seconds (and
+   loads from, off the event loop).
+The new model is fully loaded before the swap, so in-flight requests keep
+using the old one and nothing is dropped.
+
+With a `fallback_policy` (a TabularPolicy .npz, e.g. the DP oracle of
+pomodoro/dpOracle.py), requests that do not pin a version are answered from
+it while the default checkpoint is missing or fails to load; loading is
+retried every `retry_interval` seconds. Pinned versions are never replaced.
+
+Unknown checkpoints raise KeyError, checkpoints that fail to load raise
+ModelLoadError.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from exportPolicy import checkpoint_hash, checkpoint_paths, find_checkpoints
+from lookupTable import LookupTable
+from microBatcher import MicroBatcher
+from policyRunner import PolicyRunner
+from tabularPolicy import TabularPolicy
+
+
+ModelKey = Tuple[str, int]  # (algorithm, step)
+
+
+class ModelLoadError(Exception):
+    """A checkpoint whose files exist but could not be loaded (corrupt zip/pkl, failed export, ...)."""
+
+
+class LoadedModel:
+    """Everything needed to answer requests with one checkpoint."""
+
+    def __init__(self, algorithm: str, step: int, use_lookup_table: bool, max_batch_size: int, max_wait_ms: float):
+        self.algorithm = algorithm
+        self.step = step
+        self.source_hash = checkpoint_hash(algorithm, step)
+
+        _, _, policy_path = checkpoint_paths(algorithm, step)
+        if not os.path.exists(policy_path) or PolicyRunner.load(policy_path).source_hash != self.source_hash:
+            # First load for this checkpoint (or it was retrained): export it (needs torch once)
+            from exportPolicy import export_policy
+            export_policy(algorithm, step, policy_path)
+
+        self.runner = PolicyRunner.load(policy_path)
+        self.table = (
+            LookupTable.load_or_build(self.runner.predict, policy_path, self.source_hash)
+            if use_lookup_table else None
+        )
+        self.batcher = MicroBatcher(self.runner.predict, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    @property
+    def key(self) -> ModelKey:
+        return (self.algorithm, self.step)
+
+
+class FallbackModel:
+    """A TabularPolicy served like a LoadedModel (table, batcher and runner)."""
+
+    def __init__(self, policy_path: str, use_lookup_table: bool, max_batch_size: int, max_wait_ms: float):
+        self.runner = TabularPolicy.load(policy_path)
+        self.algorithm = self.runner.algorithm
+        self.step = self.runner.step
+        self.source_hash = self.runner.source_hash
+        self.table = (
+            LookupTable.load_or_build(self.runner.predict, policy_path, self.source_hash)
+            if use_lookup_table else None
+        )
+        self.batcher = MicroBatcher(self.runner.predict, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    @property
+    def key(self) -> ModelKey:
+        return (self.algorithm, self.step)
+
+
+ServedModel = Union[LoadedModel, FallbackModel]
+
+
+class ModelRegistry:
+    """
+    root: directory holding the <ALG>/models and <ALG>/VecEnv folders
+    default: (algorithm, step) served when a request does not pin a version
+    max_resident: number of checkpoints kept loaded
+    default_file: optional JSON file watched for default changes
+    on_load: called with each LoadedModel right after it is loaded
+    fallback_policy: optional TabularPolicy .npz for unpinned requests when the default cannot be loaded
+    retry_interval: seconds before a checkpoint that failed to load is tried again
+    """
+
+    def __init__(
+        self,
+        default: ModelKey,
+        *,
+        root: str = "pomodoro",
+        max_resident: int = 4,
+        use_lookup_table: bool = True,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        default_file: Optional[str] = None,
+        watch_interval: float = 1.0,
+        on_load: Optional[Callable[[LoadedModel], None]] = None,
+        fallback_policy: Optional[str] = None,
+        retry_interval: float = 60.0,
+    ):
+        assert max_resident > 0, "Invalid registry size: max_resident must be > 0"
+
+        self.root = root
+        self.max_resident = max_resident
+        self.use_lookup_table = use_lookup_table
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.on_load = on_load
+
+        self.default_file = default_file
+        self.watch_interval = watch_interval
+        self._default_file_mtime = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self._resident: "OrderedDict[ModelKey, LoadedModel]" = OrderedDict()
+        self._loading: Dict[ModelKey, Future] = {}  # checkpoints being loaded, by the first thread that asked
+        # Only held for dict updates, never during a load (peek() must not wait on one)
+        self._lock = threading.RLock()
+
+        self.fallback: Optional[FallbackModel] = None
+        if fallback_policy is not None:
+            if os.path.exists(fallback_policy):
+                self.fallback = FallbackModel(fallback_policy, use_lookup_table, max_batch_size, max_wait_ms)
+            else:
+                print(f"[ModelRegistry] no fallback: {fallback_policy} not found (see pomodoro/dpOracle.py)")
+        self.retry_interval = retry_interval
+        self._failed: Dict[ModelKey, float] = {}  # checkpoint -> time of its last failed load
+
+        self.checkpoints: Dict[ModelKey, str] = {}
+        self.scan()
+
+        if self.fallback is None:
+            self.default = self._validate(default)
+            self.get(*self.default)
+        else:
+            # A missing or broken default is answered by the fallback until it can be loaded
+            self.default = default
+            self.get()
+
+        if default_file is not None:
+            self._check_default_file()
+            self._watcher = threading.Thread(target=self._watch_default_file, name="default-model-watch", daemon=True)
+            self._watcher.start()
+
+    def close(self) -> None:
+        """Stop watching the default file."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.watch_interval + 1.0)
+
+    # --------------------
+    # Discovery
+    # --------------------
+    def scan(self) -> List[ModelKey]:
+        """Find every checkpoint that has both a model zip and VecNormalize stats."""
+        self.checkpoints = find_checkpoints(self.root)
+        return self.available()
+
+    def available(self) -> List[ModelKey]:
+        return sorted(self.checkpoints)
+
+    def resident(self) -> List[ModelKey]:
+        return list(self._resident)
+
+    def resident_models(self) -> List[LoadedModel]:
+        return list(self._resident.values())
+
+    def rescan(self) -> List[ModelKey]:
+        """Rescan the folders and drop resident models whose files changed or disappeared."""
+        self.scan()
+        self._failed.clear()
+        stale = [
+            key for key, model in list(self._resident.items())
+            if key not in self.checkpoints or checkpoint_hash(*key) != model.source_hash
+        ]
+        with self._lock:
+            for key in stale:
+                self._resident.pop(key, None)
+        # The default must stay loaded
+        if self.default in self.checkpoints:
+            self.get(*self.default)
+        return self.available()
+
+    # --------------------
+    # Lookup
+    # --------------------
+    def peek(self, algorithm: Optional[str] = None, step: Optional[int] = None) -> Optional[ServedModel]:
+        """Resident model for the request, or None if it has to be loaded first (no I/O)."""
+        key = self._resolve(algorithm, step)
+        model = self._resident.get(key)
+        if model is None:
+            return self._fallback_for(key, algorithm is not None or step is not None)
+        with self._lock:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+        return model
+
+    def get(self, algorithm: Optional[str] = None, step: Optional[int] = None) -> ServedModel:
+        """Resident model for the request, loading it (and evicting the LRU one) if needed."""
+        key = self._resolve(algorithm, step)
+        pinned = algorithm is not None or step is not None
+        fallback = self._fallback_for(key, pinned)
+        if fallback is not None:
+            return fallback
+        self._validate(key)
+        try:
+            return self._load(key)
+        except ModelLoadError as e:
+            if self.fallback is None or pinned:
+                raise
+            self._failed[key] = time.monotonic()
+            print(f"[ModelRegistry] {e}, serving {self.fallback.algorithm}")
+            return self.fallback
+
+    def set_default(self, algorithm: str, step: int) -> LoadedModel:
+        """Load a checkpoint, then make it the default in one assignment."""
+        key = self._validate((algorithm, int(step)))
+        model = self.get(*key)
+        self.default = key
+        return model
+
+    # --------------------
+    # Helpers
+    # --------------------
+    def _load(self, key: ModelKey) -> LoadedModel:
+        """Resident model for `key`; the first thread asking loads it outside the lock, the others wait for it."""
+        with self._lock:
+            model = self._resident.get(key)
+            if model is not None:
+                self._resident.move_to_end(key)
+                return model
+            future = self._loading.get(key)
+            loader = future is None
+            if loader:
+                future = self._loading[key] = Future()
+        if not loader:
+            return future.result()
+
+        try:
+            try:
+                model = LoadedModel(key[0], key[1], self.use_lookup_table, self.max_batch_size, self.max_wait_ms)
+            except Exception as e:
+                raise ModelLoadError(f"Could not load checkpoint {key[0]}/{key[1]}: {e!r}") from e
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._loading[key]
+            self._failed.pop(key, None)
+            self._resident[key] = model
+            self._evict()
+        if self.on_load is not None:
+            self.on_load(model)
+        future.set_result(model)
+        return model
+
+    def _resolve(self, algorithm: Optional[str], step: Optional[int]) -> ModelKey:
+        default_algorithm, default_step = self.default
+        if algorithm is None and step is None:
+            return self.default
+        if algorithm is None:
+            return (default_algorithm, int(step))
+        if step is None:
+            # Latest checkpoint of that algorithm
+            steps = [s for (a, s) in self.checkpoints if a == algorithm]
+            return (algorithm, max(steps) if steps else default_step)
+        return (algorithm, int(step))
+
+    def _fallback_for(self, key: ModelKey, pinned: bool) -> Optional[FallbackModel]:
+        """The fallback if `key` cannot be served right now (unpinned requests only), None otherwise."""
+        if self.fallback is None or pinned:
+            return None
+        if key not in self.checkpoints:
+            return self.fallback
+        failed = self._failed.get(key)
+        if failed is not None and time.monotonic() - failed < self.retry_interval:
+            return self.fallback
+        return None
+
+    def _validate(self, key: ModelKey) -> ModelKey:
+        if key not in self.checkpoints:
+            raise KeyError(f"Unknown checkpoint {key[0]}/{key[1]}, available: {self.available()}")
+        return key
+
+    def _evict(self) -> None:
+        while len(self._resident) > self.max_resident:
+            for key in self._resident:
+                if key != self.default:
+                    del self._resident[key]
+                    break
+            else:
+                break
+
+    def _watch_default_file(self) -> None:
+        while not self._stop.wait(self.watch_interval):
+            self._check_default_file()
+
+    def _check_default_file(self) -> None:
+        try:
+            mtime = os.path.getmtime(self.default_file)
+        except OSError:
+            return
+        if mtime == self._default_file_mtime:
+            return
+        self._default_file_mtime = mtime
+        try:
+            with open(self.default_file) as f:
+                data = json.load(f)
+            self.set_default(data["algorithm"], int(data["step"]))
+        except (OSError, ValueError, KeyError, ModelLoadError) as e:
+            print(f"[ModelRegistry] ignoring {self.default_file}: {e}")
@@ -0,0 +1,145 @@
+"""
+offlineBuffer.py
+
+Turn the API's session logs (sessionLog.py) into an SB3 replay buffer.
+
+Every logged recommendation with an outcome becomes one transition:
+ - obs: [fatigue, work_minutes_day, break_minutes_day] as logged
+ - action: the recommended [work, break], mapped to [-1, 1] like RescaleAction
+ - reward: PomodoroEnv._compute_rewards (the simulator's reward, vectorized)
+ - next_obs: the daily totals plus the actual work/break minutes, fatigue
+   updated the way PomodoroEnv does it (the API never sees the next request
+   of the same user, so the next reported fatigue is not available)
+ - timeout: the day's work/break budget is used up (truncation, as in
+   PomodoroEnv.step; SAC still bootstraps from next_obs)
+
+The buffer arrays are .npy memory maps (np.lib.format.open_memmap) in one
+directory, so the buffer can be much larger than RAM and is filled one log
+segment at a time (see fill_from_sessions).
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.buffers import ReplayBuffer
+
+from sessionLog import iter_sessions, segment_paths
+from pomodoro.pomodoroEnv import PomodoroEnv
+
+FIELDS = ["observations", "next_observations", "actions", "rewards", "dones", "timeouts"]
+
+
+class MemmapReplayBuffer(ReplayBuffer):
+    """
+    ReplayBuffer whose arrays live in {path}/{field}.npy memory maps.
+    path: directory of the buffer files (created, existing files are overwritten)
+    The other arguments are ReplayBuffer's; only n_envs=1 and
+    optimize_memory_usage=False are supported.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int,
+        observation_space: spaces.Space,
+        action_space: spaces.Space,
+        device="auto",
+        n_envs: int = 1,
+        optimize_memory_usage: bool = False,
+        handle_timeout_termination: bool = True,
+        *,
+        path: str,
+    ):
+        assert n_envs == 1, "Invalid number of envs: MemmapReplayBuffer stores single transitions (n_envs=1)"
+        assert not optimize_memory_usage, "Invalid option: optimize_memory_usage is not supported"
+        # The in-memory arrays ReplayBuffer allocates are never written to
+        # (untouched zero pages), they are only used for their shapes and dtypes
+        super().__init__(buffer_size, observation_space, action_space, device, n_envs=n_envs,
+                         handle_timeout_termination=handle_timeout_termination)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        for name in FIELDS:
+            array = getattr(self, name)
+            setattr(self, name, np.lib.format.open_memmap(
+                f"{path}/{name}.npy", mode="w+", dtype=array.dtype, shape=array.shape,
+            ))
+
+    def extend(self, obs, next_obs, actions, rewards, dones, timeouts) -> None:
+        """Append a chunk of transitions (first axis = transition), wrapping around when full."""
+        columns = dict(zip(FIELDS, (obs, next_obs, actions, rewards, dones, timeouts)))
+        n = len(rewards)
+        start = 0
+        while start < n:
+            take = min(n - start, self.buffer_size - self.pos)
+            for name, values in columns.items():
+                getattr(self, name)[self.pos: self.pos + take] = values[start: start + take].reshape(
+                    (take,) + getattr(self, name).shape[1:])
+            self.pos += take
+            start += take
+            if self.pos == self.buffer_size:
+                self.full = True
+                self.pos = 0
+
+    def flush(self) -> None:
+        for name in FIELDS:
+            getattr(self, name).flush()
+
+
+# --------------------
+# Logged sessions -> transitions
+# --------------------
+def count_sessions(directory: str) -> int:
+    """Upper bound of the number of transitions in the logs (one per logged outcome)."""
+    return sum(len(np.load(path, mmap_mode="r")) for path in segment_paths(directory, "outcomes"))
+
+
+def session_transitions(chunk: dict, env: PomodoroEnv) -> dict:
+    """Transitions (obs, next_obs, actions, rewards, dones, timeouts) of one iter_sessions chunk."""
+    fatigue = chunk["fatigue"].astype(np.float64)
+    work_day = chunk["work_minutes_day"].astype(np.float64)
+    break_day = chunk["break_minutes_day"].astype(np.float64)
+    work = np.clip(chunk["work"].astype(np.float64), env.min_work, env.max_work)
+    break_ = np.clip(chunk["break"].astype(np.float64), env.min_break, env.max_break)
+    actual_work = chunk["actual_work"].astype(np.float64)
+    actual_break = chunk["actual_break"].astype(np.float64)
+
+    # Same fatigue update as PomodoroEnv._simulate_user_response
+    next_fatigue = np.clip(fatigue + actual_work / 60.0 - 0.6 * actual_break / 60.0, env.min_fatigue, env.max_fatigue)
+    next_work_day = work_day + actual_work
+    next_break_day = break_day + actual_break
+    truncated = (next_work_day >= env.max_work_minutes_day) | (next_break_day >= env.max_break_minutes_day)
+
+    # Inverse of RescaleAction(env, -1, 1)
+    actions = np.stack([
+        2.0 * (work - env.min_work) / (env.max_work - env.min_work) - 1.0,
+        2.0 * (break_ - env.min_break) / (env.max_break - env.min_break) - 1.0,
+    ], axis=1)
+
+    return {
+        "obs": np.stack([fatigue, work_day, break_day], axis=1).astype(np.float32),
+        "next_obs": np.stack([next_fatigue, next_work_day, next_break_day], axis=1).astype(np.float32),
+        "actions": actions.astype(np.float32),
+        "rewards": env._compute_rewards(work, actual_work, chunk["stopped_early"], chunk["too_short"]).astype(np.float32),
+        # A truncated day is done, but not terminal: SB3 bootstraps from next_obs when timeouts=1
+        "dones": truncated.astype(np.float32),
+        "timeouts": truncated.astype(np.float32),
+    }
+
+
+def fill_from_sessions(buffer: MemmapReplayBuffer, directory: str, env: Optional[PomodoroEnv] = None, obs_rms=None) -> int:
+    """
+    Stream the logged sessions of `directory` into `buffer`, one outcome segment at a time.
+    obs_rms: optional RunningMeanStd (e.g. VecNormalize.obs_rms of a new model) updated with the logged observations.
+    Returns the number of transitions added.
+    """
+    env = env or PomodoroEnv()
+    added = 0
+    for chunk in iter_sessions(directory):
+        t = session_transitions(chunk, env)
+        buffer.extend(t["obs"], t["next_obs"], t["actions"], t["rewards"], t["dones"], t["timeouts"])
+        if obs_rms is not None:
+            obs_rms.update(t["obs"])
+        added += len(t["rewards"])
+    buffer.flush()
+    return added
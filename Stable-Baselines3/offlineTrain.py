@@ -0,0 +1,135 @@
+"""
+offlineTrain.py
+
+Warm-start or fine-tune SAC on the API's logged sessions, without simulated steps.
+
+> `python offlineTrain.py`                                  (fine-tune the latest pomodoro/SAC checkpoint)
+> `python offlineTrain.py --new --bc-steps 5000 --gradient-steps 20000`
+
+1. The logged sessions (sessionLog.py) are streamed into a memory-mapped
+   replay buffer, one segment at a time (offlineBuffer.py).
+2. The model is the latest checkpoint of pomodoro/SAC (with its VecNormalize
+   statistics, kept frozen), or with --new a new SAC model whose VecNormalize
+   statistics come from the logged observations.
+3. Optional behavior cloning (--bc-steps): the actor's deterministic action
+   is regressed onto the logged recommendations.
+4. --gradient-steps SAC updates on batches sampled from the buffer.
+5. The result is saved with CheckpointManager under --out (same layout as
+   pomodoro/SAC, so pomodoroEval.py / main2.py can load it once copied there)
+   and scored on the simulator when --eval-episodes > 0.
+"""
+
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+
+import argparse
+import time
+
+import torch as th
+import torch.nn.functional as F
+from stable_baselines3 import SAC
+from stable_baselines3.common.utils import configure_logger
+from stable_baselines3.common.vec_env import VecNormalize
+
+from checkpointManager import CheckpointManager
+from offlineBuffer import MemmapReplayBuffer, count_sessions, fill_from_sessions
+from pomodoro.pomodoroEnv import PomodoroEnv
+from pomodoro.pomodoroEval import run_episodes
+from pomodoro.pomodoroVecEnv import BatchedPomodoroVecEnv
+
+algorithm = "SAC"
+models_dir = f"pomodoro/{algorithm}/models"
+VecEnv_dir = f"pomodoro/{algorithm}/VecEnv"
+logdir = "pomodoro/logs"
+
+
+def load_or_create(new: bool, seed=None):
+    """(model, VecNormalize env) to train offline; the VecNormalize statistics are not updated by training."""
+    venv = BatchedPomodoroVecEnv(1, seed=seed)
+    model, env = (None, venv) if new else CheckpointManager(models_dir, VecEnv_dir).resume(SAC, venv)
+    if model is None:
+        env = VecNormalize(venv, norm_obs=True, norm_reward=False)
+        # Same hyperparameters as pomodoroTrain.py, but one-step returns: the logs
+        # hold single Pomodoros, not whole days. buffer_size=1: replaced below.
+        model = SAC("MlpPolicy", env, verbose=1, seed=seed, learning_rate=3e-4, batch_size=64, ent_coef=0.01,
+                    buffer_size=1)
+    assert model.observation_space.shape == (3,), \
+        "Invalid model: offline training needs the 3-dim observation (models trained with --observe-profile are not supported)"
+    return model, env
+
+
+def behavior_cloning(model, buffer, steps: int, batch_size: int) -> float:
+    """Regress the actor's deterministic action onto the logged (rescaled) recommendations."""
+    actor = model.actor
+    actor.set_training_mode(True)
+    loss = th.zeros(())
+    for _ in range(steps):
+        batch = buffer.sample(batch_size, env=model._vec_normalize_env)
+        loss = F.mse_loss(actor(batch.observations, deterministic=True), batch.actions)
+        actor.optimizer.zero_grad()
+        loss.backward()
+        actor.optimizer.step()
+    actor.set_training_mode(False)
+    return loss.item()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-dir", default="pomodoro/sessions")
+    parser.add_argument("--buffer-dir", default="pomodoro/offline_buffer", help="where the memory-mapped buffer files go")
+    parser.add_argument("--buffer-size", type=int, default=None, help="keep at most this many (most recent) sessions")
+    parser.add_argument("--min-sessions", type=int, default=1000, help="refuse to train on fewer joined sessions")
+    parser.add_argument("--new", action="store_true", help="warm-start a new model instead of fine-tuning the latest checkpoint")
+    parser.add_argument("--bc-steps", type=int, default=0, help="behavior cloning steps before the SAC updates")
+    parser.add_argument("--gradient-steps", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--eval-episodes", type=int, default=1000, help="score on the simulator (0: skip)")
+    parser.add_argument("--out", default=f"pomodoro/{algorithm}/offline")
+    args = parser.parse_args(argv)
+
+    n_logged = count_sessions(args.log_dir)
+    if n_logged < args.min_sessions:
+        raise SystemExit(f"{n_logged} logged outcomes, not enough to train (need --min-sessions={args.min_sessions})")
+
+    model, env = load_or_create(args.new, args.seed)
+
+    start = time.perf_counter()
+    buffer = MemmapReplayBuffer(
+        min(n_logged, args.buffer_size or n_logged), model.observation_space, model.action_space,
+        device=model.device, path=args.buffer_dir,
+    )
+    added = fill_from_sessions(buffer, args.log_dir, PomodoroEnv(), obs_rms=env.obs_rms if args.new else None)
+    print(f"{added} transitions -> {args.buffer_dir} ({buffer.size()} kept) in {time.perf_counter() - start:.1f}s")
+    if added < args.min_sessions:
+        raise SystemExit(f"Only {added} sessions have an outcome (need --min-sessions={args.min_sessions})")
+
+    # Observation statistics are fixed from here on (the buffer normalizes with them when sampling)
+    env.training = False
+    model.replay_buffer = buffer
+    model.set_logger(configure_logger(1, logdir, f"{algorithm}_offline"))  # logs/SAC_offline_<n>
+
+    if args.bc_steps:
+        print(f"behavior cloning: {args.bc_steps} steps, final loss {behavior_cloning(model, buffer, args.bc_steps, args.batch_size):.4f}")
+
+    start = time.perf_counter()
+    done = 0
+    while done < args.gradient_steps:
+        steps = min(1000, args.gradient_steps - done)
+        model.train(gradient_steps=steps, batch_size=args.batch_size)
+        done += steps
+        model.logger.dump(done)
+    print(f"{done} gradient steps in {time.perf_counter() - start:.1f}s")
+
+    score = None
+    if args.eval_episodes:
+        score = float(run_episodes(model, env, args.eval_episodes, seed=0)["return"].mean())
+        print(f"simulator return over {args.eval_episodes} episodes: {score:.3f}")
+
+    checkpoints = CheckpointManager(f"{args.out}/models", f"{args.out}/VecEnv")
+    entry = checkpoints.save(model, env, score=score)
+    print("saved:", entry["files"]["model"])
+
+
+if __name__ == "__main__":
+    main()
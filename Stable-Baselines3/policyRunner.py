@@ -0,0 +1,110 @@
+"""
+policyRunner.py
+
+NumPy-only inference for an exported actor (see exportPolicy.py).
+
+The .npz file holds everything main2.py needs to answer /pomodoro:
+ - the actor MLP weights (W0, b0, W1, b1, ...; the last layer outputs the action mean)
+ - the activation of the hidden layers ("relu" for SAC, "tanh" for PPO/A2C)
+ - whether the action is squashed with tanh (SAC) or clipped (PPO/A2C)
+ - the VecNormalize observation statistics (mean, var, epsilon, clip_obs)
+ - the real action bounds ([min_work, min_break], [max_work, max_break])
+ - the hash of the model zip + VecNormalize pkl it was exported from
+
+No torch, stable_baselines3 or gymnasium import is needed to run it.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0.0),
+    "tanh": np.tanh,
+}
+
+
+class PolicyRunner:
+
+    def __init__(
+        self,
+        weights: List[np.ndarray],
+        biases: List[np.ndarray],
+        activation: str,
+        squash_output: bool,
+        obs_mean: np.ndarray,
+        obs_var: np.ndarray,
+        epsilon: float,
+        clip_obs: float,
+        action_low: np.ndarray,
+        action_high: np.ndarray,
+        algorithm: str = "",
+        step: int = 0,
+        source_hash: str = "",
+    ):
+        assert len(weights) == len(biases) and len(weights) > 0, "Invalid actor: need one bias per weight matrix"
+        assert activation in ACTIVATIONS, f"Unknown activation {activation!r}"
+
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activation = activation
+        self.squash_output = bool(squash_output)
+
+        # Observation normalization (same formula as VecNormalize.normalize_obs)
+        self.obs_mean = np.asarray(obs_mean, dtype=np.float32)
+        self.obs_std = np.sqrt(np.asarray(obs_var, dtype=np.float64) + epsilon).astype(np.float32)
+        self.clip_obs = float(clip_obs)
+
+        # Rescale from [-1, 1] to real minutes (same as RescaleAction)
+        self.action_low = np.asarray(action_low, dtype=np.float32)
+        self.action_high = np.asarray(action_high, dtype=np.float32)
+
+        self.algorithm = algorithm
+        self.step = int(step)
+        self.source_hash = source_hash  # hash of the checkpoint it was exported from
+
+    @classmethod
+    def load(cls, path: str) -> "PolicyRunner":
+        with np.load(path) as data:
+            n_layers = int(data["n_layers"])
+            return cls(
+                weights=[data[f"W{i}"] for i in range(n_layers)],
+                biases=[data[f"b{i}"] for i in range(n_layers)],
+                activation=str(data["activation"]),
+                squash_output=bool(data["squash_output"]),
+                obs_mean=data["obs_mean"],
+                obs_var=data["obs_var"],
+                epsilon=float(data["epsilon"]),
+                clip_obs=float(data["clip_obs"]),
+                action_low=data["action_low"],
+                action_high=data["action_high"],
+                algorithm=str(data["algorithm"]),
+                step=int(data["step"]),
+                source_hash=str(data["source_hash"]) if "source_hash" in data else "",
+            )
+
+    def normalize_obs(self, obs_real: np.ndarray) -> np.ndarray:
+        obs_norm = (np.asarray(obs_real, dtype=np.float32) - self.obs_mean) / self.obs_std
+        return np.clip(obs_norm, -self.clip_obs, self.clip_obs)
+
+    def predict_norm(self, obs_norm: np.ndarray) -> np.ndarray:
+        """Deterministic action in [-1, 1] for a (B, obs_dim) batch of normalized observations."""
+        act = ACTIVATIONS[self.activation]
+        x = np.asarray(obs_norm, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            x = x @ w + b
+            if i < last:
+                x = act(x)
+        if self.squash_output:
+            return np.tanh(x)
+        return np.clip(x, -1.0, 1.0)
+
+    def predict(self, obs_real: np.ndarray) -> np.ndarray:
+        """
+        obs_real: (B, 3) array of [fatigue, work_minutes_day, break_minutes_day]
+        returns: (B, 2) array of [work_minutes, break_minutes]
+        """
+        a = self.predict_norm(self.normalize_obs(obs_real))
+        return self.action_low + (a + 1.0) * 0.5 * (self.action_high - self.action_low)
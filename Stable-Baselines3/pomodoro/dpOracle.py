@@ -0,0 +1,293 @@
+"""
+dpOracle.py
+
+Finite-horizon value iteration on a discretized PomodoroEnv: the best
+policy for the simulated user over the whole day (not only the next step,
+see expectedReward.py), as a reference for the checkpoints and as the
+fallback policy of main2.py.
+
+> `python dpOracle.py`                                       (solve, write DP/export/policy.npz)
+> `python dpOracle.py --algorithm SAC --steps 10000,100000`   (also evaluate checkpoints)
+> `python dpOracle.py --profile fitted_profile.json`          (solve for a fitted user, see fitUserProfile.py)
+
+States: grid over fatigue x work today x break today (the observation).
+Actions: grid over work x break minutes.
+
+The user's response to a recommendation only depends on the fatigue, not on
+the daily totals. So for every (fatigue node, action) `samples` responses are
+drawn at once with BatchedPomodoroVecEnv._simulate_user_response, and every
+sampled (next fatigue, actual work, actual break) is spread over its 8
+surrounding grid nodes with linear interpolation weights (unbiased in
+expectation). This gives the transition probabilities
+P[f, a, f', dw, db] over the next fatigue node and the offsets (in grid
+steps) of the daily totals. Expected rewards are exact (expectedReward.py).
+
+Backward induction over the max_steps_per_episode steps of a day:
+    V_T = 0,  Q_t(s, a) = R(f, a) + sum_s' P(s' | s, a) V_t+1(s'),  V_t = max_a Q_t
+A daily total at its budget ends the day (value 0), like the truncation of
+PomodoroEnv.step. Episodes are scored without discount, as in pomodoroEval.py.
+
+The API does not send the step count, so the served policy is the one of
+t = 0. The budgets end the day long before the 50-step limit, so it is
+(almost) the same at every step; the solver prints how often it differs.
+"""
+
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+
+try:
+    from expectedReward import expected_reward
+    from pomodoroEnv import PomodoroEnv
+    from pomodoroVecEnv import BatchedPomodoroVecEnv
+except ImportError:
+    from pomodoro.expectedReward import expected_reward
+    from pomodoro.pomodoroEnv import PomodoroEnv
+    from pomodoro.pomodoroVecEnv import BatchedPomodoroVecEnv
+
+# tabularPolicy.py lives in the parent folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tabularPolicy import TabularPolicy
+
+
+def _grid(low: float, high: float, step: float) -> np.ndarray:
+    """Evenly spaced nodes from low to high (both included), spacing as close to `step` as possible."""
+    return np.linspace(low, high, max(2, int(round((high - low) / step)) + 1))
+
+
+def _corners(x: np.ndarray, n: int):
+    """Lower node index (clipped so that lower + 1 < n) and weight of the upper node, for positions in grid steps."""
+    lower = np.clip(np.floor(x).astype(np.int64), 0, n - 2)
+    return lower, np.clip(x - lower, 0.0, 1.0)
+
+
+class DPOracle:
+    """
+    env: PomodoroEnv providing the ranges, budgets, rewards and horizon
+    profile: user profile (default env.user_profile)
+    fatigue_step, work_day_step, break_day_step: state grid spacing
+    work_step, break_step: action grid spacing (minutes)
+    samples: sampled user responses per (fatigue node, action)
+    """
+
+    def __init__(
+        self,
+        env: Optional[PomodoroEnv] = None,
+        profile: Optional[dict] = None,
+        *,
+        fatigue_step: float = 0.25,
+        work_day_step: float = 10.0,
+        break_day_step: float = 5.0,
+        work_step: float = 2.5,
+        break_step: float = 2.5,
+        samples: int = 512,
+        seed: int = 0,
+    ):
+        assert samples > 0, "Invalid number of samples: samples must be > 0"
+        self.env = env or PomodoroEnv()
+        self.profile = dict(profile or self.env.user_profile)
+        self.samples = samples
+        self.seed = seed
+        e = self.env
+
+        self.fatigue_grid = _grid(e.min_fatigue, e.max_fatigue, fatigue_step)
+        self.work_day_grid = _grid(0.0, e.max_work_minutes_day, work_day_step)
+        self.break_day_grid = _grid(0.0, e.max_break_minutes_day, break_day_step)
+        work, break_ = np.meshgrid(_grid(e.min_work, e.max_work, work_step),
+                                   _grid(e.min_break, e.max_break, break_step), indexing="ij")
+        self.actions = np.stack([work.ravel(), break_.ravel()], axis=1)     # (A, 2) minutes
+        assert len(self.actions) < 256, "Invalid action grid: at most 255 actions (uint8 policy)"
+
+        # Largest daily-total offsets of one step, in grid steps (+1 for the upper interpolation node)
+        self.max_dw = int(math.ceil((e.max_work + 5.0) / self._spacing(self.work_day_grid))) + 1
+        self.max_db = int(math.ceil((e.max_break + 3.0) / self._spacing(self.break_day_grid))) + 1
+
+        self.rewards = None       # (F, A) expected reward
+        self.transitions = None   # (F, A, F', DW, DB) probabilities
+        self.values = None        # (F, W, B) value of t = 0
+        self.policies = None      # (T, F, W, B) action index per step
+
+    @staticmethod
+    def _spacing(grid: np.ndarray) -> float:
+        return float(grid[1] - grid[0])
+
+    @property
+    def shape(self):
+        return len(self.fatigue_grid), len(self.work_day_grid), len(self.break_day_grid)
+
+    # --------------------
+    # Model of one step
+    # --------------------
+    def estimate_model(self) -> None:
+        """Expected rewards and sampled transition probabilities of every (fatigue node, action)."""
+        n_f = len(self.fatigue_grid)
+        n_a = len(self.actions)
+        obs = np.stack(np.broadcast_arrays(self.fatigue_grid[:, None], 0.0, 0.0), axis=-1)   # (F, 1, 3)
+        self.rewards = expected_reward(obs, self.actions[None], self.profile, self.env)       # (F, A)
+
+        sim = BatchedPomodoroVecEnv(n_a * self.samples, seed=self.seed, rescale_action=False, user_profile=self.profile)
+        work = np.repeat(self.actions[:, 0], self.samples)
+        break_ = np.repeat(self.actions[:, 1], self.samples)
+        action_index = np.repeat(np.arange(n_a), self.samples)
+
+        f_step = self._spacing(self.fatigue_grid)
+        w_step = self._spacing(self.work_day_grid)
+        b_step = self._spacing(self.break_day_grid)
+        size = n_a * n_f * self.max_dw * self.max_db
+        self.transitions = np.empty((n_f, n_a, n_f, self.max_dw, self.max_db))
+
+        for i, fatigue in enumerate(self.fatigue_grid):
+            actual_work, actual_break, _, _, new_fatigue = sim._simulate_user_response(
+                work, break_, np.full(len(work), fatigue))
+            f0, fw = _corners((new_fatigue - self.fatigue_grid[0]) / f_step, n_f)
+            w0, ww = _corners(actual_work / w_step, self.max_dw)
+            b0, bw = _corners(actual_break / b_step, self.max_db)
+
+            counts = np.zeros(size)
+            for df, pf in ((0, 1.0 - fw), (1, fw)):
+                for dw, pw in ((0, 1.0 - ww), (1, ww)):
+                    for db, pb in ((0, 1.0 - bw), (1, bw)):
+                        flat = ((action_index * n_f + f0 + df) * self.max_dw + w0 + dw) * self.max_db + b0 + db
+                        counts += np.bincount(flat, weights=pf * pw * pb, minlength=size)
+            self.transitions[i] = counts.reshape(n_a, n_f, self.max_dw, self.max_db) / self.samples
+
+    # --------------------
+    # Backward induction
+    # --------------------
+    def solve(self, horizon: Optional[int] = None) -> None:
+        """Value and greedy policy of every step, from the last one back to t = 0."""
+        if self.transitions is None:
+            self.estimate_model()
+        horizon = horizon or self.env.max_steps_per_episode
+        n_f, n_w, n_b = self.shape
+        n_a = len(self.actions)
+
+        # One matrix product per step: (F*A, F'*DW*DB) @ (F'*DW*DB, W*B)
+        transitions = self.transitions.reshape(n_f * n_a, n_f * self.max_dw * self.max_db)
+        rewards = self.rewards.reshape(n_f * n_a, 1)
+
+        # Nodes at a budget end the day; offsets past the grid end it too (zero padding)
+        ended = ((self.work_day_grid >= self.env.max_work_minutes_day)[:, None]
+                 | (self.break_day_grid >= self.env.max_break_minutes_day)[None, :])
+        padded = np.zeros((n_f, n_w + self.max_dw, n_b + self.max_db))
+        # Value of the node reached with every (dw, db) offset, a view on `padded`: (F', DW, DB, W, B)
+        shifted = np.lib.stride_tricks.sliding_window_view(padded, (n_w, n_b), axis=(1, 2))[:, :self.max_dw, :self.max_db]
+
+        values = np.zeros((n_f, n_w, n_b))
+        self.policies = np.empty((horizon, n_f, n_w, n_b), dtype=np.uint8)
+        for t in reversed(range(horizon)):
+            padded[:, :n_w, :n_b] = np.where(ended, 0.0, values)
+            q = (transitions @ shifted.reshape(-1, n_w * n_b) + rewards).reshape(n_f, n_a, n_w, n_b)
+            self.policies[t] = q.argmax(axis=1)
+            values = q.max(axis=1)
+        self.values = values
+
+    # --------------------
+    # Results
+    # --------------------
+    def policy(self, t: int = 0) -> TabularPolicy:
+        """The greedy policy of step t as a TabularPolicy (minutes at every state node)."""
+        return TabularPolicy(
+            [self.fatigue_grid, self.work_day_grid, self.break_day_grid],
+            self.actions[self.policies[t]],
+            algorithm="DP",
+        )
+
+    def start_value(self) -> float:
+        """Expected return of a day (fatigue ~ U[min, max] at reset, no work or break yet)."""
+        v = self.values[:, 0, 0]
+        return float(np.trapezoid(v, self.fatigue_grid) / (self.fatigue_grid[-1] - self.fatigue_grid[0]))
+
+    def stationarity(self, steps: int) -> float:
+        """Fraction of (step < steps, state) pairs whose greedy action is the t = 0 one."""
+        return float((self.policies[:steps] == self.policies[0]).mean())
+
+
+class _RescaledPolicy:
+    """model.predict interface of pomodoroEval.run_episodes (actions in [-1, 1]) for a TabularPolicy."""
+
+    def __init__(self, policy: TabularPolicy, env: PomodoroEnv):
+        self.policy = policy
+        self.low = np.array([env.min_work, env.min_break], dtype=np.float32)
+        self.high = np.array([env.max_work, env.max_break], dtype=np.float32)
+
+    def predict(self, obs, deterministic=True):
+        minutes = self.policy.predict(obs)
+        return 2.0 * (minutes - self.low) / (self.high - self.low) - 1.0, None
+
+
+# --------------------
+# CLI
+# --------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default=None, help="user_profile JSON (default: PomodoroEnv's profile)")
+    parser.add_argument("--fatigue-step", type=float, default=0.25)
+    parser.add_argument("--work-day-step", type=float, default=10.0, help="minutes")
+    parser.add_argument("--break-day-step", type=float, default=5.0, help="minutes")
+    parser.add_argument("--work-step", type=float, default=2.5, help="action grid (minutes)")
+    parser.add_argument("--break-step", type=float, default=2.5, help="action grid (minutes)")
+    parser.add_argument("--samples", type=int, default=512, help="sampled responses per (fatigue, action)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--episodes", type=int, default=10_000, help="simulated days to score the policy (0: skip)")
+    parser.add_argument("--algorithm", default=None, help="also evaluate checkpoints of this algorithm")
+    parser.add_argument("--steps", default="", help="comma separated checkpoint steps")
+    parser.add_argument("--out", default="DP/export/policy.npz", help="policy served by main2.py as its fallback")
+    args = parser.parse_args(argv)
+
+    profile = None
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+
+    env = PomodoroEnv(user_profile=profile) if profile else PomodoroEnv()
+    oracle = DPOracle(
+        env, profile,
+        fatigue_step=args.fatigue_step, work_day_step=args.work_day_step, break_day_step=args.break_day_step,
+        work_step=args.work_step, break_step=args.break_step, samples=args.samples, seed=args.seed,
+    )
+    n_f, n_w, n_b = oracle.shape
+    print(f"{n_f}x{n_w}x{n_b} states, {len(oracle.actions)} actions, {env.max_steps_per_episode} steps")
+
+    start = time.perf_counter()
+    oracle.estimate_model()
+    print(f"model: {len(oracle.actions) * n_f * args.samples} sampled steps in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    oracle.solve()
+    print(f"value iteration: {time.perf_counter() - start:.1f}s")
+    print(f"expected return of a day: {oracle.start_value():.3f}")
+    print(f"t=0 action also optimal at t < 30: {100 * oracle.stationarity(30):.1f}% of (step, state) pairs")
+
+    policy = oracle.policy(0)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    policy.save(args.out, values=oracle.values.astype(np.float32))
+    print("policy:", args.out)
+
+    print(f"\n{'fatigue':>8s} {'work':>6s} {'break':>6s} {'value':>8s}   (no work or break yet)")
+    for i in range(0, n_f, max(1, (n_f - 1) // 4)):
+        work, break_ = policy.actions[i, 0, 0]
+        print(f"{oracle.fatigue_grid[i]:8.2f} {work:6.1f} {break_:6.1f} {oracle.values[i, 0, 0]:8.3f}")
+
+    if args.episodes:
+        from pomodoroEval import evaluate_checkpoint, print_table, run_episodes, summarize
+
+        if profile:
+            print("\n(the simulated days below use PomodoroEnv's default profile)")
+        results = [{"algorithm": "DP", "step": 0, **summarize(run_episodes(_RescaledPolicy(policy, env), None, args.episodes))}]
+        for step in [int(s) for s in args.steps.split(",") if s] if args.algorithm else []:
+            results.append(evaluate_checkpoint(args.algorithm, step, args.episodes))
+        print()
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+expectedReward.py
+
+Expected one-step reward of PomodoroEnv, computed instead of sampled.
+
+> `python expectedReward.py`                                        (oracle per fatigue level)
+> `python expectedReward.py --check`                                (compare with Monte-Carlo steps)
+> `python expectedReward.py --algorithm SAC --steps 10000,100000`   (regret of checkpoints)
+
+The reward of a step only depends on the recommended work length, the
+fatigue before the step and the user profile. The user model of
+PomodoroEnv._simulate_user_response is integrated as follows:
+ - preferred-work noise: midpoint rule on N_NODES cells over [-8, 8]
+   sigma (Z_NODES, Z_WEIGHTS); the too-long / too-short boundary is known
+   in closed form, so the cell it falls in is split there and each part is
+   evaluated at the midpoint of its own sub-interval (within 4e-5 of a
+   16x finer grid)
+ - too-short multiplier (1 + 0.5u): exactly (clipped uniform mean)
+ - adherence of a kept Pomodoro: E[min(1, actual / recommended)]
+   = 1 - 2 / (recommended * sqrt(2 pi)) (the 1-minute floor of the actual
+   work is more than 7 sigma away and ignored)
+
+expected_reward() is vectorized over any batch of observations/actions,
+with one profile for all rows or one per row (e.g. UserPopulation.gather).
+oracle_actions() grid-searches the work length that maximizes it: the
+best myopic policy, in milliseconds, as a reference for the checkpoints.
+The break length never changes the immediate reward (it only moves the
+next fatigue and the daily break budget), so the oracle recommends the
+user's preferred break.
+"""
+
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+
+import argparse
+import math
+import time
+from typing import Optional
+
+import numpy as np
+
+try:
+    from pomodoroEnv import PomodoroEnv
+except ImportError:
+    from pomodoro.pomodoroEnv import PomodoroEnv
+
+N_NODES = 512
+Z_STEP = 16.0 / N_NODES
+Z_NODES = -8.0 + Z_STEP * (np.arange(N_NODES) + 0.5)
+Z_WEIGHTS = np.exp(-0.5 * Z_NODES ** 2)
+Z_WEIGHTS /= Z_WEIGHTS.sum()
+
+# Per-step probability caps of PomodoroEnv's user model
+MAX_PROB = 0.95
+
+
+def _clipped_uniform_mean(a: np.ndarray) -> np.ndarray:
+    """E[min(X, MAX_PROB)] for X ~ U[a, 1.5a], a >= 0 (the too-short probability)."""
+    c = MAX_PROB
+    width = np.maximum(0.5 * a, 1e-12)
+    straddles = ((c * c - a * a) / 2.0 + c * (1.5 * a - c)) / width
+    return np.where(1.5 * a <= c, 1.25 * a, np.where(a >= c, c, straddles))
+
+
+def _profile_columns(profile: dict, ndim: int) -> dict:
+    # Scalars stay scalars; per-row arrays get trailing axes up to `ndim`, plus the node axis
+    columns = {}
+    for key, value in profile.items():
+        value = np.asarray(value, dtype=np.float64)
+        columns[key] = value.reshape(value.shape + (1,) * (ndim - value.ndim + 1))
+    return columns
+
+
+def outcome_probabilities(work, fatigue, profile: dict, max_fatigue: float):
+    """
+    P(kept), P(stopped early), P(too short) of one Pomodoro, broadcast over
+    work (recommended minutes), fatigue (before the step) and the profile values.
+    """
+    work = np.asarray(work, dtype=np.float64)
+    fatigue = np.asarray(fatigue, dtype=np.float64)
+    ndim = max(work.ndim, fatigue.ndim)
+    p = _profile_columns(profile, ndim)
+    w = work[..., None]
+    fatigue_factor = (fatigue / max_fatigue)[..., None]
+
+    # Too long <=> z below the boundary (work >= 15 > 5, so the 5-minute floor never matters);
+    # fraction of every quadrature cell on the too-long side
+    with np.errstate(divide="ignore", invalid="ignore"):
+        boundary = (w - p["preferred_work_base"]) / p["variability"]
+    boundary = np.where(p["variability"] > 0, boundary, np.where(w > p["preferred_work_base"], np.inf, -np.inf))
+    too_long = np.clip((boundary - Z_NODES) / Z_STEP + 0.5, 0.0, 1.0)
+
+    # Each side of a split cell is evaluated at the midpoint of its own part
+    # (cells on one side only keep their node)
+    preferred_long = np.maximum(5.0, p["preferred_work_base"] + p["variability"] * (Z_NODES - 0.5 * Z_STEP * (1.0 - too_long)))
+    preferred_short = np.maximum(5.0, p["preferred_work_base"] + p["variability"] * (Z_NODES + 0.5 * Z_STEP * too_long))
+
+    stop = np.clip(
+        p["early_stop_sensitivity"] * (1.0 + fatigue_factor * p["fatigue_influence"])
+        + 0.9 * (w - preferred_long) / preferred_long, 0.0, MAX_PROB,
+    )
+    p_stop = (too_long * stop) @ Z_WEIGHTS
+
+    mismatch = p["too_short_sensitivity"] * (preferred_short - w) / preferred_short
+    p_short = ((1.0 - too_long) * _clipped_uniform_mean(np.maximum(mismatch, 0.0))) @ Z_WEIGHTS
+
+    return tuple(np.broadcast_arrays(1.0 - p_stop - p_short, p_stop, p_short))
+
+
+def expected_reward(obs, actions, profile: Optional[dict] = None, env: Optional[PomodoroEnv] = None,
+                    rescaled: bool = False) -> np.ndarray:
+    """
+    obs: (..., 3+) observations (only the fatigue, obs[..., 0], matters)
+    actions: (..., 2) [work, break] minutes, or in [-1, 1] if rescaled (RescaleAction / the policies)
+    profile: user profile (scalars or per-row arrays), default env.user_profile
+    env: PomodoroEnv providing the ranges and reward parameters (default PomodoroEnv())
+    Returns the (...,) expected rewards.
+    """
+    env = env or PomodoroEnv()
+    obs = np.asarray(obs, dtype=np.float64)
+    work = np.asarray(actions, dtype=np.float64)[..., 0]
+    if rescaled:
+        work = env.min_work + (np.clip(work, -1.0, 1.0) + 1.0) * 0.5 * (env.max_work - env.min_work)
+    work = np.clip(work, env.min_work, env.max_work)
+
+    p_kept, p_stop, p_short = outcome_probabilities(work, obs[..., 0], profile or env.user_profile, env.max_fatigue)
+    adherence = 1.0 - 2.0 / (work * math.sqrt(2.0 * math.pi))
+    return (p_stop * env.early_stop_penalty
+            + p_short * env.too_short_penalty
+            + p_kept * env.adherence_reward * adherence)
+
+
+def oracle_actions(obs, profile: Optional[dict] = None, env: Optional[PomodoroEnv] = None,
+                   resolution: float = 0.5, chunk: int = 64):
+    """
+    Best myopic [work, break] (minutes) for every observation: the work length on a
+    `resolution`-minute grid with the highest expected reward, the preferred break.
+    Returns (actions (B, 2), expected rewards (B,)).
+    """
+    env = env or PomodoroEnv()
+    profile = profile or env.user_profile
+    obs = np.asarray(obs, dtype=np.float64).reshape(-1, np.shape(obs)[-1])
+    grid = np.arange(env.min_work, env.max_work + 1e-9, resolution)
+
+    best_work = np.empty(len(obs))
+    best_value = np.empty(len(obs))
+    per_row = {key: np.ndim(value) > 0 for key, value in profile.items()}
+    for start in range(0, len(obs), chunk):
+        rows = slice(start, start + chunk)
+        rows_profile = {key: (np.asarray(value)[rows, None] if per_row[key] else value) for key, value in profile.items()}
+        actions = np.stack(np.broadcast_arrays(grid[None, :], 0.0), axis=-1)      # (1, G, 2)
+        values = expected_reward(obs[rows, None, :], actions, rows_profile, env)   # (chunk, G)
+        best = values.argmax(axis=1)
+        best_work[rows] = grid[best]
+        best_value[rows] = values[np.arange(len(best)), best]
+
+    preferred_break = np.broadcast_to(np.asarray(profile["preferred_break_base"], dtype=np.float64), best_work.shape)
+    actions = np.stack([best_work, np.clip(preferred_break, env.min_break, env.max_break)], axis=1)
+    return actions, best_value
+
+
+# --------------------
+# CLI
+# --------------------
+def state_grid(env: PomodoroEnv) -> np.ndarray:
+    """Observations on a grid over the observation box (fatigue x work today x break today)."""
+    fatigue = np.linspace(env.min_fatigue, env.max_fatigue, 9)
+    work_day = np.linspace(0.0, env.max_work_minutes_day, 9)
+    break_day = np.linspace(0.0, env.max_break_minutes_day, 7)
+    return np.stack(np.meshgrid(fatigue, work_day, break_day, indexing="ij"), axis=-1).reshape(-1, 3).astype(np.float32)
+
+
+def monte_carlo_reward(fatigue: float, work: float, n: int = 200_000, seed: int = 0):
+    """
+    Mean reward of n simulated steps from `fatigue` with `work` recommended, and its
+    standard error (check of expected_reward).
+    """
+    from pomodoroVecEnv import BatchedPomodoroVecEnv
+
+    env = BatchedPomodoroVecEnv(n, seed=seed, rescale_action=False)
+    env.reset()
+    env.fatigue[:] = fatigue
+    _, rewards, _, _ = env.step(np.tile([work, 10.0], (n, 1)).astype(np.float32))
+    return float(rewards.mean()), float(rewards.std() / math.sqrt(n))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithm", default=None, help="score checkpoints of this algorithm against the oracle")
+    parser.add_argument("--steps", default="", help="comma separated checkpoint steps")
+    parser.add_argument("--resolution", type=float, default=0.5, help="work grid of the oracle (minutes)")
+    parser.add_argument("--check", action="store_true", help="compare with Monte-Carlo steps of BatchedPomodoroVecEnv")
+    args = parser.parse_args(argv)
+
+    env = PomodoroEnv()
+
+    start = time.perf_counter()
+    fatigue_levels = np.linspace(env.min_fatigue, env.max_fatigue, 9)
+    obs = np.stack([fatigue_levels, np.zeros(9), np.zeros(9)], axis=1)
+    actions, values = oracle_actions(obs, env=env, resolution=args.resolution)
+    print(f"oracle ({1000 * (time.perf_counter() - start):.1f} ms)")
+    print(f"{'fatigue':>8s} {'work':>6s} {'break':>6s} {'E[reward]':>10s}")
+    for f, (work, break_), value in zip(fatigue_levels, actions, values):
+        print(f"{f:8.1f} {work:6.1f} {break_:6.1f} {value:10.4f}")
+
+    if args.check:
+        print(f"\n{'fatigue':>8s} {'work':>6s} {'expected':>10s} {'monte carlo':>12s} {'std err':>8s}")
+        for f in (1.0, 3.0, 5.0):
+            for work in (15.0, 20.0, 25.0, 35.0, 50.0):
+                value = float(expected_reward([f, 0.0, 0.0], [work, 10.0], env=env))
+                mean, std_err = monte_carlo_reward(f, work)
+                print(f"{f:8.1f} {work:6.1f} {value:10.4f} {mean:12.4f} {std_err:8.4f}")
+
+    if args.algorithm:
+        from pomodoroEval import load_checkpoint
+
+        states = state_grid(env)
+        _, oracle_values = oracle_actions(states, env=env, resolution=args.resolution)
+        print(f"\n{len(states)} states, oracle mean E[reward] {oracle_values.mean():.4f}")
+        print(f"{'checkpoint':18s} {'E[reward]':>10s} {'regret':>8s} {'mean work':>10s}")
+        for step in [int(s) for s in args.steps.split(",") if s]:
+            model, normalizer = load_checkpoint(args.algorithm, step)
+            policy_actions, _ = model.predict(normalizer.normalize_obs(states), deterministic=True)
+            values = expected_reward(states, policy_actions, env=env, rescaled=True)
+            work = env.min_work + (np.clip(policy_actions[:, 0], -1, 1) + 1) * 0.5 * (env.max_work - env.min_work)
+            print(f"{args.algorithm + '/' + str(step):18s} {values.mean():10.4f} "
+                  f"{(oracle_values - values).mean():8.4f} {work.mean():10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+noiseStream.py
+
+Seedable noise for the simulated Pomodoro users.
+
+Every simulated step uses the same fixed set of random numbers (3 standard
+normals + 4 uniforms), so they are drawn in blocks from a counter-based
+(Philox) or PCG64 generator instead of 5-7 scalar calls per step:
+ - NoiseStream: one stream for one PomodoroEnv, served row by row
+ - BatchNoiseStream: (n_envs,) columns for BatchedPomodoroVecEnv, served step by step
+
+Because the amount drawn per step never depends on what the user did, a
+root seed gives bit-identical episodes for a given number of envs, and two
+policies evaluated with the same seed see exactly the same user noise.
+Worker seeds come from SeedSequence.spawn (see spawn_seeds).
+"""
+
+from typing import List, Optional, Union
+
+import numpy as np
+
+BIT_GENERATORS = {"Philox": np.random.Philox, "PCG64": np.random.PCG64}
+
+N_NORMAL = 3   # preferred work noise, actual work noise, actual break noise
+N_UNIFORM = 4  # early-stop draw, too-short multiplier, too-short draw, early-stop fraction
+
+SeedLike = Optional[Union[int, np.random.SeedSequence]]
+
+
+def spawn_seeds(seed: SeedLike, n: int) -> List[np.random.SeedSequence]:
+    """n independent child seeds (one per env / worker) from a root seed."""
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return root.spawn(n)
+
+
+def make_generator(seed: SeedLike, bit_generator: str = "Philox") -> np.random.Generator:
+    assert bit_generator in BIT_GENERATORS, f"Invalid bit generator {bit_generator}: expected one of {list(BIT_GENERATORS)}"
+    seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return np.random.Generator(BIT_GENERATORS[bit_generator](seed_seq))
+
+
+class NoiseStream:
+    """
+    seed: int or SeedSequence (None: fresh OS entropy, once)
+    block_size: rows generated per refill (blocks start small and double up to
+        this, so a freshly seeded stream, e.g. reset(seed=...), stays cheap)
+    bit_generator: "Philox" or "PCG64"
+
+    next_row() returns (normals, uniforms) as Python lists of floats, plus
+    uniform() for single draws (e.g. the start-of-day fatigue).
+    """
+
+    def __init__(self, seed: SeedLike = None, *, block_size: int = 1024, bit_generator: str = "Philox"):
+        assert block_size > 0, "Invalid block size: block_size must be > 0"
+        self.block_size = block_size
+        self.generator = make_generator(seed, bit_generator)
+        self._normals: list = []
+        self._uniforms: list = []
+        self._rows = min(64, block_size) // 2  # first refill doubles it
+        self._i = 0
+
+    def next_row(self):
+        if self._i >= len(self._normals):
+            self._refill()
+        i = self._i
+        self._i += 1
+        return self._normals[i], self._uniforms[i]
+
+    def uniform(self, low: float = 0.0, high: float = 1.0) -> float:
+        return low + (high - low) * self.next_row()[1][0]
+
+    def _refill(self) -> None:
+        # tolist(): Python floats, so per-step use never touches NumPy scalars
+        self._rows = max(1, min(2 * self._rows, self.block_size))
+        self._normals = self.generator.standard_normal((self._rows, N_NORMAL)).tolist()
+        self._uniforms = self.generator.random((self._rows, N_UNIFORM)).tolist()
+        self._i = 0
+
+
+class BatchNoiseStream:
+    """
+    n_envs: number of simulated users (columns)
+    seed: int or SeedSequence
+    block_elements: roughly how many numbers to generate per refill
+
+    next_step() returns (normals (3, n_envs), uniforms (4, n_envs)) views.
+    Resets draw from a separate child stream, so the step noise of one user
+    never shifts when other users' episodes end.
+    """
+
+    def __init__(self, n_envs: int, seed: SeedLike = None, *, block_elements: int = 1 << 16, bit_generator: str = "Philox"):
+        assert n_envs > 0, "Invalid number of envs: n_envs must be > 0"
+        self.n_envs = n_envs
+        self.block_steps = max(1, block_elements // (n_envs * (N_NORMAL + N_UNIFORM)))
+        step_seed, reset_seed = spawn_seeds(seed, 2)
+        self.generator = make_generator(step_seed, bit_generator)
+        self.reset_generator = make_generator(reset_seed, bit_generator)
+        self._i = self.block_steps
+        self._refill()
+
+    def next_step(self):
+        if self._i >= self.block_steps:
+            self._refill()
+        i = self._i
+        self._i += 1
+        return self._normals[i], self._uniforms[i]
+
+    def _refill(self) -> None:
+        self._normals = self.generator.standard_normal((self.block_steps, N_NORMAL, self.n_envs))
+        self._uniforms = self.generator.random((self.block_steps, N_UNIFORM, self.n_envs))
+        self._i = 0
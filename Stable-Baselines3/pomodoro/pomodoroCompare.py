@@ -0,0 +1,119 @@
+"""
+pomodoroCompare.py
+
+Compare every saved checkpoint of every algorithm.
+
+> `python pomodoroCompare.py`
+> `python pomodoroCompare.py --episodes 4000 --csv compare.csv`
+
+Finds {A2C,PPO,SAC}/models/<step>.zip (with VecEnv/<step>.pkl), evaluates
+them in a process pool with pomodoroEval.evaluate_checkpoint (same seed for
+every checkpoint, so differences are not seed noise) and prints a table of
+return vs. step. Results are cached in --cache keyed by the sha256 of the
+zip + pkl, the sha256 of the simulator and evaluation code (EVAL_SOURCES)
+and the evaluation settings, so a rerun only evaluates new or changed
+checkpoints, and a change to the user model or the RNG invalidates the cache.
+"""
+
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+
+import os
+import sys
+import csv
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pomodoroEval import CHECKPOINT_ROOT, evaluate_checkpoint
+
+# exportPolicy.py lives in the parent folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exportPolicy import ALGORITHMS, checkpoint_hash, find_checkpoints, sha256_files
+
+CACHE_FILE = "compare_cache.json"
+# Code whose changes change evaluation results (dynamics, noise, user population, evaluation loop)
+EVAL_SOURCES = ["pomodoroEnv.py", "pomodoroVecEnv.py", "noiseStream.py", "userPopulation.py", "pomodoroEval.py"]
+
+
+def eval_code_hash():
+    here = os.path.dirname(os.path.abspath(__file__))
+    return sha256_files(os.path.join(here, name) for name in EVAL_SOURCES)[:16]
+
+
+def load_cache(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_cache(path, cache):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _evaluate_job(job):
+    algorithm, step, episodes, seed = job
+    return evaluate_checkpoint(algorithm, step, episodes, seed)
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["algorithm", "step", "return", "return_ci95", "early_stop_rate", "too_short_rate",
+                         "work_minutes", "episodes"])
+        for r in rows:
+            writer.writerow([r["algorithm"], r["step"], r["return"]["mean"], r["return"]["ci95"],
+                             r["early_stop_rate"]["mean"], r["too_short_rate"]["mean"],
+                             r["work_minutes"]["mean"], r["episodes"]])
+
+
+def print_table(rows):
+    best = max(rows, key=lambda r: r["return"]["mean"]) if rows else None
+    print(f"{'algorithm':9s} {'step':>8s} {'return':>18s} {'early stop':>11s} {'too short':>10s} {'work min':>9s}")
+    for r in rows:
+        mark = "  <- best" if r is best else ""
+        print(f"{r['algorithm']:9s} {r['step']:8d} {r['return']['mean']:8.3f} ± {r['return']['ci95']:.3f}  "
+              f"{r['early_stop_rate']['mean']:11.3f} {r['too_short_rate']['mean']:10.3f} "
+              f"{r['work_minutes']['mean']:9.1f}{mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", default=",".join(ALGORITHMS))
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache", default=CACHE_FILE)
+    parser.add_argument("--csv", default=None, help="write the table to this CSV file")
+    args = parser.parse_args(argv)
+
+    checkpoints = sorted(find_checkpoints(CHECKPOINT_ROOT, args.algorithms.split(",")))
+    cache = load_cache(args.cache)
+
+    # Cache key: file contents + evaluation settings
+    code = eval_code_hash()
+    keys = {ckpt: f"{checkpoint_hash(*ckpt, CHECKPOINT_ROOT)}:{code}:{args.episodes}:{args.seed}" for ckpt in checkpoints}
+    todo = [ckpt for ckpt in checkpoints if keys[ckpt] not in cache]
+    print(f"{len(checkpoints)} checkpoints, {len(checkpoints) - len(todo)} cached, {len(todo)} to evaluate")
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(_evaluate_job, (*ckpt, args.episodes, args.seed)): ckpt for ckpt in todo}
+            for future in as_completed(futures):
+                ckpt = futures[future]
+                cache[keys[ckpt]] = future.result()
+                save_cache(args.cache, cache)
+
+    rows = [{**cache[keys[ckpt]], "algorithm": ckpt[0], "step": ckpt[1]} for ckpt in checkpoints]
+    print_table(rows)
+    if args.csv:
+        write_csv(args.csv, rows)
+        print("csv:", args.csv)
+
+
+if __name__ == "__main__":
+    main()
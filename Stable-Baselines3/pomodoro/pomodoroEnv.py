@@ -7,6 +7,7 @@ State (obs):
  - fatigue: float in [0,5]
  - total_work_today (minutes): float in [0, max_work_minutes]
  - total_break_today (minutes): float in [0, max_break_minutes]
+ - (observe_profile=True) the user profile, in userPopulation.PROFILE_KEYS order
 
 Action:
  - Box(2): [work_minutes, break_minutes]
@@ -23,7 +24,13 @@ from typing import Tuple, Dict, Optional
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
-from gymnasium.utils import seeding
+
+try:
+    from noiseStream import NoiseStream, SeedLike
+    from userPopulation import PROFILE_KEYS, UserPopulation
+except ImportError:
+    from pomodoro.noiseStream import NoiseStream, SeedLike
+    from pomodoro.userPopulation import PROFILE_KEYS, UserPopulation
 
 
 class PomodoroEnv(gym.Env):
@@ -53,6 +60,16 @@ class PomodoroEnv(gym.Env):
         max_steps_per_episode: int = 50,         # number of Pomodoros per episode (day)
         
         user_profile: Optional[dict] = None,     # parameters controlling simulated user's behavior
+        population: Optional[UserPopulation] = None,  # if set, a new user is drawn from it every episode
+        observe_profile: bool = False,           # append the user profile to the observation
+
+        # Noise
+        seed: SeedLike = None,                   # int or SeedSequence (e.g. from noiseStream.spawn_seeds)
+        bit_generator: str = "Philox",           # "Philox" or "PCG64"
+
+        # Speed
+        fast_mode: bool = False,                 # in-place state, no action validation (caller keeps actions in bounds)
+        return_info: bool = True,                # False: step() returns an empty info dict
     ):
         super().__init__()
 
@@ -112,9 +129,35 @@ class PomodoroEnv(gym.Env):
             }
         self.user_profile = user_profile
 
-        # # Seeding
-        # self.np_random, seed = seeding.np_random(seed)
-        # self._seed = seed
+        # Heterogeneous users: the profile dict is owned by the env and refilled on reset
+        self.population = population
+        if population is not None:
+            self.user_profile = dict(user_profile)
+        self.observe_profile = observe_profile
+        if observe_profile:
+            if population is not None:
+                profile_low, profile_high = population.low, population.high
+            else:
+                profile_low = profile_high = np.array([user_profile[key] for key in PROFILE_KEYS], dtype=np.float32)
+            self.observation_space = spaces.Box(
+                low=np.concatenate([self.observation_space.low, profile_low]),
+                high=np.concatenate([self.observation_space.high, profile_high]),
+                dtype=np.float32,
+            )
+            self.profile_obs = np.array([self.user_profile[key] for key in PROFILE_KEYS], dtype=np.float32)
+
+        # Seeding: noise is drawn in blocks from one stream per env. reset(seed=None)
+        # keeps the stream going instead of reseeding from OS entropy every episode.
+        self.bit_generator = bit_generator
+        self.noise = NoiseStream(seed, bit_generator=bit_generator)
+        self._np_random = self.noise.generator
+
+        # fast_mode: the state is one preallocated float32 buffer, updated in place
+        # (same dynamics as step(); the arithmetic in between is done on Python floats)
+        self.fast_mode = fast_mode
+        self.return_info = return_info
+        if fast_mode:
+            self.state = np.zeros(3, dtype=np.float32)
 
         # Internal state
         # self.state = None  # (fatigue, total_work_today, total_break_today)
@@ -122,15 +165,25 @@ class PomodoroEnv(gym.Env):
         # self.truncated = False
 
     def reset(self, *, seed = None, options=None):
-        # if seed is not None:
-        #     self.np_random, _ = seeding.np_random(seed)
-        # super().reset(seed=seed)
-        self.np_random, seed = seeding.np_random(seed)
-        self._seed = seed
+        if seed is not None:
+            self.noise = NoiseStream(seed, bit_generator=self.bit_generator)
+            self._np_random = self.noise.generator
+
+        # New simulated user for this episode
+        if self.population is not None:
+            i = min(int(self.noise.uniform() * self.population.size), self.population.size - 1)
+            self.population.fill(self.user_profile, i)
+            if self.observe_profile:
+                for j, key in enumerate(PROFILE_KEYS):
+                    self.profile_obs[j] = self.user_profile[key]
 
         # Start the day with some random baseline fatigue
-        baseline_fatigue = float(self.np_random.uniform(self.min_fatigue, self.max_fatigue))
-        self.state = np.array([baseline_fatigue, 0.0, 0.0], dtype=np.float32)
+        baseline_fatigue = self.noise.uniform(self.min_fatigue, self.max_fatigue)
+        if self.fast_mode:
+            self.state[0] = baseline_fatigue
+            self.state[1] = self.state[2] = 0.0
+        else:
+            self.state = np.array([baseline_fatigue, 0.0, 0.0], dtype=np.float32)
 
         self.current_step = 0
         self.terminated = False
@@ -145,6 +198,8 @@ class PomodoroEnv(gym.Env):
         action: [work_minutes, break_minutes] (floats)
         returns: obs, reward, terminated, truncated, info
         """
+        if self.fast_mode:
+            return self._step_fast(action)
 
         # Validations
         assert self.action_space.contains(action), f"Action {action} is out of bounds."
@@ -190,19 +245,65 @@ class PomodoroEnv(gym.Env):
         self.truncated = truncated
 
         obs = self._get_obs()
-        info = {
-            "recommended_work": recommended_work,
-            "recommended_break": recommended_break,
-            "actual_work": actual_work_minutes,
-            "actual_break": actual_break_minutes,
-            "user_report": user_report,
-        }
+        info = {}
+        if self.return_info:
+            info = {
+                "recommended_work": recommended_work,
+                "recommended_break": recommended_break,
+                "actual_work": actual_work_minutes,
+                "actual_break": actual_break_minutes,
+                "user_report": user_report,
+            }
         return obs, float(reward), bool(terminated), bool(truncated), info
 
+    def _step_fast(self, action) -> Tuple[np.ndarray, float, bool, bool, dict]:
+        """
+        step() for fast_mode: no action validation (only the clamps), no
+        temporary state arrays, no report dict, info only if return_info.
+        """
+        work, break_ = action.tolist() if hasattr(action, "tolist") else action
+        recommended_work = min(max(work, self.min_work), self.max_work)
+        recommended_break = min(max(break_, self.min_break), self.max_break)
+
+        state = self.state
+        fatigue, total_work, total_break = state.tolist()
+
+        actual_work, actual_break, stopped_early, too_short, new_fatigue = self._simulate_user_fast(
+            recommended_work,
+            recommended_break,
+            fatigue,
+        )
+        total_work += actual_work
+        total_break += actual_break
+        state[0] = new_fatigue
+        state[1] = total_work
+        state[2] = total_break
+
+        reward = self._reward(recommended_work, actual_work, stopped_early, too_short)
+
+        self.current_step += 1
+        truncated = (total_work >= self.max_work_minutes_day) or (total_break >= self.max_break_minutes_day)
+        terminated = self.current_step >= self.max_steps_per_episode
+        self.terminated = terminated
+        self.truncated = truncated
+
+        info = {}
+        if self.return_info:
+            info = {
+                "recommended_work": recommended_work,
+                "recommended_break": recommended_break,
+                "actual_work": actual_work,
+                "actual_break": actual_break,
+                "user_report": {"stopped_early": stopped_early, "too_short": too_short},
+            }
+        return self._get_obs(), reward, terminated, truncated, info
+
     # --------------------
     # Helpers
     # --------------------
     def _get_obs(self) -> np.ndarray:
+        if self.observe_profile:
+            return np.concatenate([self.state, self.profile_obs])
         return self.state.copy()
 
     def _simulate_user_response(
@@ -219,16 +320,15 @@ class PomodoroEnv(gym.Env):
         user_report: {"stopped_early": bool, "too_short": bool}
         """
         p = self.user_profile
+        # One block row per step: 3 standard normals, 4 uniforms (see noiseStream.py)
+        z, u = self.noise.next_row()
 
         # Simulated variation in user’s preferred work duration
-        pref_noise = self.np_random.normal(scale=p["variability"])
+        pref_noise = z[0] * p["variability"]
         preferred_work = max(5.0, p["preferred_work_base"] + pref_noise) 
             # at least can work 5 minutes
 
-        # Preferred break
-        pref_break_noise = self.np_random.normal(scale=max(1.0, p["variability"] / 3))
-        preferred_break = max(1.0, p["preferred_break_base"] + pref_break_noise)
-            # at least needs 1 minute rest
+        # (the preferred break never affects the outcome, so no noise is drawn for it)
 
         fatigue_factor = fatigue / self.max_fatigue
         
@@ -249,36 +349,36 @@ class PomodoroEnv(gym.Env):
             early_stop_prob = p["early_stop_sensitivity"] * (1.0 + fatigue_factor * p["fatigue_influence"]) + 0.9 * length_mismatch
             early_stop_prob = float(np.clip(early_stop_prob, 0.0, 0.95))
 
-            stopped_early = self.np_random.random() < early_stop_prob
+            stopped_early = u[0] < early_stop_prob
             reported_too_short = False
 
         # Too short
         elif recommended_work < preferred_work: 
             length_mismatch = (preferred_work - recommended_work) / preferred_work
 
-            too_short_prob = p["too_short_sensitivity"] * length_mismatch * (1.0 + 0.5 * self.np_random.random())
+            too_short_prob = p["too_short_sensitivity"] * length_mismatch * (1.0 + 0.5 * u[1])
             too_short_prob = float(np.clip(too_short_prob, 0.0, 0.95))
 
             stopped_early = False
-            reported_too_short = self.np_random.random() < too_short_prob
+            reported_too_short = u[2] < too_short_prob
 
 
         # Work calculation
         if stopped_early:
             # fraction left: if fatigued, more likely to stop sooner
-            frac = max(0.15, 1.0 - 0.5 * fatigue_factor - 0.4 * self.np_random.random())
+            frac = max(0.15, 1.0 - 0.5 * fatigue_factor - 0.4 * u[3])
             actual_work = max(1.0, recommended_work * frac)
         else:
             # user tries to stick to recommended_work but with slight noise
             actual_work = float(np.clip(
-                self.np_random.normal(loc=recommended_work, scale=2.0), 
+                recommended_work + 2.0 * z[1], 
                 1.0, # at least works 5 minutes
                 recommended_work + 5.0 # At most works 5 minutes more
             ))
 
         # Break calculation
         actual_break = float(np.clip(
-            self.np_random.normal(loc=recommended_break, scale=1.0), 
+            recommended_break + 1.0 * z[2], 
             0.0, 
             recommended_break + 3.0))
 
@@ -291,6 +391,38 @@ class PomodoroEnv(gym.Env):
         user_report = {"stopped_early": bool(stopped_early), "too_short": bool(reported_too_short)}
         return float(actual_work), float(actual_break), user_report, fatigue
 
+    def _simulate_user_fast(self, recommended_work: float, recommended_break: float, fatigue: float):
+        """
+        _simulate_user_response on Python floats with math clamps (fast_mode)
+
+        Returns:
+          actual_work, actual_break, stopped_early, too_short, new_fatigue
+        """
+        p = self.user_profile
+        z, u = self.noise.next_row()
+
+        preferred_work = max(5.0, p["preferred_work_base"] + z[0] * p["variability"])
+        fatigue_factor = fatigue / self.max_fatigue
+
+        stopped_early = too_short = False
+        if recommended_work > preferred_work:
+            early_stop_prob = (p["early_stop_sensitivity"] * (1.0 + fatigue_factor * p["fatigue_influence"])
+                               + 0.9 * (recommended_work - preferred_work) / preferred_work)
+            stopped_early = u[0] < min(max(early_stop_prob, 0.0), 0.95)
+        elif recommended_work < preferred_work:
+            too_short_prob = p["too_short_sensitivity"] * (preferred_work - recommended_work) / preferred_work * (1.0 + 0.5 * u[1])
+            too_short = u[2] < min(max(too_short_prob, 0.0), 0.95)
+
+        if stopped_early:
+            actual_work = max(1.0, recommended_work * max(0.15, 1.0 - 0.5 * fatigue_factor - 0.4 * u[3]))
+        else:
+            actual_work = min(max(recommended_work + 2.0 * z[1], 1.0), recommended_work + 5.0)
+        actual_break = min(max(recommended_break + z[2], 0.0), recommended_break + 3.0)
+
+        fatigue = fatigue + actual_work / 60.0 - 0.6 * actual_break / 60.0
+        new_fatigue = min(max(fatigue, self.min_fatigue), self.max_fatigue)
+        return actual_work, actual_break, stopped_early, too_short, new_fatigue
+
     def _compute_reward(
         self,
         recommended_work: float,
@@ -305,18 +437,12 @@ class PomodoroEnv(gym.Env):
           - If adhered (actual_work approx recommended_work and not reported too short) => positive reward.
           - Fatigue cost: small negative reward proportional to work_minutes (encourages not exhausting the user).
         """
-        reward = 0.0
-    
-        if user_report.get("stopped_early", False):
-            # Strong negative reward on early stop
-            reward += self.early_stop_penalty
-        elif user_report.get("too_short", False):
-            # Mild negative if user says work was too short
-            reward += self.too_short_penalty
-        else:
-            # Positive reward for adherence (closer actual to recommended yields larger reward)
-            adherence_ratio = min(1.0, actual_work / recommended_work)
-            reward += self.adherence_reward * adherence_ratio
+        reward = self._reward(
+            recommended_work,
+            actual_work,
+            user_report.get("stopped_early", False),
+            user_report.get("too_short", False),
+        )
 
         # Penalize building too much fatigue: per-minute cost (small)
         # reward += self.fatigue_cost_per_min * work_minutes
@@ -324,6 +450,32 @@ class PomodoroEnv(gym.Env):
 
         return float(reward)
 
+    def _reward(self, recommended_work: float, actual_work: float, stopped_early: bool, too_short: bool) -> float:
+        """The reward rule on Python floats (shared by _compute_reward and _step_fast)"""
+        if stopped_early:
+            # Strong negative reward on early stop
+            return float(self.early_stop_penalty)
+        if too_short:
+            # Mild negative if user says work was too short
+            return float(self.too_short_penalty)
+        # Positive reward for adherence (closer actual to recommended yields larger reward)
+        return float(self.adherence_reward * min(1.0, actual_work / recommended_work))
+
+    def _compute_rewards(
+        self,
+        recommended_work: np.ndarray,
+        actual_work: np.ndarray,
+        stopped_early: np.ndarray,
+        too_short: np.ndarray,
+    ) -> np.ndarray:
+        """Vectorized _compute_reward, for arrays of Pomodoros (BatchedPomodoroVecEnv, offlineBuffer.py)"""
+        adherence = self.adherence_reward * np.minimum(1.0, actual_work / recommended_work)
+        return np.where(
+            stopped_early,
+            self.early_stop_penalty,
+            np.where(too_short, self.too_short_penalty, adherence),
+        )
+
 
     def render(self):
         fatigue, total_work, total_break = self.state
@@ -331,6 +483,5 @@ class PomodoroEnv(gym.Env):
 
 
     # def seed(self, seed: Optional[int] = None):
-    #     self.np_random, seed = seeding.np_random(seed)
-    #     self._seed = seed
+    #     self.noise = NoiseStream(seed, bit_generator=self.bit_generator)
     #     return [seed]
@@ -0,0 +1,183 @@
+"""
+pomodoroEval.py
+
+Fast evaluation of saved Pomodoro policies (replaces pomodoroLoad.py and pomodoroCheck2.py).
+
+> `python pomodoroEval.py --algorithm SAC --steps 10000,100000`
+> `python pomodoroEval.py --algorithm PPO --steps 50000 --episodes 10000 --stochastic`
+> `python pomodoroEval.py --random --show 1`
+
+Loads {ALG}/models/{step}.zip with its {ALG}/VecEnv/{step}.pkl statistics
+and plays --episodes seeded episodes at once in a BatchedPomodoroVecEnv
+(one simulated user per episode, no sleeps). Every checkpoint is evaluated
+with the same seed (common random numbers), several checkpoints run in a
+process pool.
+
+Reported per checkpoint (mean and 95% confidence interval over episodes):
+ - return
+ - early-stop rate: fraction of Pomodoros the user stopped early
+ - too-short rate: fraction of Pomodoros reported as too short
+ - work minutes: total minutes worked in the day
+"""
+
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from pomodoroVecEnv import BatchedPomodoroVecEnv
+except ImportError:
+    from pomodoro.pomodoroVecEnv import BatchedPomodoroVecEnv
+
+# exportPolicy.py lives in the parent folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exportPolicy import ALGORITHMS, checkpoint_paths
+
+METRICS = ["return", "early_stop_rate", "too_short_rate", "work_minutes", "length"]
+# Folder holding the {ALG}/models and {ALG}/VecEnv folders (this one)
+CHECKPOINT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+# --------------------
+# Episodes
+# --------------------
+def run_episodes(model=None, normalizer=None, n_episodes=1000, seed=0, deterministic=True, show=0):
+    """
+    Play one episode per simulated user on the default PomodoroEnv.
+    model=None plays uniformly random actions. Observations are normalized
+    with `normalizer` (a VecNormalize, e.g. loaded from VecEnv/*.pkl) when given.
+    Returns a dict of per-episode arrays (see METRICS).
+    """
+    env = BatchedPomodoroVecEnv(n_episodes, seed=seed)
+    rng = np.random.default_rng(seed)
+    env.seed(seed)
+    obs = env.reset()
+
+    returns = np.zeros(n_episodes)
+    lengths = np.zeros(n_episodes, dtype=np.int64)
+    early_stops = np.zeros(n_episodes, dtype=np.int64)
+    too_shorts = np.zeros(n_episodes, dtype=np.int64)
+    work = np.zeros(n_episodes)
+    running = np.ones(n_episodes, dtype=bool)
+
+    while running.any():
+        if model is None:
+            action = rng.uniform(-1.0, 1.0, size=(n_episodes, 2)).astype(np.float32)
+        else:
+            model_obs = obs if normalizer is None else normalizer.normalize_obs(obs)
+            action, _ = model.predict(model_obs, deterministic=deterministic)
+
+        obs_before = obs
+        obs, rewards, dones, _ = env.step(action)
+        response = env.last_response
+
+        returns += np.where(running, rewards, 0.0)
+        lengths += running
+        early_stops += running & response["stopped_early"]
+        too_shorts += running & response["too_short"]
+        work += np.where(running, response["actual_work"], 0.0)
+
+        for i in range(min(show, n_episodes)):
+            if running[i]:
+                print(f"[episode {i}] obs={np.round(obs_before[i], 2)} action={np.round(action[i], 3)} "
+                      f"reward={rewards[i]:+.2f} stopped_early={bool(response['stopped_early'][i])} "
+                      f"too_short={bool(response['too_short'][i])}")
+
+        running &= ~dones
+
+    return {
+        "return": returns,
+        "early_stop_rate": early_stops / lengths,
+        "too_short_rate": too_shorts / lengths,
+        "work_minutes": work,
+        "length": lengths.astype(np.float64),
+    }
+
+
+def summarize(episodes):
+    """Mean and 95% confidence interval (normal approximation) of every metric."""
+    summary = {}
+    for name in METRICS:
+        values = episodes[name]
+        half_width = 1.96 * values.std(ddof=1) / np.sqrt(values.size) if values.size > 1 else float("nan")
+        summary[name] = {"mean": float(values.mean()), "ci95": float(half_width)}
+    summary["episodes"] = int(episodes["return"].size)
+    return summary
+
+
+def load_checkpoint(algorithm, step):
+    """(model, VecNormalize) of {algorithm}/models/{step}.zip and {algorithm}/VecEnv/{step}.pkl, on the CPU."""
+    import pickle
+    import torch
+    import stable_baselines3
+
+    torch.set_num_threads(1)
+    model_path, vec_path, _ = checkpoint_paths(algorithm, step, CHECKPOINT_ROOT)
+    model = getattr(stable_baselines3, algorithm).load(model_path, device="cpu")
+    with open(vec_path, "rb") as f:
+        normalizer = pickle.load(f)
+    return model, normalizer
+
+
+def evaluate_checkpoint(algorithm, step, n_episodes=1000, seed=0, deterministic=True, show=0):
+    """Load {algorithm}/models/{step}.zip (+ VecNormalize stats) and summarize its episodes."""
+    model, normalizer = load_checkpoint(algorithm, step)
+    episodes = run_episodes(model, normalizer, n_episodes, seed, deterministic, show)
+    return {"algorithm": algorithm, "step": step, **summarize(episodes)}
+
+
+def _evaluate_job(job):
+    return evaluate_checkpoint(*job)
+
+
+def print_table(results):
+    header = f"{'checkpoint':18s} {'return':>18s} {'early stop':>16s} {'too short':>16s} {'work min':>18s}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        name = f"{r['algorithm']}/{r['step']}"
+        cells = [f"{r[m]['mean']:8.3f} ± {r[m]['ci95']:.3f}" for m in ("return", "early_stop_rate", "too_short_rate")]
+        work = f"{r['work_minutes']['mean']:8.1f} ± {r['work_minutes']['ci95']:.1f}"
+        print(f"{name:18s} {cells[0]:>18s} {cells[1]:>16s} {cells[2]:>16s} {work:>18s}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="SAC")
+    parser.add_argument("--steps", default="10000", help="comma separated checkpoint steps")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stochastic", action="store_true", help="sample actions instead of the deterministic policy")
+    parser.add_argument("--random", action="store_true", help="evaluate uniformly random actions (baseline)")
+    parser.add_argument("--show", type=int, default=0, help="print the steps of the first N episodes")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    if args.random:
+        episodes = run_episodes(None, None, args.episodes, args.seed, show=args.show)
+        results = [{"algorithm": "random", "step": 0, **summarize(episodes)}]
+    else:
+        steps = [int(s) for s in args.steps.split(",") if s]
+        jobs = [(args.algorithm, step, args.episodes, args.seed, not args.stochastic, args.show) for step in steps]
+        if len(jobs) == 1:
+            results = [_evaluate_job(jobs[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                results = list(pool.map(_evaluate_job, jobs))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
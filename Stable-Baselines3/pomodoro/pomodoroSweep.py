@@ -0,0 +1,271 @@
+"""
+pomodoroSweep.py
+
+Parallel hyperparameter sweep for the Pomodoro agents.
+
+> `python pomodoroSweep.py --trials 24 --workers 4 --timesteps 30000`
+> `python pomodoroSweep.py --space my_space.json --algorithms SAC,PPO`
+
+Each trial samples an algorithm, its hyperparameters and the PomodoroEnv
+reward / user-profile parameters from the search space, then trains on a
+BatchedPomodoroVecEnv + VecNormalize. Trials run in a process pool, one
+core each (torch is limited to one thread per worker).
+
+Every --eval-every timesteps the trial is evaluated on the *default*
+PomodoroEnv (same rewards and user for every trial, so scores are
+comparable even when the trial trains with other reward parameters).
+A trial is pruned when its score is below the median of the other trials
+at the same point (after --prune-warmup reports there).
+
+Output (--out, default sweeps/<timestamp>):
+ - leaderboard.csv / leaderboard.json: every trial, best first
+ - trials/<id>/model.zip + vecnormalize.pkl: completed trials
+ - best/: copy of the best trial (model.zip, vecnormalize.pkl, trial.json)
+
+Search space format (JSON): a list samples one of its values,
+{"low": a, "high": b} samples uniformly, add "log": true for log-uniform
+and "int": true for integers. Per-algorithm hyperparameters only list the
+kwargs that algorithm accepts (A2C/PPO's n_steps is a rollout length,
+SAC's n_steps would mean n-step returns and is left out).
+"""
+
+import warnings
+warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
+
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager
+
+import numpy as np
+
+from pomodoroVecEnv import BatchedPomodoroVecEnv
+from pomodoroEval import run_episodes
+
+# exportPolicy.py lives in the parent folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from exportPolicy import ALGORITHMS
+
+SEARCH_SPACE = {
+    "algorithm": ALGORITHMS,
+    "hyperparameters": {
+        "A2C": {
+            "learning_rate": {"low": 1e-5, "high": 3e-3, "log": True},
+            "n_steps": [5, 8, 16, 32],
+            "gamma": [0.9, 0.95, 0.99],
+            "ent_coef": {"low": 1e-4, "high": 5e-2, "log": True},
+        },
+        "PPO": {
+            "learning_rate": {"low": 1e-5, "high": 3e-3, "log": True},
+            "n_steps": [256, 512, 1024, 2048],
+            "batch_size": [32, 64, 128],
+            "gamma": [0.9, 0.95, 0.99],
+            "ent_coef": {"low": 1e-4, "high": 5e-2, "log": True},
+            "clip_range": [0.1, 0.2, 0.3],
+        },
+        "SAC": {
+            "learning_rate": {"low": 1e-5, "high": 3e-3, "log": True},
+            "batch_size": [64, 128, 256],
+            "gamma": [0.9, 0.95, 0.99],
+            "tau": [0.005, 0.01, 0.02],
+            "ent_coef": ["auto", 0.01, 0.05],
+            "learning_starts": [100, 1000],
+        },
+    },
+    # PomodoroEnv keyword arguments (reward shaping)
+    "env": {
+        "early_stop_penalty": {"low": -4.0, "high": -1.0},
+        "too_short_penalty": {"low": -2.0, "high": -0.5},
+        "adherence_reward": [2.0],
+    },
+    # PomodoroEnv user_profile (the simulated user trained against)
+    "user_profile": {
+        "preferred_work_base": [25.0],
+        "preferred_break_base": [5.0],
+        "variability": {"low": 2.0, "high": 6.0},
+        "early_stop_sensitivity": {"low": 0.08, "high": 0.16},
+        "too_short_sensitivity": {"low": 0.05, "high": 0.15},
+        "fatigue_influence": {"low": 0.5, "high": 0.9},
+    },
+}
+
+
+# --------------------
+# Sampling
+# --------------------
+def sample_value(spec, rng):
+    if isinstance(spec, list):
+        return spec[int(rng.integers(len(spec)))]
+    low, high = spec["low"], spec["high"]
+    if spec.get("log", False):
+        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    else:
+        value = float(rng.uniform(low, high))
+    return int(round(value)) if spec.get("int", False) else value
+
+
+def sample_trial(space, rng, algorithms=None):
+    algorithms = algorithms or space["algorithm"]
+    algorithm = sample_value(list(algorithms), rng)
+    return {
+        "algorithm": algorithm,
+        "hyperparameters": {k: sample_value(v, rng) for k, v in space["hyperparameters"][algorithm].items()},
+        "env": {k: sample_value(v, rng) for k, v in space.get("env", {}).items()},
+        "user_profile": {k: sample_value(v, rng) for k, v in space.get("user_profile", {}).items()},
+    }
+
+
+# --------------------
+# Trials (run in worker processes)
+# --------------------
+def _init_worker():
+    # One core per trial: no intra-op thread pools fighting over the CPU
+    import torch
+    torch.set_num_threads(1)
+
+
+def should_prune(reports, lock, trial_id, checkpoint, score, warmup):
+    """Median pruning: report `score` and compare it with the other trials at this checkpoint."""
+    key = str(checkpoint)
+    with lock:
+        others = [s for t, s in reports.get(key, []) if t != trial_id]
+        reports[key] = reports.get(key, []) + [(trial_id, score)]  # proxy dicts need reassignment
+    return len(others) >= warmup and score < float(np.median(others))
+
+
+def run_trial(trial_id, trial, args, reports, lock):
+    import stable_baselines3
+    from stable_baselines3.common.vec_env import VecNormalize
+
+    start = time.time()
+    algorithm_class = getattr(stable_baselines3, trial["algorithm"])
+
+    env = BatchedPomodoroVecEnv(
+        args["num_envs"], seed=args["seed"] + trial_id,
+        user_profile=trial["user_profile"], **trial["env"],
+    )
+    env = VecNormalize(env, norm_obs=True, norm_reward=False)
+    model = algorithm_class("MlpPolicy", env, seed=args["seed"] + trial_id, verbose=0, **trial["hyperparameters"])
+
+    result = {"trial": trial_id, **trial, "status": "complete", "history": []}
+    checkpoint = 0
+    while model.num_timesteps < args["timesteps"]:
+        model.learn(total_timesteps=args["eval_every"], reset_num_timesteps=False)
+        checkpoint += 1
+        # Scored on the default PomodoroEnv, see pomodoroEval.py
+        score = float(run_episodes(model, env, args["eval_episodes"], args["seed"])["return"].mean())
+        result["history"].append((model.num_timesteps, score))
+        result["score"] = score
+        if model.num_timesteps < args["timesteps"] and should_prune(reports, lock, trial_id, checkpoint, score, args["prune_warmup"]):
+            result["status"] = "pruned"
+            break
+
+    if result["status"] == "complete":
+        trial_dir = f"{args['out']}/trials/{trial_id}"
+        os.makedirs(trial_dir, exist_ok=True)
+        model.save(f"{trial_dir}/model.zip")
+        env.save(f"{trial_dir}/vecnormalize.pkl")
+        result["model"] = f"{trial_dir}/model.zip"
+        result["vecnormalize"] = f"{trial_dir}/vecnormalize.pkl"
+
+    result["timesteps"] = int(model.num_timesteps)
+    result["seconds"] = time.time() - start
+    env.close()
+    return result
+
+
+# --------------------
+# Output
+# --------------------
+def write_leaderboard(out, results):
+    ranked = sorted(results, key=lambda r: (r["status"] != "complete", -r.get("score", -np.inf)))
+    with open(f"{out}/leaderboard.json", "w") as f:
+        json.dump(ranked, f, indent=2)
+
+    with open(f"{out}/leaderboard.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "trial", "algorithm", "status", "score", "timesteps", "seconds", "params"])
+        for rank, r in enumerate(ranked, 1):
+            params = {**r["hyperparameters"], **r["env"], **r["user_profile"]}
+            writer.writerow([rank, r["trial"], r["algorithm"], r["status"], r.get("score"),
+                             r["timesteps"], round(r["seconds"], 1), json.dumps(params)])
+    return ranked
+
+
+def save_best(out, ranked):
+    best = next((r for r in ranked if r["status"] == "complete"), None)
+    if best is None:
+        return None
+    best_dir = f"{out}/best"
+    os.makedirs(best_dir, exist_ok=True)
+    shutil.copyfile(best["model"], f"{best_dir}/model.zip")
+    shutil.copyfile(best["vecnormalize"], f"{best_dir}/vecnormalize.pkl")
+    with open(f"{best_dir}/trial.json", "w") as f:
+        json.dump(best, f, indent=2)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--timesteps", type=int, default=30_000, help="training budget per trial")
+    parser.add_argument("--eval-every", type=int, default=5_000)
+    parser.add_argument("--eval-episodes", type=int, default=200)
+    parser.add_argument("--prune-warmup", type=int, default=3, help="reports needed at a checkpoint before pruning")
+    parser.add_argument("--num-envs", type=int, default=8, help="BatchedPomodoroVecEnv users per trial")
+    parser.add_argument("--algorithms", default=None, help=f"comma separated subset of {ALGORITHMS}")
+    parser.add_argument("--space", default=None, help="search space JSON (default: SEARCH_SPACE)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args(argv)
+
+    space = SEARCH_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    algorithms = args.algorithms.split(",") if args.algorithms else None
+    for algorithm in algorithms or []:
+        assert algorithm in space["hyperparameters"], f"Invalid algorithm {algorithm}: not in the search space"
+
+    out = args.out or f"sweeps/{time.strftime('%Y%m%d-%H%M%S')}"
+    os.makedirs(out, exist_ok=True)
+    with open(f"{out}/space.json", "w") as f:
+        json.dump(space, f, indent=2)
+
+    rng = np.random.default_rng(args.seed)
+    trials = [sample_trial(space, rng, algorithms) for _ in range(args.trials)]
+    trial_args = {k: getattr(args, k) for k in ("timesteps", "eval_every", "eval_episodes", "prune_warmup", "num_envs", "seed")}
+    trial_args["out"] = out
+
+    results = []
+    with Manager() as manager:
+        reports, lock = manager.dict(), manager.Lock()
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+            futures = {pool.submit(run_trial, i, trial, trial_args, reports, lock): i for i, trial in enumerate(trials)}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    trial = trials[futures[future]]
+                    result = {"trial": futures[future], **trial, "status": f"failed: {type(e).__name__}: {e}",
+                              "timesteps": 0, "seconds": 0.0, "history": []}
+                results.append(result)
+                print(f"trial {result['trial']:3d} {result['algorithm']:4s} {result['status']:10s} "
+                      f"score={result.get('score', float('nan')):.3f} ({result['seconds']:.0f}s)")
+                write_leaderboard(out, results)
+
+    ranked = write_leaderboard(out, results)
+    best = save_best(out, ranked)
+    if best is not None:
+        print(f"best: trial {best['trial']} {best['algorithm']} score={best['score']:.3f} -> {out}/best")
+    print("leaderboard:", f"{out}/leaderboard.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,24 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="pygame.pkgdata")
 
 import os
+import sys
+import argparse
+from functools import partial
 import gymnasium as gym
 from gymnasium.wrappers import RescaleAction
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
 from stable_baselines3.common.monitor import Monitor
 from stable_baselines3 import SAC
 from pomodoroEnv import PomodoroEnv
+from pomodoroVecEnv import BatchedPomodoroVecEnv
+from shmVecEnv import ShmVecEnv
+from noiseStream import spawn_seeds
+from userPopulation import UserPopulation
+from trainProfiler import TrainingProfiler, TOOLS as PROFILE_TOOLS
+
+# checkpointManager.py lives one level up, next to main2.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from checkpointManager import CheckpointManager
 
 algorithm = "SAC"
 
@@ -15,6 +27,12 @@ models_dir = algorithm + "/models"
 VecEnv_dir = algorithm + "/VecEnv"
 logdir = "logs"
 #C:> tensorboard --logdir=logs
+#C:> python pomodoroTrain.py --num-envs 8 --vec-backend shm
+#C:> python pomodoroTrain.py --iters 5 --keep-last 3   (resumes from the latest checkpoint)
+#C:> python pomodoroTrain.py --population default --observe-profile
+#C:> python pomodoroTrain.py --profile --profile-at 5000 --profile-steps 500   (profile/* scalars in TensorBoard)
+
+VEC_BACKENDS = ["dummy", "subproc", "shm", "batched"]
 
 if not os.path.exists(models_dir):
     os.makedirs(models_dir)
@@ -27,7 +45,7 @@ if not os.path.exists(logdir):
 
 
 
-def make_env():
+def make_env(seed=None, population=None, observe_profile=False):
     user_profile={
         "preferred_work_base": 25.0,
         "preferred_break_base": 5.0,
@@ -39,34 +57,108 @@ def make_env():
 
     env = PomodoroEnv(
         # user_profile=user_profile
+        seed=seed,
+        population=population,
+        observe_profile=observe_profile,
+        # RescaleAction keeps the actions in bounds, nothing reads the step info
+        fast_mode=True,
+        return_info=False,
         )
     env = RescaleAction(env, -1, 1)
     env = Monitor(env)
     return env
 
 
-env = DummyVecEnv([make_env])
-
-env = VecNormalize(env, norm_obs=True, norm_reward=False)
-
-# Train a model with a `stable_baselines3` algorithm
-model = SAC('MlpPolicy', env, verbose=1, tensorboard_log=logdir, 
-# Optional hyperparameters
-    # seed = 33,
-    learning_rate=3e-4,
-    n_steps=2048,
-    batch_size=64,
-    ent_coef=0.01,
-    # clip_range=0.2,
-    )
-
+def make_vec_env(num_envs=1, vec_backend="dummy", seed=None, population=None, observe_profile=False):
+    """
+    dummy:   all envs stepped in this process (original setup)
+    subproc: one process per env, results pickled over pipes
+    shm:     one process per env, results written to shared memory
+    batched: BatchedPomodoroVecEnv, all users simulated as NumPy arrays
+
+    VecNormalize is applied on top in this process for every backend,
+    so the saved VecEnv/*.pkl files load the same way in main2.py.
+
+    seed: root seed; each env gets its own noise stream from SeedSequence.spawn,
+    so a run is reproducible for a given seed and num_envs.
+    population / observe_profile: see userPopulation.py (one shared population for all envs)
+    """
+    env_fns = [partial(make_env, seed=child, population=population, observe_profile=observe_profile)
+               for child in spawn_seeds(seed, num_envs)]
+    if vec_backend == "dummy":
+        return DummyVecEnv(env_fns)
+    if vec_backend == "subproc":
+        return SubprocVecEnv(env_fns)
+    if vec_backend == "shm":
+        return ShmVecEnv(env_fns)
+    if vec_backend == "batched":
+        return BatchedPomodoroVecEnv(num_envs, seed=seed, population=population, observe_profile=observe_profile)
+    raise ValueError(f"Unknown vec backend {vec_backend!r}, expected one of {VEC_BACKENDS}")
+
+
+# Worker processes (subproc/shm) re-import this file, so training only runs from __main__
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-envs", type=int, default=1)
+    parser.add_argument("--vec-backend", choices=VEC_BACKENDS, default="dummy")
+    parser.add_argument("--seed", type=int, default=None, help="root seed of the simulated users' noise")
+    parser.add_argument("--population", default=None,
+                        help="'default' or a JSON distribution file: draw a new simulated user every episode")
+    parser.add_argument("--population-size", type=int, default=10_000)
+    parser.add_argument("--observe-profile", action="store_true", help="append the user profile to the observation")
+    parser.add_argument("--iters", type=int, default=1, help="save a checkpoint every TIMESTEPS, this many times")
+    parser.add_argument("--keep-last", type=int, default=3)
+    parser.add_argument("--keep-best", type=int, default=1)
+    parser.add_argument("--no-replay-buffer", action="store_true", help="don't save/restore the SAC replay buffer")
+    parser.add_argument("--fresh", action="store_true", help="don't resume from the latest checkpoint")
+    parser.add_argument("--profile", action="store_true", help="record per-phase time, steps/s and gradient steps/s")
+    parser.add_argument("--profile-at", default="", help="comma-separated timesteps at which a profiler capture starts")
+    parser.add_argument("--profile-steps", type=int, default=1000, help="env steps per capture")
+    parser.add_argument("--profile-tool", choices=PROFILE_TOOLS, default="cprofile")
+    args = parser.parse_args()
+
+    checkpoints = CheckpointManager(models_dir, VecEnv_dir, keep_last=args.keep_last, keep_best=args.keep_best,
+                                    save_replay_buffer=not args.no_replay_buffer)
+
+    population = None
+    if args.population == "default":
+        population = UserPopulation(size=args.population_size)
+    elif args.population:
+        population = UserPopulation.from_json(args.population, size=args.population_size)
+
+    env = make_vec_env(args.num_envs, args.vec_backend, args.seed, population, args.observe_profile)
+
+    model = None
+    if not args.fresh:
+        model, env = checkpoints.resume(SAC, env, tensorboard_log=logdir)
+
+    if model is None:
+        env = VecNormalize(env, norm_obs=True, norm_reward=False)
+
+        # Train a model with a `stable_baselines3` algorithm
+        model = SAC('MlpPolicy', env, verbose=1, tensorboard_log=logdir, 
+        # Optional hyperparameters
+            # seed = 33,
+            learning_rate=3e-4,
+            n_steps=2048,
+            batch_size=64,
+            ent_coef=0.01,
+            # clip_range=0.2,
+            )
+
+
+    profiler = None
+    if args.profile or args.profile_at:
+        profiler = TrainingProfiler(
+            profile_at=[int(t) for t in args.profile_at.split(",") if t],
+            profile_steps=args.profile_steps,
+            tool=args.profile_tool,
+            verbose=1,
+        )
 
-TIMESTEPS = 10_000
-iters = 0
-for _ in range(1):
-    iters += 1
-    
-    # model.learn(total_timesteps=10_000)
-    model.learn(total_timesteps=TIMESTEPS, reset_num_timesteps=False, tb_log_name=algorithm)
-    model.save(f"{models_dir}/{TIMESTEPS*iters}")
-    env.save(f"{VecEnv_dir}/{TIMESTEPS*iters}.pkl")
\ No newline at end of file
+    TIMESTEPS = 10_000
+    for _ in range(args.iters):
+        # model.learn(total_timesteps=10_000)
+        model.learn(total_timesteps=TIMESTEPS, reset_num_timesteps=False, tb_log_name=algorithm, callback=profiler)
+        # Saved as {models_dir}/{model.num_timesteps}.zip + {VecEnv_dir}/{model.num_timesteps}.pkl
+        checkpoints.save(model, env)
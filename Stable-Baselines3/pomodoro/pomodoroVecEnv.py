@@ -0,0 +1,314 @@
+"""
+pomodoroVecEnv.py
+
+A native Stable-Baselines3 VecEnv that simulates N Pomodoro users at once.
+
+Same dynamics and reward as PomodoroEnv, but every per-user quantity
+(fatigue, daily totals, step counters and user-profile parameters) is kept
+as a (N,) NumPy array and one step() advances all users with array ops.
+No Python branching per user, no per-step state arrays per env.
+
+By default the action space is [-1, 1] (same as PomodoroEnv wrapped with
+RescaleAction(env, -1, 1)) and finished episodes report Monitor-style
+info["episode"], so it is a drop-in replacement for
+DummyVecEnv([make_env]) in pomodoroTrain.py and the saved VecNormalize
+statistics stay compatible.
+"""
+
+import time
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, VecEnvIndices, VecEnvObs, VecEnvStepReturn
+
+try:
+    from pomodoroEnv import PomodoroEnv
+    from noiseStream import BatchNoiseStream, SeedLike
+    from userPopulation import PROFILE_KEYS
+except ImportError:
+    from pomodoro.pomodoroEnv import PomodoroEnv
+    from pomodoro.noiseStream import BatchNoiseStream, SeedLike
+    from pomodoro.userPopulation import PROFILE_KEYS
+
+
+class BatchedPomodoroVecEnv(VecEnv):
+    """
+    num_envs: number of simulated users stepped together
+    rescale_action: expect actions in [-1, 1] (like RescaleAction) instead of minutes
+    seed: root seed (int or SeedSequence) of the block noise stream, see noiseStream.py
+    env_kwargs: forwarded to PomodoroEnv (ranges, rewards, user_profile, population, observe_profile, ...)
+    """
+
+    def __init__(
+        self,
+        num_envs: int = 1,
+        *,
+        rescale_action: bool = True,
+        seed: SeedLike = None,
+        **env_kwargs,
+    ):
+        assert num_envs > 0, "Invalid number of envs: num_envs must be > 0"
+
+        # Template env: validates the parameters and gives us the spaces/constants
+        self.template = PomodoroEnv(**env_kwargs)
+        t = self.template
+
+        self.min_work, self.max_work = float(t.min_work), float(t.max_work)
+        self.min_break, self.max_break = float(t.min_break), float(t.max_break)
+        self.min_fatigue, self.max_fatigue = float(t.min_fatigue), float(t.max_fatigue)
+        self.max_work_minutes_day = float(t.max_work_minutes_day)
+        self.max_break_minutes_day = float(t.max_break_minutes_day)
+        self.max_steps_per_episode = t.max_steps_per_episode
+
+        self.rescale_action = rescale_action
+        if rescale_action:
+            action_space = spaces.Box(low=-1.0, high=1.0, shape=(2,), dtype=np.float32)
+        else:
+            action_space = t.action_space
+
+        super().__init__(num_envs, t.observation_space, action_space)
+        self.metadata = t.metadata
+
+        # User profile, one value per simulated user
+        # (with a population, every reset gathers new users from its columns)
+        self.set_user_profile(t.user_profile)
+        self.population = t.population
+        self.observe_profile = t.observe_profile
+
+        # Per-user state
+        self.fatigue = np.zeros(num_envs, dtype=np.float64)
+        self.total_work = np.zeros(num_envs, dtype=np.float64)
+        self.total_break = np.zeros(num_envs, dtype=np.float64)
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+
+        # Monitor-style episode statistics
+        self.episode_returns = np.zeros(num_envs, dtype=np.float64)
+        self.episode_lengths = np.zeros(num_envs, dtype=np.int64)
+        self.t_start = time.time()
+
+        self.noise = BatchNoiseStream(num_envs, seed, bit_generator=t.bit_generator)
+        self.actions = np.zeros((num_envs, 2), dtype=np.float32)
+        self.last_response: dict = {}
+
+    # --------------------
+    # User profile
+    # --------------------
+    def set_user_profile(self, user_profile: dict, indices: VecEnvIndices = None) -> None:
+        """
+        Set the user profile of some (or all) simulated users.
+        Values can be scalars or arrays with one value per selected user.
+        """
+        if not hasattr(self, "profile"):
+            self.profile = {key: np.zeros(self.num_envs, dtype=np.float64) for key in user_profile}
+        idx = self._index_array(indices)
+        for key, value in user_profile.items():
+            self.profile[key][idx] = value
+
+    # --------------------
+    # VecEnv API
+    # --------------------
+    def reset(self) -> VecEnvObs:
+        if self._seeds[0] is not None:
+            # VecEnv.seed(s) gives [s, s+1, ...]; one stream (with a column per user) is enough
+            self.noise = BatchNoiseStream(self.num_envs, self._seeds[0], bit_generator=self.template.bit_generator)
+        self._reset_seeds()
+        self._reset_options()
+
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+        return self._get_obs()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.actions = np.asarray(actions, dtype=np.float32).reshape(self.num_envs, 2)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        a = self.actions.astype(np.float64)
+        if self.rescale_action:
+            # Same affine map as gymnasium's RescaleAction
+            a = np.clip(a, -1.0, 1.0)
+            recommended_work = self.min_work + (a[:, 0] + 1.0) * 0.5 * (self.max_work - self.min_work)
+            recommended_break = self.min_break + (a[:, 1] + 1.0) * 0.5 * (self.max_break - self.min_break)
+        else:
+            recommended_work = a[:, 0]
+            recommended_break = a[:, 1]
+        recommended_work = np.clip(recommended_work, self.min_work, self.max_work)
+        recommended_break = np.clip(recommended_break, self.min_break, self.max_break)
+
+        actual_work, actual_break, stopped_early, too_short, new_fatigue = self._simulate_user_response(
+            recommended_work,
+            recommended_break,
+            self.fatigue,
+        )
+
+        # Last user response, per user (read by pomodoroEval.py)
+        self.last_response = {
+            "actual_work": actual_work,
+            "actual_break": actual_break,
+            "stopped_early": stopped_early,
+            "too_short": too_short,
+        }
+
+        # Update state
+        self.fatigue = new_fatigue
+        self.total_work += actual_work
+        self.total_break += actual_break
+
+        rewards = self._compute_reward(recommended_work, actual_work, stopped_early, too_short)
+
+        # Step counters & termination (same convention as PomodoroEnv.step)
+        self.current_step += 1
+        truncated = (self.total_work >= self.max_work_minutes_day) | (self.total_break >= self.max_break_minutes_day)
+        terminated = self.current_step >= self.max_steps_per_episode
+        dones = terminated | truncated
+
+        self.episode_returns += rewards
+        self.episode_lengths += 1
+
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        if dones.any():
+            terminal_obs = self._get_obs()
+            elapsed = round(time.time() - self.t_start, 6)
+            for i in np.flatnonzero(dones):
+                infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+                infos[i]["terminal_observation"] = terminal_obs[i]
+                infos[i]["episode"] = {
+                    "r": round(float(self.episode_returns[i]), 6),
+                    "l": int(self.episode_lengths[i]),
+                    "t": elapsed,
+                }
+            # Auto-reset the finished users
+            self._reset_envs(dones)
+
+        return self._get_obs(), rewards.astype(np.float32), dones, infos
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        value = getattr(self, attr_name) if hasattr(self, attr_name) else getattr(self.template, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        idx = self._index_array(indices)
+        if attr_name == "user_profile":
+            self.set_user_profile(value, idx)
+            return
+        # Per-user state (fatigue, totals, ...): only the selected users
+        current = getattr(self, attr_name, None)
+        if isinstance(current, np.ndarray) and current.shape[:1] == (self.num_envs,):
+            current[idx] = value
+            return
+        # Anything else is shared by all users; set it where get_attr reads it
+        assert len(np.unique(idx)) == self.num_envs, \
+            f"Invalid indices: {attr_name} is shared by all users and cannot be set for a subset"
+        setattr(self if hasattr(self, attr_name) else self.template, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        method = getattr(self.template, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices: VecEnvIndices = None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    # --------------------
+    # Helpers
+    # --------------------
+    def _index_array(self, indices: VecEnvIndices) -> np.ndarray:
+        if indices is None:
+            return np.arange(self.num_envs)
+        return np.asarray(list(self._get_indices(indices)), dtype=np.int64)
+
+    def _get_obs(self) -> np.ndarray:
+        columns = [self.fatigue, self.total_work, self.total_break]
+        if self.observe_profile:
+            columns += [self.profile[key] for key in PROFILE_KEYS]
+        return np.stack(columns, axis=1).astype(np.float32)
+
+    def _reset_envs(self, mask: np.ndarray) -> None:
+        n = int(mask.sum())
+        # New simulated users from the population
+        if self.population is not None:
+            users = self.population.gather(self.noise.reset_generator.integers(0, self.population.size, size=n))
+            for key, values in users.items():
+                self.profile[key][mask] = values
+        # Start the day with some random baseline fatigue
+        self.fatigue[mask] = self.noise.reset_generator.uniform(self.min_fatigue, self.max_fatigue, size=n)
+        self.total_work[mask] = 0.0
+        self.total_break[mask] = 0.0
+        self.current_step[mask] = 0
+        self.episode_returns[mask] = 0.0
+        self.episode_lengths[mask] = 0
+
+    def _simulate_user_response(
+        self,
+        recommended_work: np.ndarray,
+        recommended_break: np.ndarray,
+        fatigue: np.ndarray,
+    ):
+        """
+        Vectorized version of PomodoroEnv._simulate_user_response
+
+        Returns:
+          actual_work, actual_break, stopped_early, too_short, new_fatigue
+        """
+        p = self.profile
+        # Same noise layout as PomodoroEnv: 3 standard normals, 4 uniforms per user
+        z, u = self.noise.next_step()
+
+        # Simulated variation in user's preferred work duration (at least 5 minutes)
+        preferred_work = np.maximum(5.0, p["preferred_work_base"] + z[0] * p["variability"])
+
+        fatigue_factor = fatigue / self.max_fatigue
+
+        # Too long -> early-stop probability grows with fatigue and length mismatch
+        too_long = recommended_work > preferred_work
+        early_stop_prob = (
+            p["early_stop_sensitivity"] * (1.0 + fatigue_factor * p["fatigue_influence"])
+            + 0.9 * (recommended_work - preferred_work) / preferred_work
+        )
+        early_stop_prob = np.clip(early_stop_prob, 0.0, 0.95)
+        stopped_early = too_long & (u[0] < early_stop_prob)
+
+        # Too short -> user may report it
+        shorter = recommended_work < preferred_work
+        too_short_prob = (
+            p["too_short_sensitivity"]
+            * ((preferred_work - recommended_work) / preferred_work)
+            * (1.0 + 0.5 * u[1])
+        )
+        too_short_prob = np.clip(too_short_prob, 0.0, 0.95)
+        too_short = shorter & (u[2] < too_short_prob)
+
+        # Work calculation
+        frac = np.maximum(0.15, 1.0 - 0.5 * fatigue_factor - 0.4 * u[3])
+        work_if_stopped = np.maximum(1.0, recommended_work * frac)
+        work_if_kept = np.clip(
+            recommended_work + 2.0 * z[1],
+            1.0,
+            recommended_work + 5.0,
+        )
+        actual_work = np.where(stopped_early, work_if_stopped, work_if_kept)
+
+        # Break calculation
+        actual_break = np.clip(
+            recommended_break + z[2],
+            0.0,
+            recommended_break + 3.0,
+        )
+
+        # Update fatigue
+        fatigue_change = (actual_work / 60.0) * 1.0 - (actual_break / 60.0) * 0.6
+        new_fatigue = np.clip(fatigue + fatigue_change, self.min_fatigue, self.max_fatigue)
+
+        return actual_work, actual_break, stopped_early, too_short, new_fatigue
+
+    def _compute_reward(
+        self,
+        recommended_work: np.ndarray,
+        actual_work: np.ndarray,
+        stopped_early: np.ndarray,
+        too_short: np.ndarray,
+    ) -> np.ndarray:
+        """Vectorized version of PomodoroEnv._compute_reward (shared with the offline replay buffers)"""
+        return self.template._compute_rewards(recommended_work, actual_work, stopped_early, too_short)
@@ -0,0 +1,180 @@
+"""
+shmVecEnv.py
+
+SubprocVecEnv variant where observations, rewards, dones and actions travel
+through preallocated multiprocessing.shared_memory buffers.
+
+Each worker owns one environment and a row of every buffer. The pipe is only
+used for the command itself and for the (small) info dicts, so nothing
+array-sized is pickled on the hot path.
+
+VecNormalize still wraps this VecEnv in the main process, so its running
+statistics (and the VecEnv/*.pkl files) are the same as with DummyVecEnv.
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv, VecEnvObs, VecEnvStepReturn
+from stable_baselines3.common.vec_env.patch_gym import _patch_env
+
+
+def _worker(
+    remote,
+    parent_remote,
+    env_fn_wrapper: CloudpickleWrapper,
+    env_idx: int,
+    buffers: dict,
+) -> None:
+    parent_remote.close()
+    env = _patch_env(env_fn_wrapper.var())
+
+    # Views on the shared buffers; this worker only touches row env_idx
+    # (the main process owns the blocks and unlinks them on close)
+    blocks = {key: shared_memory.SharedMemory(name=name) for key, (name, _, _) in buffers.items()}
+    views = {
+        key: np.ndarray(shape, dtype=dtype, buffer=blocks[key].buf)
+        for key, (_, shape, dtype) in buffers.items()
+    }
+    obs_buf, rew_buf, done_buf, act_buf = views["obs"], views["rew"], views["done"], views["act"]
+
+    try:
+        while True:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                observation, reward, terminated, truncated, info = env.step(act_buf[env_idx].copy())
+                # convert to SB3 VecEnv api
+                done = terminated or truncated
+                info["TimeLimit.truncated"] = truncated and not terminated
+                reset_info = {}
+                if done:
+                    # save final observation where user can get it, then reset
+                    info["terminal_observation"] = observation
+                    observation, reset_info = env.reset()
+                obs_buf[env_idx] = observation
+                rew_buf[env_idx] = reward
+                done_buf[env_idx] = done
+                remote.send((info, reset_info))
+            elif cmd == "reset":
+                maybe_options = {"options": data[1]} if data[1] else {}
+                observation, reset_info = env.reset(seed=data[0], **maybe_options)
+                obs_buf[env_idx] = observation
+                remote.send(reset_info)
+            elif cmd == "render":
+                remote.send(env.render())
+            elif cmd == "close":
+                env.close()
+                remote.close()
+                break
+            elif cmd == "env_method":
+                method = env.get_wrapper_attr(data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == "get_attr":
+                remote.send(env.get_wrapper_attr(data))
+            elif cmd == "has_attr":
+                try:
+                    env.get_wrapper_attr(data)
+                    remote.send(True)
+                except AttributeError:
+                    remote.send(False)
+            elif cmd == "set_attr":
+                remote.send(setattr(env, data[0], data[1]))
+            elif cmd == "is_wrapped":
+                remote.send(is_wrapped(env, data))
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del obs_buf, rew_buf, done_buf, act_buf, views
+        for block in blocks.values():
+            block.close()
+
+
+class ShmVecEnv(SubprocVecEnv):
+    """
+    env_fns: environments to run in subprocesses (one process per env)
+    start_method: same as SubprocVecEnv ('forkserver' by default on Linux)
+    """
+
+    def __init__(self, env_fns: List[Callable[[], gym.Env]], start_method: Optional[str] = None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        # Spaces are needed up front to size the shared buffers
+        probe = env_fns[0]()
+        observation_space, action_space = probe.observation_space, probe.action_space
+        probe.close()
+        assert isinstance(observation_space, spaces.Box), "ShmVecEnv only supports Box observations"
+        assert isinstance(action_space, spaces.Box), "ShmVecEnv only supports Box actions"
+
+        layout = {
+            "obs": ((n_envs, *observation_space.shape), observation_space.dtype),
+            "rew": ((n_envs,), np.float32),
+            "done": ((n_envs,), np.bool_),
+            "act": ((n_envs, *action_space.shape), action_space.dtype),
+        }
+        self._blocks = {}
+        self._arrays = {}
+        buffers = {}
+        for key, (shape, dtype) in layout.items():
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            block = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._blocks[key] = block
+            self._arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            self._arrays[key][...] = 0
+            buffers[key] = (block.name, shape, np.dtype(dtype).str)
+
+        if start_method is None:
+            forkserver_available = "forkserver" in mp.get_all_start_methods()
+            start_method = "forkserver" if forkserver_available else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for env_idx, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+            args = (work_remote, remote, CloudpickleWrapper(env_fn), env_idx, buffers)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        VecEnv.__init__(self, n_envs, observation_space, action_space)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._arrays["act"][...] = np.asarray(actions).reshape(self._arrays["act"].shape)
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self) -> VecEnvStepReturn:
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        infos, self.reset_infos = zip(*results)
+        return self._arrays["obs"].copy(), self._arrays["rew"].copy(), self._arrays["done"].copy(), infos
+
+    def reset(self) -> VecEnvObs:
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._arrays["obs"].copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        self._arrays = {}
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
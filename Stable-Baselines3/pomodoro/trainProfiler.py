@@ -0,0 +1,250 @@
+"""
+trainProfiler.py
+
+Where does training time go? An SB3 callback that splits wall time into phases.
+
+Rollout (model.collect_rollouts):
+ - env: PomodoroEnv.step itself (in-process envs), or the whole simulation for BatchedPomodoroVecEnv
+ - wrappers: RescaleAction + Monitor around each PomodoroEnv (DummyVecEnv only)
+ - vec_env: the VecEnv around the envs (DummyVecEnv loop, or pipes/shared memory + workers for subproc/shm)
+ - vec_normalize: VecNormalize on top
+ - policy: everything else in the rollout (action prediction, replay buffer add, callbacks)
+Train (model.train, off-policy only):
+ - replay_sample: replay_buffer.sample (incl. VecNormalize of the batch)
+ - update: everything else (forward/backward passes, optimizer steps, target updates)
+
+Every `log_freq` timesteps the window's milliseconds per env step of every
+phase, steps/s and gradient steps/s (both end-to-end) are recorded on the
+model's logger under profile/, so they land in the run's TensorBoard logs.
+
+The timers wrap the methods of the live objects (instance attributes) on
+training start and are removed on training end, before anything is saved.
+
+`profile_at`: timesteps at which a profiler capture of `profile_steps` env
+steps starts: cProfile (.prof file + top functions printed) or py-spy (flame
+graph .svg, if py-spy is on the PATH), written next to the TensorBoard events.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import shutil
+import signal
+import subprocess
+import time
+import warnings
+from typing import Iterable, List
+
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+PHASES = ["env", "wrappers", "vec_env", "vec_normalize", "policy", "replay_sample", "update"]
+TOOLS = ["cprofile", "py-spy"]
+
+
+class _Timer:
+    """Accumulated wall time of one method, installed as an instance attribute of `obj`."""
+
+    def __init__(self, obj, name: str):
+        self.obj = obj
+        self.name = name
+        self.total = 0.0
+        method = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.total += time.perf_counter() - start
+
+        setattr(obj, name, timed)
+
+    def remove(self) -> None:
+        # Drop the instance attribute, the class method shows through again
+        if self.name in vars(self.obj):
+            delattr(self.obj, self.name)
+
+
+class TrainingProfiler(BaseCallback):
+    """
+    log_freq: timesteps per recorded window
+    profile_at: timesteps at which a capture window starts
+    profile_steps: env steps (calls of env.step) per capture window
+    tool: "cprofile" or "py-spy"
+    """
+
+    def __init__(
+        self,
+        log_freq: int = 1000,
+        profile_at: Iterable[int] = (),
+        profile_steps: int = 1000,
+        tool: str = "cprofile",
+        verbose: int = 0,
+    ):
+        super().__init__(verbose)
+        assert log_freq > 0, "Invalid log frequency: log_freq must be > 0"
+        assert tool in TOOLS, f"Invalid profiler {tool}: expected one of {TOOLS}"
+        if tool == "py-spy" and shutil.which("py-spy") is None:
+            warnings.warn("py-spy not found on the PATH, using cProfile")
+            tool = "cprofile"
+        self.log_freq = log_freq
+        self.profile_at: List[int] = sorted(profile_at)
+        self.profile_steps = profile_steps
+        self.tool = tool
+
+        self._timers = {}
+        self._capture = None
+
+    # --------------------
+    # Callback hooks
+    # --------------------
+    def _on_training_start(self) -> None:
+        self._install_timers()
+        self._rollout = self._train = 0.0
+        self._mark = time.perf_counter()
+        self._window_start = self._mark
+        self._window_steps = self.model.num_timesteps
+        self._window_updates = getattr(self.model, "_n_updates", 0)
+        self._last = self._snapshot()
+        # Captures scheduled before the current timestep are skipped (resumed runs)
+        self.profile_at = [t for t in self.profile_at if t >= self.model.num_timesteps]
+
+    def _on_rollout_start(self) -> None:
+        now = time.perf_counter()
+        self._train += now - self._mark
+        self._mark = now
+        if self.model.num_timesteps - self._window_steps >= self.log_freq:
+            self._record_window()
+
+    def _on_rollout_end(self) -> None:
+        now = time.perf_counter()
+        self._rollout += now - self._mark
+        self._mark = now
+
+    def _on_step(self) -> bool:
+        if self._capture is None and self.profile_at and self.num_timesteps >= self.profile_at[0]:
+            self.profile_at.pop(0)
+            self._start_capture()
+        elif self._capture is not None:
+            self._capture["steps"] += 1
+            if self._capture["steps"] >= self.profile_steps:
+                self._stop_capture()
+        return True
+
+    def _on_training_end(self) -> None:
+        self._train += time.perf_counter() - self._mark
+        if self._capture is not None:
+            self._stop_capture()
+        self._record_window()
+        for timer in self._timers.values():
+            for t in (timer if isinstance(timer, list) else [timer]):
+                t.remove()
+        self._timers = {}
+
+    # --------------------
+    # Phase timers
+    # --------------------
+    def _install_timers(self) -> None:
+        env = self.training_env
+        timers = {"outer": _Timer(env, "step")}
+        if isinstance(env, VecNormalize):
+            # step_async sends the actions (to the workers for subproc/shm), step_wait collects the results
+            timers["inner"] = [_Timer(env.venv, "step_async"), _Timer(env.venv, "step_wait")]
+            env = env.venv
+        if isinstance(env, DummyVecEnv):
+            timers["wrapped"] = [_Timer(e, "step") for e in env.envs]
+            timers["env"] = [_Timer(e.unwrapped, "step") for e in env.envs]
+        elif not hasattr(env, "remotes") and not hasattr(env, "workers"):
+            # In-process simulation of the whole batch (BatchedPomodoroVecEnv): all of it is env time
+            timers["env_batch"] = timers.get("inner", timers["outer"])
+        if getattr(self.model, "replay_buffer", None) is not None:
+            timers["sample"] = _Timer(self.model.replay_buffer, "sample")
+        self._timers = timers
+
+    def _total(self, key: str) -> float:
+        timer = self._timers.get(key)
+        if timer is None:
+            return 0.0
+        if isinstance(timer, list):
+            return sum(t.total for t in timer)
+        return timer.total
+
+    def _snapshot(self) -> dict:
+        return {key: self._total(key) for key in ("outer", "inner", "wrapped", "env", "env_batch", "sample")}
+
+    def _record_window(self) -> None:
+        now = time.perf_counter()
+        steps = self.model.num_timesteps - self._window_steps
+        if steps <= 0:
+            return
+        current = self._snapshot()
+        d = {key: current[key] - self._last[key] for key in current}
+        outer = d["outer"]
+        inner = d["inner"] if "inner" in self._timers else outer
+
+        phases = {
+            "env": d["env"] + d["env_batch"],
+            "wrappers": d["wrapped"] - d["env"],
+            "vec_env": inner - d["wrapped"] - d["env_batch"],
+            "vec_normalize": outer - inner,
+            "policy": self._rollout - outer,
+            "replay_sample": d["sample"],
+            "update": self._train - d["sample"],
+        }
+        wall = now - self._window_start
+        updates = getattr(self.model, "_n_updates", 0) - self._window_updates
+        for phase in PHASES:
+            self.logger.record(f"profile/ms_per_step_{phase}", 1000.0 * phases[phase] / steps)
+        self.logger.record("profile/ms_per_step_total", 1000.0 * wall / steps)
+        self.logger.record("profile/steps_per_s", steps / wall)
+        self.logger.record("profile/gradient_steps_per_s", updates / wall)
+        if self.verbose:
+            split = ", ".join(f"{phase} {100.0 * phases[phase] / wall:.0f}%" for phase in PHASES)
+            print(f"[TrainingProfiler] {steps / wall:.0f} steps/s, {updates / wall:.0f} gradient steps/s: {split}")
+
+        self._last = current
+        self._rollout = self._train = 0.0
+        self._window_start = now
+        self._window_steps = self.model.num_timesteps
+        self._window_updates += updates
+
+    # --------------------
+    # Capture windows
+    # --------------------
+    def _capture_path(self, start: int, extension: str) -> str:
+        directory = self.logger.get_dir() or "."
+        return f"{directory}/profile_{start}.{extension}"
+
+    def _start_capture(self) -> None:
+        self._capture = {"steps": 0, "start": self.num_timesteps}
+        if self.tool == "cprofile":
+            self._capture["profiler"] = cProfile.Profile()
+            self._capture["profiler"].enable()
+        else:
+            # py-spy samples this process until stopped (SIGINT makes it write the flame graph)
+            path = self._capture_path(self.num_timesteps, "svg")
+            self._capture["path"] = path
+            self._capture["process"] = subprocess.Popen(
+                ["py-spy", "record", "--pid", str(os.getpid()), "--subprocesses", "--output", path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+
+    def _stop_capture(self) -> None:
+        capture, self._capture = self._capture, None
+        if self.tool == "cprofile":
+            profiler = capture["profiler"]
+            profiler.disable()
+            path = self._capture_path(capture["start"], "prof")
+            profiler.dump_stats(path)
+            if self.verbose:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(20)
+                print(out.getvalue())
+        else:
+            process = capture["process"]
+            process.send_signal(signal.SIGINT)
+            process.wait(timeout=60)
+            path = capture["path"]
+        print(f"[TrainingProfiler] timesteps {capture['start']}-{self.num_timesteps} profiled: {path}")
@@ -0,0 +1,102 @@
+"""
+userPopulation.py
+
+A population of heterogeneous simulated users for PomodoroEnv.
+
+Instead of one fixed user_profile, a UserPopulation samples `size`
+profiles once from a per-field distribution and keeps them as columns
+(one (size,) array per profile field). Every episode then picks a user
+from the population:
+ - PomodoroEnv copies one row into its (reused) user_profile dict
+ - BatchedPomodoroVecEnv gathers the rows of the users being reset
+
+Distribution specs (one per profile field):
+ - {"dist": "fixed", "value": v}
+ - {"dist": "uniform", "low": a, "high": b}
+ - {"dist": "normal", "mean": m, "std": s, "low": a, "high": b}   (clipped to [low, high])
+ - {"dist": "lognormal", "mean": m, "sigma": s, "low": a, "high": b}   (m, s of the underlying normal)
+"""
+
+import json
+from typing import Dict, Optional
+
+import numpy as np
+
+# Observation order when the profile is appended to the observation
+PROFILE_KEYS = [
+    "preferred_work_base",
+    "preferred_break_base",
+    "variability",
+    "early_stop_sensitivity",
+    "too_short_sensitivity",
+    "fatigue_influence",
+]
+
+# Centered on PomodoroEnv's default user
+DEFAULT_DISTRIBUTION = {
+    "preferred_work_base": {"dist": "normal", "mean": 25.0, "std": 7.0, "low": 10.0, "high": 60.0},
+    "preferred_break_base": {"dist": "normal", "mean": 5.0, "std": 2.0, "low": 2.0, "high": 15.0},
+    "variability": {"dist": "uniform", "low": 1.0, "high": 6.0},
+    "early_stop_sensitivity": {"dist": "uniform", "low": 0.05, "high": 0.20},
+    "too_short_sensitivity": {"dist": "uniform", "low": 0.03, "high": 0.20},
+    "fatigue_influence": {"dist": "uniform", "low": 0.3, "high": 1.0},
+}
+
+
+def sample_field(spec: dict, size: int, rng: np.random.Generator) -> np.ndarray:
+    dist = spec["dist"]
+    if dist == "fixed":
+        return np.full(size, float(spec["value"]))
+    if dist == "uniform":
+        return rng.uniform(spec["low"], spec["high"], size)
+    if dist == "normal":
+        values = rng.normal(spec["mean"], spec["std"], size)
+    elif dist == "lognormal":
+        values = rng.lognormal(spec["mean"], spec["sigma"], size)
+    else:
+        raise ValueError(f"Unknown distribution {dist!r}, expected fixed, uniform, normal or lognormal")
+    return np.clip(values, spec.get("low", -np.inf), spec.get("high", np.inf))
+
+
+class UserPopulation:
+    """
+    distribution: {profile field: spec}, missing fields use DEFAULT_DISTRIBUTION
+    size: number of users sampled
+    seed: seed of the population (not of the episodes)
+    """
+
+    def __init__(self, distribution: Optional[Dict[str, dict]] = None, *, size: int = 10_000, seed: Optional[int] = 0):
+        assert size > 0, "Invalid population size: size must be > 0"
+        distribution = {**DEFAULT_DISTRIBUTION, **(distribution or {})}
+        for key in distribution:
+            assert key in PROFILE_KEYS, f"Invalid profile field {key}: expected one of {PROFILE_KEYS}"
+
+        rng = np.random.default_rng(seed)
+        self.size = size
+        self.distribution = distribution
+        self.columns = {key: sample_field(distribution[key], size, rng) for key in PROFILE_KEYS}
+        self.low = np.array([self.columns[key].min() for key in PROFILE_KEYS], dtype=np.float32)
+        self.high = np.array([self.columns[key].max() for key in PROFILE_KEYS], dtype=np.float32)
+        self._lists = None
+
+    @classmethod
+    def from_json(cls, path: str, **kwargs) -> "UserPopulation":
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def fill(self, profile: dict, i: int) -> dict:
+        """Write user i into an existing profile dict (no new dict per episode)."""
+        if self._lists is None:
+            # Python floats for the scalar env, converted once
+            self._lists = {key: column.tolist() for key, column in self.columns.items()}
+        for key, column in self._lists.items():
+            profile[key] = column[i]
+        return profile
+
+    def gather(self, idx: np.ndarray) -> Dict[str, np.ndarray]:
+        """Profiles of users idx, as columns."""
+        return {key: column[idx] for key, column in self.columns.items()}
+
+    def __getstate__(self):
+        # The list cache is rebuilt on demand (keeps subprocess pickles small)
+        return {**self.__dict__, "_lists": None}
@@ -0,0 +1,107 @@
+"""
+responseCache.py
+
+Bounded in-process cache for /pomodoro answers.
+
+Keys are (model_step, algorithm, fatigue, work_minutes_day, break_minutes_day).
+Least recently used entries are evicted once `max_size` is reached, and
+entries older than `ttl_seconds` (if set) are treated as misses.
+
+Call set_version() with the hash of each loaded checkpoint: when it changes
+that model's entries are flushed, so answers of an old model are never served.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class ResponseCache:
+    """
+    max_size: number of entries kept (LRU eviction beyond that)
+    ttl_seconds: optional time-to-live of an entry, None = no expiry
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl_seconds: Optional[float] = None):
+        assert max_size > 0, "Invalid cache size: max_size must be > 0"
+        assert ttl_seconds is None or ttl_seconds > 0, "Invalid TTL: ttl_seconds must be > 0"
+
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.versions = {}  # (model_step, algorithm) -> checkpoint hash
+
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    @staticmethod
+    def make_key(model_step: int, algorithm: str, fatigue: int, work_minutes_day: int, break_minutes_day: int):
+        return (model_step, algorithm, fatigue, work_minutes_day, break_minutes_day)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.flushes += 1
+
+    def set_version(self, version: Hashable, model_step: Optional[int] = None, algorithm: Optional[str] = None) -> None:
+        """
+        Flush the entries of (model_step, algorithm) if a different checkpoint
+        of it is now loaded. Without a model, any version change flushes everything.
+        """
+        model = (model_step, algorithm)
+        old = self.versions.get(model)
+        self.versions[model] = version
+        if old is None or old == version:
+            return
+        if model_step is None and algorithm is None:
+            self.clear()
+            return
+        with self._lock:
+            for key in [key for key in self._data if key[:2] == model]:
+                del self._data[key]
+            self.flushes += 1
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "flushes": self.flushes,
+        }
@@ -0,0 +1,277 @@
+"""
+sessionLog.py
+
+Append-only log of what the API recommended and what the user then did.
+
+Two record kinds, each a stream of immutable segment files:
+ - {directory}/recommendations/*.npy: id, time, observation, recommendation, model version
+ - {directory}/outcomes/*.npy: id, time, actual work/break minutes, stopped early, too short
+
+Rows are buffered in preallocated NumPy structured arrays and written as a
+segment (temp file + rename, by a background thread) when the buffer is
+full, when its oldest row is flush_interval_s old, or on flush()/close().
+The age is also checked by a timer thread every flush_interval_s / 4, so an
+idle server writes its partial segments too: a crash loses at most the last
+~1.25 * flush_interval_s of rows. Segments are
+plain .npy files, so readers open them with np.load(mmap_mode="r") and
+never need more than one segment in memory (see iter_segments / iter_sessions).
+
+Ids are (random 21-bit per-process token << 32) | counter, so several
+uvicorn workers can log into the same directory, every segment is sorted by
+id and ids stay below 2**53 (exact as JavaScript numbers in the frontend).
+Every worker registers its token in {directory}/workers, so an outcome for
+an id no worker issued is rejected (KeyError). An outcome reported twice
+for one id is written twice; iter_sessions keeps the first one.
+"""
+
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+import numpy as np
+
+
+RECOMMENDATION_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("time", np.float64),
+    ("fatigue", np.float32),
+    ("work_minutes_day", np.float32),
+    ("break_minutes_day", np.float32),
+    ("work", np.int16),
+    ("break", np.int16),
+    ("algorithm", "S8"),
+    ("step", np.int64),
+    ("model_hash", "S16"),
+])
+
+OUTCOME_DTYPE = np.dtype([
+    ("id", np.int64),
+    ("time", np.float64),
+    ("actual_work", np.float32),
+    ("actual_break", np.float32),
+    ("stopped_early", np.bool_),
+    ("too_short", np.bool_),
+])
+
+KINDS = {"recommendations": RECOMMENDATION_DTYPE, "outcomes": OUTCOME_DTYPE}
+
+
+class _Buffer:
+    def __init__(self, dtype, rows):
+        self.rows = np.zeros(rows, dtype=dtype)
+        self.n = 0
+        self.since = time.monotonic()
+
+
+class SessionLog:
+    """
+    directory: where the segment folders are created
+    segment_rows: rows buffered per segment (per record kind)
+    flush_interval_s: write a partial segment once the oldest buffered row is this old
+    """
+
+    def __init__(self, directory: str, *, segment_rows: int = 4096, flush_interval_s: float = 30.0):
+        assert segment_rows > 0, "Invalid segment size: segment_rows must be > 0"
+        assert flush_interval_s > 0, "Invalid flush interval: flush_interval_s must be > 0"
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.flush_interval_s = flush_interval_s
+        for kind in KINDS:
+            os.makedirs(f"{directory}/{kind}", exist_ok=True)
+
+        self._token = secrets.randbits(21)
+        # Lets the other workers accept outcomes for our ids
+        os.makedirs(f"{directory}/workers", exist_ok=True)
+        open(f"{directory}/workers/{self._token:06x}", "a").close()
+        self._tokens = {self._token}
+        self._counter = 0
+        self._segment = 0
+        self._lock = threading.Lock()
+        self._buffers = {kind: _Buffer(dtype, segment_rows) for kind, dtype in KINDS.items()}
+        # One writer thread: segments are written in order, requests never wait on disk
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-log")
+        # Partial segments are written on time even when no request comes in
+        self._stop = threading.Event()
+        self._timer = threading.Thread(target=self._flush_periodically, name="session-log-timer", daemon=True)
+        self._timer.start()
+
+    # --------------------
+    # Logging
+    # --------------------
+    def log_recommendations(self, obs, recommendations, algorithm: str, step: int, model_hash: str) -> np.ndarray:
+        """
+        obs: (B, 3) [fatigue, work_minutes_day, break_minutes_day]
+        recommendations: (B, 2) [work, break] minutes
+        Returns the (B,) ids to hand back to the client.
+        """
+        obs = np.asarray(obs).reshape(-1, 3)
+        recommendations = np.asarray(recommendations).reshape(-1, 2)
+        with self._lock:
+            ids = self._next_ids(len(obs))
+            self._append("recommendations", {
+                "id": ids,
+                "time": time.time(),
+                "fatigue": obs[:, 0],
+                "work_minutes_day": obs[:, 1],
+                "break_minutes_day": obs[:, 2],
+                "work": recommendations[:, 0],
+                "break": recommendations[:, 1],
+                "algorithm": algorithm.encode()[:8],
+                "step": step,
+                "model_hash": (model_hash or "").encode()[:16],
+            }, len(obs))
+        return ids
+
+    def log_outcome(self, id: int, actual_work: float, actual_break: float, stopped_early: bool, too_short: bool) -> None:
+        """Log what the user did with recommendation `id`; raises KeyError if no worker issued that id."""
+        with self._lock:
+            if not self._issued(id):
+                raise KeyError(f"Unknown recommendation id {id}")
+            self._append("outcomes", {
+                "id": id,
+                "time": time.time(),
+                "actual_work": actual_work,
+                "actual_break": actual_break,
+                "stopped_early": stopped_early,
+                "too_short": too_short,
+            }, 1)
+
+    def flush(self) -> None:
+        with self._lock:
+            for kind in KINDS:
+                self._flush(kind)
+
+    def close(self) -> None:
+        self._stop.set()
+        self._timer.join()
+        self.flush()
+        self._writer.shutdown(wait=True)
+
+    # --------------------
+    # Helpers
+    # --------------------
+    def _next_ids(self, n: int) -> np.ndarray:
+        ids = (np.int64(self._token) << 32) | (self._counter + np.arange(n, dtype=np.int64))
+        self._counter += n
+        return ids
+
+    def _issued(self, id: int) -> bool:
+        token, counter = id >> 32, id & 0xFFFFFFFF
+        if id < 0 or token >= 1 << 21:
+            return False
+        if token == self._token:
+            return counter < self._counter
+        if token not in self._tokens:
+            self._tokens.update(int(name, 16) for name in os.listdir(f"{self.directory}/workers"))
+        # Another worker's counter is not known here, only that it exists
+        return token in self._tokens
+
+    def _append(self, kind: str, columns: dict, n: int) -> None:
+        buffer = self._buffers[kind]
+        start = 0
+        while start < n:
+            take = min(n - start, self.segment_rows - buffer.n)
+            if buffer.n == 0:
+                buffer.since = time.monotonic()
+            dest = buffer.rows[buffer.n: buffer.n + take]
+            for name, value in columns.items():
+                dest[name] = value[start: start + take] if isinstance(value, np.ndarray) else value
+            buffer.n += take
+            start += take
+            if buffer.n == self.segment_rows:
+                self._flush(kind)
+                buffer = self._buffers[kind]
+        self._flush_if_due(kind)
+
+    def _flush_if_due(self, kind: str) -> None:
+        buffer = self._buffers[kind]
+        if buffer.n and time.monotonic() - buffer.since >= self.flush_interval_s:
+            self._flush(kind)
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval_s / 4):
+            with self._lock:
+                for kind in KINDS:
+                    self._flush_if_due(kind)
+
+    def _flush(self, kind: str) -> None:
+        buffer = self._buffers[kind]
+        if buffer.n == 0:
+            return
+        rows = buffer.rows[: buffer.n]
+        self._buffers[kind] = _Buffer(KINDS[kind], self.segment_rows)
+        self._segment += 1
+        path = f"{self.directory}/{kind}/{int(time.time())}-{self._token:08x}-{self._segment:06d}.npy"
+        self._writer.submit(_write_segment, path, rows)
+
+
+def _write_segment(path: str, rows: np.ndarray) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, rows)
+    os.replace(tmp_path, path)
+
+
+# --------------------
+# Reading
+# --------------------
+def segment_paths(directory: str, kind: str):
+    folder = f"{directory}/{kind}"
+    if not os.path.isdir(folder):
+        return []
+    return sorted(f"{folder}/{name}" for name in os.listdir(folder) if name.endswith(".npy"))
+
+
+def iter_segments(directory: str, kind: str) -> Iterator[np.ndarray]:
+    """Memory-mapped segments of one record kind, oldest first."""
+    for path in segment_paths(directory, kind):
+        yield np.load(path, mmap_mode="r")
+
+
+def iter_sessions(directory: str) -> Iterator[dict]:
+    """
+    Recommendations joined with their outcomes, one chunk (dict of columns)
+    per outcome segment. Only one outcome segment and one recommendation
+    segment are read at a time; recommendations without an outcome are skipped.
+    Only the first outcome logged for an id is kept (the ids already seen
+    are the only state that grows, 8 bytes per outcome).
+    """
+    # id range of every recommendation segment (segments are sorted by id)
+    ranges = []
+    for path in segment_paths(directory, "recommendations"):
+        ids = np.load(path, mmap_mode="r")["id"]
+        if len(ids):
+            ranges.append((path, int(ids.min()), int(ids.max())))
+
+    seen = np.zeros(0, dtype=np.int64)
+    for outcomes in iter_segments(directory, "outcomes"):
+        out_ids = np.asarray(outcomes["id"])
+        # First outcome of every id, in this segment and across the earlier ones
+        first = np.zeros(len(out_ids), dtype=bool)
+        first[np.unique(out_ids, return_index=True)[1]] = True
+        first &= ~np.isin(out_ids, seen)
+        seen = np.union1d(seen, out_ids[first])
+
+        found = np.zeros(len(out_ids), dtype=bool)
+        chunk = {name: np.zeros(len(out_ids), dtype=RECOMMENDATION_DTYPE[name]) for name in RECOMMENDATION_DTYPE.names}
+        for path, low, high in ranges:
+            candidates = np.flatnonzero(first & ~found & (out_ids >= low) & (out_ids <= high))
+            if not len(candidates):
+                continue
+            recs = np.load(path, mmap_mode="r")
+            rec_ids = np.asarray(recs["id"])
+            pos = np.searchsorted(rec_ids, out_ids[candidates])
+            pos = np.minimum(pos, len(rec_ids) - 1)
+            hit = rec_ids[pos] == out_ids[candidates]
+            rows = recs[pos[hit]]
+            for name in RECOMMENDATION_DTYPE.names:
+                chunk[name][candidates[hit]] = rows[name]
+            found[candidates[hit]] = True
+
+        if found.any():
+            for name in ("actual_work", "actual_break", "stopped_early", "too_short"):
+                chunk[name] = np.asarray(outcomes[name])
+            yield {name: column[found] for name, column in chunk.items()}
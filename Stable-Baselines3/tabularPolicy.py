@@ -0,0 +1,94 @@
+"""
+tabularPolicy.py
+
+NumPy-only runner for a policy stored as a table over a state grid
+(the dynamic-programming oracle, see pomodoro/dpOracle.py).
+
+The .npz file holds:
+ - the grid of every observation dimension (fatigue, work today, break today),
+   evenly spaced
+ - the (work, break) minutes recommended at every grid node
+ - algorithm / step labels and the hash of the table (for lookupTable.py)
+
+An observation is answered with the action of its nearest grid node
+(observations outside the grid are clipped to it), so any input gets an answer.
+"""
+
+import hashlib
+from typing import Sequence
+
+import numpy as np
+
+
+class TabularPolicy:
+    """
+    grids: one evenly spaced 1-D grid per observation dimension
+    actions: (*grid sizes, 2) [work, break] minutes at every grid node
+    """
+
+    def __init__(
+        self,
+        grids: Sequence[np.ndarray],
+        actions: np.ndarray,
+        algorithm: str = "DP",
+        step: int = 0,
+        source_hash: str = "",
+    ):
+        self.grids = [np.asarray(g, dtype=np.float64) for g in grids]
+        self.actions = np.asarray(actions, dtype=np.float32)
+        assert self.actions.shape == tuple(len(g) for g in self.grids) + (2,), \
+            "Invalid table: actions must have shape (*grid sizes, 2)"
+        for g in self.grids:
+            assert len(g) > 1 and np.allclose(np.diff(g), g[1] - g[0]), "Invalid grid: grids must be evenly spaced"
+
+        self.low = np.array([g[0] for g in self.grids])
+        self.spacing = np.array([g[1] - g[0] for g in self.grids])
+        self.size = np.array([len(g) for g in self.grids])
+
+        self.algorithm = algorithm
+        self.step = int(step)
+        self.source_hash = source_hash or self.table_hash()
+
+    def table_hash(self) -> str:
+        h = hashlib.sha256()
+        for array in (*self.grids, self.actions):
+            h.update(np.ascontiguousarray(array).tobytes())
+        return h.hexdigest()
+
+    @classmethod
+    def load(cls, path: str) -> "TabularPolicy":
+        with np.load(path) as data:
+            n_dims = int(data["n_dims"])
+            return cls(
+                grids=[data[f"grid{i}"] for i in range(n_dims)],
+                actions=data["actions"],
+                algorithm=str(data["algorithm"]),
+                step=int(data["step"]),
+                source_hash=str(data["source_hash"]),
+            )
+
+    def save(self, path: str, **extra) -> None:
+        """Write the policy (plus any `extra` arrays, e.g. the values of the grid nodes) to `path`."""
+        np.savez(
+            path,
+            n_dims=len(self.grids),
+            **{f"grid{i}": g for i, g in enumerate(self.grids)},
+            actions=self.actions,
+            algorithm=self.algorithm,
+            step=self.step,
+            source_hash=self.source_hash,
+            **extra,
+        )
+
+    def node_index(self, obs_real: np.ndarray) -> tuple:
+        """Index arrays of the nearest grid node of every row of a (B, n_dims) batch."""
+        idx = np.rint((np.asarray(obs_real, dtype=np.float64) - self.low) / self.spacing).astype(np.int64)
+        idx = np.clip(idx, 0, self.size - 1)
+        return tuple(idx.T)
+
+    def predict(self, obs_real: np.ndarray) -> np.ndarray:
+        """
+        obs_real: (B, 3) array of [fatigue, work_minutes_day, break_minutes_day]
+        returns: (B, 2) array of [work_minutes, break_minutes]
+        """
+        return self.actions[self.node_index(obs_real)]